@@ -3,17 +3,94 @@ API Flask para divisão de PDFs - Versão Web para Vercel.
 """
 
 import os
-import io
+import sys
 import json
-import zipfile
-import tempfile
-from flask import Flask, request, jsonify, send_file, render_template_string
-from PyPDF2 import PdfReader, PdfWriter
+import functools
+import logging
+import time
+from typing import Optional
+from flask import Flask, Request, Response, g, request, jsonify, render_template_string, send_file, url_for
 from werkzeug.utils import secure_filename
 from werkzeug.exceptions import RequestEntityTooLarge
 
+# Permite importar os módulos da raiz do projeto (pdf_splitter etc.)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from instrumentation import SplitProfile, activate, log_profile, server_timing, stage  # noqa: E402
+from image_optimizer import DEFAULT_JPEG_QUALITY, DEFAULT_MAX_DPI  # noqa: E402
+from metrics import (  # noqa: E402
+    ACTIVE_SPLITS, CONTENT_TYPE, INPUT_BYTES, OUTPUT_BYTES, PAGES_PROCESSED, REGISTRY, SIZE_BUCKETS
+)
+from jobs import JOB_CANCELLED, JOB_DONE, JOB_ERROR, JobBackend, LocalJobBackend, QueueFull  # noqa: E402
+from pdf_probe import probe_pdf  # noqa: E402
+from pdf_splitter import PDFSplitter, format_page_ranges, parse_page_ranges  # noqa: E402
+from result_cache import ResultCache, cache_key, iter_cached_parts, normalize_params  # noqa: E402
+from size_estimator import SPLIT_STRATEGIES  # noqa: E402
+from tribunais import TRIBUNAIS_DEFAULTS, parse_tribunals, tribunal_targets  # noqa: E402
+from upload_ingest import InvalidUpload, PdfSpool, spool_stream  # noqa: E402
+from zip_stream import COMPRESSION_POLICIES, iter_zip  # noqa: E402
+
+
+class SpoolingRequest(Request):
+    """Requisição que grava os uploads de PDF direto em disco, validando-os durante o envio."""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if filename and filename.lower().endswith('.pdf'):
+            return PdfSpool()
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+
 app = Flask(__name__)
-app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100 MB max
+app.request_class = SpoolingRequest
+# Os uploads vão para disco em blocos, então o limite não depende da memória do servidor
+app.config['MAX_CONTENT_LENGTH'] = int(
+    float(os.environ.get('PDF_SPLITTER_MAX_UPLOAD_MB', 1024)) * 1024 * 1024
+)
+
+# Perfis das divisões, uma linha JSON por requisição (ver instrumentation)
+logging.basicConfig(format='%(message)s')
+logging.getLogger('pdf_splitter').setLevel(os.environ.get('PDF_SPLITTER_LOG_LEVEL', 'INFO'))
+
+# Resultados de divisões já feitas (configurado por variáveis de ambiente)
+result_cache = ResultCache()
+
+# Divisões assíncronas (/api/jobs); pode ser trocado por outro JobBackend
+job_backend: JobBackend = LocalJobBackend()
+
+# Segundos sugeridos ao cliente quando a fila de jobs está cheia
+JOBS_RETRY_AFTER = 5
+
+# Métricas da API, expostas em /metrics com as das divisões (ver metrics.py)
+HTTP_REQUESTS = REGISTRY.counter(
+    'pdf_splitter_http_requests_total', 'Requisições por rota, método e status',
+    ('endpoint', 'method', 'status')
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    'pdf_splitter_http_request_duration_seconds',
+    'Duração das requisições por rota, até o fim do envio da resposta', ('endpoint',)
+)
+UPLOAD_SIZE = REGISTRY.histogram(
+    'pdf_splitter_upload_bytes', 'Tamanho dos PDFs recebidos', buckets=SIZE_BUCKETS
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    'pdf_splitter_cache_requests_total', 'Consultas ao cache de resultados', ('result',)
+)
+
+
+def _cache_hit_ratio() -> dict:
+    hits = CACHE_REQUESTS.value(result='hit')
+    total = hits + CACHE_REQUESTS.value(result='miss')
+    return {(): hits / total if total else 0.0}
+
+
+REGISTRY.gauge(
+    'pdf_splitter_cache_hit_ratio', 'Fração das divisões atendidas pelo cache',
+    callback=_cache_hit_ratio
+)
+REGISTRY.gauge(
+    'pdf_splitter_jobs', 'Jobs assíncronos por estado (queued é a profundidade da fila)',
+    ('status',), callback=lambda: {(status,): count for status, count in job_backend.stats().items()}
+)
 
 
 @app.errorhandler(RequestEntityTooLarge)
@@ -22,12 +99,40 @@ def handle_request_entity_too_large(_error):
     return jsonify({'error': 'Arquivo muito grande para processar nesta hospedagem.'}), 413
 
 
+@app.errorhandler(InvalidUpload)
+def handle_invalid_upload(error):
+    """Recusa uploads que não são PDF ou estão truncados, antes de qualquer processamento."""
+    return jsonify({'error': str(error)}), 400
+
+
+@app.before_request
+def start_request_timer():
+    """Marca o início da requisição para o histograma de latência."""
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Conta a requisição e mede a sua duração quando a resposta termina de ser enviada."""
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'desconhecida'
+    method = request.method
+    started = g.get('request_started', time.perf_counter())
+    
+    def observe():
+        HTTP_REQUESTS.inc(endpoint=endpoint, method=method, status=response.status_code)
+        HTTP_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint)
+    
+    response.call_on_close(observe)
+    return response
+
+
 @app.after_request
 def add_cors_headers(response):
     """Adiciona headers CORS a todas as respostas."""
     response.headers['Access-Control-Allow-Origin'] = '*'
-    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, DELETE, OPTIONS'
     response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
+    response.headers['Access-Control-Expose-Headers'] = 'X-Cache, Location, Retry-After, Server-Timing'
     return response
 
 
@@ -35,31 +140,17 @@ def add_cors_headers(response):
 @app.route('/split', methods=['OPTIONS'])
 @app.route('/api/info', methods=['OPTIONS'])
 @app.route('/api/split', methods=['OPTIONS'])
-def handle_options():
+@app.route('/api/split/tribunals', methods=['OPTIONS'])
+@app.route('/api/extract', methods=['OPTIONS'])
+@app.route('/plan', methods=['OPTIONS'])
+@app.route('/api/plan', methods=['OPTIONS'])
+@app.route('/api/jobs', methods=['OPTIONS'])
+@app.route('/api/jobs/<job_id>', methods=['OPTIONS'])
+@app.route('/api/jobs/<job_id>/result', methods=['OPTIONS'])
+def handle_options(job_id=None):
     """Trata requisições preflight OPTIONS."""
     return '', 204
 
-# Preferências padrão por tribunal (em MB e páginas)
-TRIBUNAIS_DEFAULTS = {
-    "tjsp": {"max_size_mb": 5, "max_pages": None, "nome": "TJSP - Tribunal de Justiça de SP"},
-    "tjrj": {"max_size_mb": 10, "max_pages": None, "nome": "TJRJ - Tribunal de Justiça do RJ"},
-    "tjmg": {"max_size_mb": 8, "max_pages": None, "nome": "TJMG - Tribunal de Justiça de MG"},
-    "tjpr": {"max_size_mb": 5, "max_pages": None, "nome": "TJPR - Tribunal de Justiça do PR"},
-    "tjrs": {"max_size_mb": 10, "max_pages": None, "nome": "TJRS - Tribunal de Justiça do RS"},
-    "tjsc": {"max_size_mb": 5, "max_pages": None, "nome": "TJSC - Tribunal de Justiça de SC"},
-    "trf1": {"max_size_mb": 10, "max_pages": None, "nome": "TRF1 - Tribunal Regional Federal 1ª Região"},
-    "trf2": {"max_size_mb": 10, "max_pages": None, "nome": "TRF2 - Tribunal Regional Federal 2ª Região"},
-    "trf3": {"max_size_mb": 10, "max_pages": None, "nome": "TRF3 - Tribunal Regional Federal 3ª Região"},
-    "trf4": {"max_size_mb": 10, "max_pages": None, "nome": "TRF4 - Tribunal Regional Federal 4ª Região"},
-    "trf5": {"max_size_mb": 10, "max_pages": None, "nome": "TRF5 - Tribunal Regional Federal 5ª Região"},
-    "stj": {"max_size_mb": 15, "max_pages": None, "nome": "STJ - Superior Tribunal de Justiça"},
-    "stf": {"max_size_mb": 15, "max_pages": None, "nome": "STF - Supremo Tribunal Federal"},
-    "tst": {"max_size_mb": 10, "max_pages": None, "nome": "TST - Tribunal Superior do Trabalho"},
-    "pje": {"max_size_mb": 10, "max_pages": 200, "nome": "PJe - Processo Judicial Eletrônico"},
-    "projudi": {"max_size_mb": 5, "max_pages": None, "nome": "Projudi"},
-    "esaj": {"max_size_mb": 5, "max_pages": None, "nome": "e-SAJ"},
-    "custom": {"max_size_mb": 5, "max_pages": 50, "nome": "Personalizado"}
-}
 
 HTML_TEMPLATE = '''
 <!DOCTYPE html>
@@ -521,7 +612,7 @@ HTML_TEMPLATE = '''
                         const [page] = await partDoc.copyPages(selectedPdfDoc, [currentPage]);
                         partDoc.addPage(page);
 
-                        const bytes = await partDoc.save();
+                        const bytes = await partDoc.save({ useObjectStreams: config.object_streams !== false });
                         if (bytes.length > maxSizeBytes && currentPage > currentStart) {
                             partDoc.removePage(partDoc.getPageCount() - 1);
                             break;
@@ -618,6 +709,31 @@ def get_tribunais():
     return jsonify(TRIBUNAIS_DEFAULTS)
 
 
+def _spool_upload(file) -> tuple:
+    """
+    Entrega o arquivo temporário com o upload, já validado.
+    
+    Os uploads .pdf já chegam gravados em disco pela SpoolingRequest, com o
+    SHA-256 calculado durante o envio; outros são copiados em blocos. O
+    PDFSplitter mapeia esse arquivo em memória, evitando manter uma cópia
+    inteira do upload no heap do Python.
+    
+    Returns:
+        Tupla (caminho do arquivo temporário, a ser removido pelo chamador,
+        SHA-256 do conteúdo)
+    
+    Raises:
+        InvalidUpload: Se o upload não for um PDF ou estiver truncado
+    """
+    if isinstance(file.stream, PdfSpool):
+        _path, sha256 = file.stream.finish()
+        UPLOAD_SIZE.observe(file.stream.size)
+        return file.stream.detach(), sha256
+    path, sha256 = spool_stream(file.stream)
+    UPLOAD_SIZE.observe(os.path.getsize(path))
+    return path, sha256
+
+
 @app.route('/info', methods=['POST'])
 @app.route('/api/info', methods=['POST'])
 def get_pdf_info():
@@ -632,95 +748,513 @@ def get_pdf_info():
     if not file.filename.lower().endswith('.pdf'):
         return jsonify({'error': 'Arquivo deve ser PDF'}), 400
     
+    tmp_path, _sha256 = _spool_upload(file)
+    
     try:
-        pdf_bytes = file.read()
-        reader = PdfReader(io.BytesIO(pdf_bytes))
+        # Lê apenas trailer, xref e /Root/Pages/Count
+        info = probe_pdf(tmp_path)
         
         return jsonify({
             'filename': secure_filename(file.filename),
-            'pages': len(reader.pages),
-            'size_bytes': len(pdf_bytes),
-            'size_mb': round(len(pdf_bytes) / (1024 * 1024), 2)
+            'pages': info['total_paginas'],
+            'size_bytes': info['tamanho_bytes'],
+            'size_mb': info['tamanho_mb'],
+            'version': info['versao'],
+            'encrypted': info['criptografado'],
+            'linearized': info['linearizado'],
+            'producer': info['produtor']
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    finally:
+        os.unlink(tmp_path)
+
+
+def _split_options(form) -> dict:
+    """
+    Lê e valida as opções de divisão do formulário.
+    
+    Um tribunal pré-configurado ('tribunal') fornece os padrões; os campos
+    do formulário têm prioridade.
+    
+    Returns:
+        Dicionário com max_size_mb, max_pages, strategy, compression,
+        object_streams, optimize_images, max_dpi e jpeg_quality (None
+        quando as imagens não são otimizadas)
+    
+    Raises:
+        ValueError: Se alguma opção for inválida
+    """
+    tribunal = form.get('tribunal')
+    if tribunal and tribunal not in TRIBUNAIS_DEFAULTS:
+        raise ValueError(f"Tribunal desconhecido: {tribunal}")
+    defaults = TRIBUNAIS_DEFAULTS.get(tribunal, {})
+    
+    max_size_mb = float(form.get('max_size_mb') or defaults.get('max_size_mb', 5))
+    max_pages = form.get('max_pages') or defaults.get('max_pages')
+    max_pages = int(max_pages) if max_pages else None
+    compression = form.get('compression', 'auto')
+    strategy = form.get('strategy') or defaults.get('strategy', 'greedy')
+    object_streams = _form_flag(form.get('object_streams'), defaults.get('object_streams', False))
+    # A recompressão das imagens perde qualidade: só quando pedida explicitamente
+    optimize_images = _form_flag(form.get('optimize_images'), False)
+    max_dpi = int(form.get('max_dpi') or DEFAULT_MAX_DPI)
+    jpeg_quality = int(form.get('jpeg_quality') or DEFAULT_JPEG_QUALITY)
+    
+    if max_size_mb <= 0:
+        raise ValueError("Tamanho máximo deve ser maior que zero")
+    
+    if compression not in COMPRESSION_POLICIES:
+        raise ValueError(f"Compressão deve ser uma de: {', '.join(COMPRESSION_POLICIES)}")
+    
+    if strategy not in SPLIT_STRATEGIES:
+        raise ValueError(f"Estratégia deve ser uma de: {', '.join(SPLIT_STRATEGIES)}")
+    
+    if max_dpi <= 0:
+        raise ValueError("Resolução máxima deve ser maior que zero")
+    
+    if not 1 <= jpeg_quality <= 95:
+        raise ValueError("Qualidade JPEG deve estar entre 1 e 95")
+    
+    # Sem otimização, os valores não afetam o resultado nem a chave do cache
+    if not optimize_images:
+        max_dpi = jpeg_quality = None
+    
+    return {
+        'max_size_mb': max_size_mb,
+        'max_pages': max_pages,
+        'strategy': strategy,
+        'compression': compression,
+        'object_streams': object_streams,
+        'optimize_images': optimize_images,
+        'max_dpi': max_dpi,
+        'jpeg_quality': jpeg_quality
+    }
+
+
+def _form_flag(value: Optional[str], default: bool) -> bool:
+    """Lê uma opção booleana do formulário ('1', 'true', 'on' ou 'sim'); vazia usa o padrão."""
+    if not value:
+        return default
+    return value.lower() in ('1', 'true', 'on', 'sim')
+
+
+def _optimize_images(splitter: PDFSplitter, options: dict) -> None:
+    """Otimiza as imagens antes da divisão, se pedido nas opções."""
+    if options['optimize_images']:
+        splitter.optimize_images(
+            max_dpi=options['max_dpi'],
+            quality=options['jpeg_quality'],
+            max_page_mb=options['max_size_mb']
+        )
+
+
+@app.route('/plan', methods=['POST'])
+@app.route('/api/plan', methods=['POST'])
+def plan_pdf():
+    """Planeja a divisão de um PDF sem gerar as partes."""
+    if 'file' not in request.files:
+        return jsonify({'error': 'Nenhum arquivo enviado'}), 400
+    
+    file = request.files['file']
+    
+    if not file.filename.lower().endswith('.pdf'):
+        return jsonify({'error': 'Arquivo deve ser PDF'}), 400
+    
+    try:
+        options = _split_options(request.form)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    tmp_path, _sha256 = _spool_upload(file)
+    
+    try:
+        with PDFSplitter(tmp_path, object_streams=options['object_streams']) as splitter:
+            _optimize_images(splitter, options)
+            plan = splitter.plan(
+                max_size_mb=options['max_size_mb'],
+                max_pages=options['max_pages'],
+                strategy=options['strategy']
+            )
+            total_pages = splitter.total_pages
+        
+        return jsonify({
+            'filename': secure_filename(file.filename),
+            'pages': total_pages,
+            'parts': [
+                {
+                    'part': part['parte'],
+                    'start_page': part['pagina_inicial'],
+                    'end_page': part['pagina_final'],
+                    'pages': part['paginas'],
+                    'estimated_bytes': part['tamanho_estimado_bytes']
+                }
+                for part in plan
+            ]
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        os.unlink(tmp_path)
+
+
+def _profiled(view):
+    """
+    Mede os estágios de uma divisão feita pela API.
+    
+    O upload e os estágios até a primeira parte vão no cabeçalho
+    Server-Timing; a resposta em streaming continua sendo medida, e o perfil
+    completo é registrado em JSON quando o ZIP termina de ser enviado.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        profile = SplitProfile()
+        with activate(profile):
+            # O upload é gravado em disco no primeiro acesso ao formulário (ver SpoolingRequest);
+            # o acesso aqui só força a leitura do corpo dentro da etapa 'upload'
+            with stage('upload', bytes_in=request.content_length or 0):
+                _ = request.files
+            ACTIVE_SPLITS.inc()
+            try:
+                response = app.make_response(view(*args, **kwargs))
+            except BaseException:
+                ACTIVE_SPLITS.dec()
+                raise
+        
+        fields = {'rota': request.path, 'status': response.status_code}
+        if 'file' in request.files:
+            fields['arquivo'] = secure_filename(request.files['file'].filename)
+        response.headers['Server-Timing'] = server_timing(profile)
+        if response.is_streamed:
+            response.response = _profiled_stream(response.response, profile, fields)
+            response.call_on_close(ACTIVE_SPLITS.dec)
+        else:
+            log_profile(profile, 'divisao', **fields)
+            ACTIVE_SPLITS.dec()
+        return response
+    
+    return wrapper
+
+
+def _profiled_stream(chunks, profile: SplitProfile, fields: dict):
+    """Envia a resposta medindo os estágios e registra o perfil ao final."""
+    try:
+        with activate(profile):
+            yield from chunks
+    finally:
+        log_profile(profile, 'divisao', **fields)
 
 
 @app.route('/split', methods=['POST'])
 @app.route('/api/split', methods=['POST'])
+@_profiled
 def split_pdf():
     """Divide um PDF e retorna um ZIP com os arquivos."""
     if 'file' not in request.files:
         return jsonify({'error': 'Nenhum arquivo enviado'}), 400
     
     file = request.files['file']
-    max_size_mb = float(request.form.get('max_size_mb', 5))
-    max_pages = request.form.get('max_pages')
-    max_pages = int(max_pages) if max_pages else None
     
     if not file.filename.lower().endswith('.pdf'):
         return jsonify({'error': 'Arquivo deve ser PDF'}), 400
     
     try:
-        pdf_bytes = file.read()
-        reader = PdfReader(io.BytesIO(pdf_bytes))
-        total_pages = len(reader.pages)
+        options = _split_options(request.form)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    max_size_mb = options['max_size_mb']
+    max_pages = options['max_pages']
+    strategy = options['strategy']
+    compression = options['compression']
+    object_streams = options['object_streams']
+    
+    # Grava o upload em arquivo temporário, mapeado em memória pelo PDFSplitter
+    tmp_path, sha256 = _spool_upload(file)
+    base_name = os.path.splitext(secure_filename(file.filename))[0]
+    key = cache_key(sha256, normalize_params(
+        max_size_mb=max_size_mb, max_pages=max_pages, strategy=strategy,
+        object_streams=object_streams,
+        max_dpi=options['max_dpi'],
+        jpeg_quality=options['jpeg_quality']
+    ))
+    headers = {'Content-Disposition': f'attachment; filename={base_name}_dividido.zip'}
+    
+    # Mesmo PDF com os mesmos parâmetros: devolve as partes guardadas
+    cached = result_cache.get(key)
+    if cached is not None:
+        os.unlink(tmp_path)
+        CACHE_REQUESTS.inc(result='hit')
+        headers['X-Cache'] = 'HIT'
+        return Response(
+            iter_zip(_named_entries(iter_cached_parts(cached), base_name), compression),
+            mimetype='application/zip',
+            headers=headers
+        )
+    
+    if result_cache.enabled:
+        CACHE_REQUESTS.inc(result='miss')
+    splitter = None
+    writer = None
+    
+    try:
+        splitter = PDFSplitter(tmp_path, object_streams=object_streams)
+        INPUT_BYTES.inc(os.path.getsize(tmp_path))
+        _optimize_images(splitter, options)
         
-        max_size_bytes = max_size_mb * 1024 * 1024
-        base_name = os.path.splitext(secure_filename(file.filename))[0]
+        # Partes planejadas pelo índice de objetos e geradas sob demanda
+        size_parts = splitter.iter_parts(
+            max_size_mb=max_size_mb, max_pages=max_pages, strategy=strategy
+        )
+        parts = _count_parts(
+            (start_page, end_page, buffer.getvalue())
+            for _part_num, (start_page, end_page), buffer in size_parts
+        )
+        writer = result_cache.writer(key)
+        if writer is not None:
+            parts = _cache_parts(parts, writer)
+        zip_chunks = iter_zip(_named_entries(parts, base_name), compression)
         
-        # Cria ZIP na memória
-        zip_buffer = io.BytesIO()
+        # Gera a primeira parte antes de responder, para que erros de leitura
+        # do PDF ainda possam ser devolvidos como JSON
+        first_chunk = next(zip_chunks)
+    
+    except Exception as e:
+        if writer is not None:
+            writer.discard()
+        if splitter is not None:
+            splitter.close()
+        os.unlink(tmp_path)
+        return jsonify({'error': str(e)}), 500
+    
+    headers['X-Cache'] = 'MISS'
+    return Response(
+        _stream_zip(first_chunk, zip_chunks, splitter, tmp_path),
+        mimetype='application/zip',
+        headers=headers
+    )
+
+
+@app.route('/api/split/tribunals', methods=['POST'])
+@_profiled
+def split_pdf_tribunals():
+    """Divide um PDF para vários tribunais e retorna um ZIP com uma pasta por tribunal."""
+    if 'file' not in request.files:
+        return jsonify({'error': 'Nenhum arquivo enviado'}), 400
+    
+    file = request.files['file']
+    
+    if not file.filename.lower().endswith('.pdf'):
+        return jsonify({'error': 'Arquivo deve ser PDF'}), 400
+    
+    try:
+        tribunals = parse_tribunals(request.form.get('tribunals', ''))
+        options = _split_options(request.form)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Streams de objetos seguem os tribunais, a menos que o formulário diga o contrário;
+    # as imagens são otimizadas para o menor limite entre eles
+    options['object_streams'] = _form_flag(
+        request.form.get('object_streams'),
+        all(TRIBUNAIS_DEFAULTS[key]['object_streams'] for key in tribunals)
+    )
+    targets = tribunal_targets(tribunals)
+    options['max_size_mb'] = min(target['max_size_mb'] for target in targets.values())
+    
+    tmp_path, _sha256 = _spool_upload(file)
+    base_name = os.path.splitext(secure_filename(file.filename))[0]
+    splitter = None
+    
+    try:
+        splitter = PDFSplitter(tmp_path, object_streams=options['object_streams'])
+        INPUT_BYTES.inc(os.path.getsize(tmp_path))
+        _optimize_images(splitter, options)
         
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            part_num = 1
-            current_start = 0
-            
-            while current_start < total_pages:
-                writer = PdfWriter()
-                current_page = current_start
-                
-                while current_page < total_pages:
-                    # Verifica limite de páginas
-                    if max_pages and (current_page - current_start) >= max_pages:
-                        break
-                    
-                    writer.add_page(reader.pages[current_page])
-                    
-                    # Verifica tamanho
-                    temp_buffer = io.BytesIO()
-                    writer.write(temp_buffer)
-                    
-                    if temp_buffer.tell() > max_size_bytes and current_page > current_start:
-                        # Remove última página
-                        writer = PdfWriter()
-                        for i in range(current_start, current_page):
-                            writer.add_page(reader.pages[i])
-                        break
-                    
-                    current_page += 1
-                
-                # Salva parte no ZIP
-                output_buffer = io.BytesIO()
-                writer.write(output_buffer)
-                
-                filename = f"{base_name}_parte_{part_num:03d}_pag_{current_start + 1}-{current_page}.pdf"
-                zip_file.writestr(filename, output_buffer.getvalue())
-                
-                current_start = current_page
-                part_num += 1
+        # Um único índice para todos os tribunais; partes iguais são geradas uma só vez
+        def entries():
+            for tribunal, parts in splitter.iter_targets(targets):
+                for part_num, (start_page, end_page), buffer in parts:
+                    data = buffer.getvalue()
+                    PAGES_PROCESSED.inc(end_page - start_page)
+                    OUTPUT_BYTES.inc(len(data))
+                    yield (
+                        f"{tribunal}/{base_name}_parte_{part_num:03d}_pag_{start_page + 1}-{end_page}.pdf",
+                        data
+                    )
         
-        zip_buffer.seek(0)
+        zip_chunks = iter_zip(entries(), options['compression'])
         
-        return send_file(
-            zip_buffer,
-            mimetype='application/zip',
-            as_attachment=True,
-            download_name=f'{base_name}_dividido.zip'
-        )
+        # Gera a primeira parte antes de responder, para que erros de leitura
+        # do PDF ainda possam ser devolvidos como JSON
+        first_chunk = next(zip_chunks)
     
     except Exception as e:
+        if splitter is not None:
+            splitter.close()
+        os.unlink(tmp_path)
         return jsonify({'error': str(e)}), 500
+    
+    return Response(
+        _stream_zip(first_chunk, zip_chunks, splitter, tmp_path),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename={base_name}_tribunais.zip'}
+    )
+
+
+@app.route('/api/extract', methods=['POST'])
+@_profiled
+def extract_pages():
+    """Extrai as páginas selecionadas ('ranges', ex.: "1-3, 10, 250-300") em um único PDF."""
+    if 'file' not in request.files:
+        return jsonify({'error': 'Nenhum arquivo enviado'}), 400
+    
+    file = request.files['file']
+    
+    if not file.filename.lower().endswith('.pdf'):
+        return jsonify({'error': 'Arquivo deve ser PDF'}), 400
+    
+    ranges = request.form.get('ranges', '')
+    if not ranges.strip():
+        return jsonify({'error': 'Informe as páginas em ranges (ex.: 1-3, 10, 250-300)'}), 400
+    object_streams = _form_flag(request.form.get('object_streams'), False)
+    
+    tmp_path, _sha256 = _spool_upload(file)
+    base_name = os.path.splitext(secure_filename(file.filename))[0]
+    
+    try:
+        with PDFSplitter(tmp_path, object_streams=object_streams) as splitter:
+            try:
+                pages = parse_page_ranges(ranges, splitter.total_pages)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            INPUT_BYTES.inc(os.path.getsize(tmp_path))
+            # Só as páginas selecionadas são lidas, pela árvore de páginas
+            data = splitter.extract(ranges).getvalue()
+        PAGES_PROCESSED.inc(len(pages))
+        OUTPUT_BYTES.inc(len(data))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        os.unlink(tmp_path)
+    
+    selection = format_page_ranges(pages).replace(',', '_')
+    return Response(
+        data,
+        mimetype='application/pdf',
+        headers={'Content-Disposition': f'attachment; filename={base_name}_paginas_{selection}.pdf'}
+    )
+
+
+def _count_parts(parts):
+    """Repassa as partes (página inicial, página final, conteúdo) contando páginas e bytes gerados."""
+    for start_page, end_page, data in parts:
+        PAGES_PROCESSED.inc(end_page - start_page)
+        OUTPUT_BYTES.inc(len(data))
+        yield start_page, end_page, data
+
+
+def _named_entries(parts, base_name: str):
+    """Nomeia as partes (página inicial, página final, conteúdo) para o ZIP."""
+    for part_num, (start_page, end_page, data) in enumerate(parts, start=1):
+        yield f"{base_name}_parte_{part_num:03d}_pag_{start_page + 1}-{end_page}.pdf", data
+
+
+def _cache_parts(parts, writer):
+    """Repassa as partes gravando-as no cache; publica só se todas forem geradas."""
+    try:
+        for start_page, end_page, data in parts:
+            writer.add(start_page, end_page, data)
+            yield start_page, end_page, data
+        writer.commit()
+    finally:
+        writer.discard()
+
+
+def _stream_zip(first_chunk: bytes, zip_chunks, splitter: PDFSplitter, tmp_path: str):
+    """Envia o ZIP parte a parte e remove o upload temporário ao final."""
+    try:
+        yield first_chunk
+        yield from zip_chunks
+    finally:
+        zip_chunks.close()
+        splitter.close()
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Enfileira a divisão de um PDF e retorna o identificador do job."""
+    if 'file' not in request.files:
+        return jsonify({'error': 'Nenhum arquivo enviado'}), 400
+    
+    file = request.files['file']
+    
+    if not file.filename.lower().endswith('.pdf'):
+        return jsonify({'error': 'Arquivo deve ser PDF'}), 400
+    
+    try:
+        options = _split_options(request.form)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # O arquivo temporário passa a pertencer ao job, que o remove ao terminar
+    tmp_path, _sha256 = _spool_upload(file)
+    base_name = os.path.splitext(secure_filename(file.filename))[0]
+    
+    try:
+        job = job_backend.submit(tmp_path, base_name, options)
+    except QueueFull as e:
+        os.unlink(tmp_path)
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = str(JOBS_RETRY_AFTER)
+        return response, 429
+    
+    body = job.to_dict()
+    body['status_url'] = url_for('get_job', job_id=job.id)
+    body['result_url'] = url_for('get_job_result', job_id=job.id)
+    return jsonify(body), 202, {'Location': body['status_url']}
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Retorna o estado e o progresso de um job."""
+    job = job_backend.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancela um job na fila ou em execução, descartando as partes já geradas."""
+    job = job_backend.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    return jsonify(job.to_dict()), 202
+
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """Retorna o ZIP gerado por um job concluído."""
+    job = job_backend.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    if job.status == JOB_ERROR:
+        return jsonify({'error': job.error, 'status': job.status}), 500
+    if job.status == JOB_CANCELLED:
+        return jsonify({'error': 'Job cancelado', 'status': job.status}), 410
+    if job.status != JOB_DONE:
+        return jsonify({'error': 'Job ainda em processamento', 'status': job.status}), 409
+    
+    return send_file(
+        job.result_path,
+        mimetype='application/zip',
+        as_attachment=True,
+        download_name=f"{job.base_name}_dividido.zip"
+    )
 
 
 @app.route('/health', methods=['GET'])
@@ -729,6 +1263,12 @@ def health():
     return jsonify({'status': 'ok'})
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Métricas do processo no formato de texto do Prometheus."""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
 # Para execução local
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
@@ -6,11 +6,13 @@ Cliente: RODOVALHO ADVOGADOS
 """
 
 import streamlit as st
+import hashlib
 import os
+import shutil
 import tempfile
-import zipfile
-import io
 from pdf_splitter import PDFSplitter
+from result_cache import ResultCache, cache_key, iter_cached_parts, normalize_params
+from zip_stream import iter_zip
 
 # Configuração da página
 st.set_page_config(
@@ -359,19 +361,193 @@ def render_info_card(info: dict):
             <span class="info-label">Tamanho</span>
             <span class="info-value">{info['tamanho_mb']} MB</span>
         </div>
+        <div class="info-item">
+            <span class="info-label">Versão do PDF</span>
+            <span class="info-value">{info.get('versao') or '-'}</span>
+        </div>
     </div>
     """, unsafe_allow_html=True)
 
 
-def create_zip_from_files(files: list) -> bytes:
-    """Cria um arquivo ZIP com os PDFs gerados."""
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for file_path in files:
-            if os.path.exists(file_path):
-                zip_file.write(file_path, os.path.basename(file_path))
-    zip_buffer.seek(0)
-    return zip_buffer.getvalue()
+# Opções de compressão do ZIP exibidas na interface
+COMPRESSION_OPTIONS = {
+    "auto": "Automática (recomendado)",
+    "stored": "Sem compressão (mais rápido)",
+    "deflated": "Sempre comprimir",
+}
+
+# Resultados de divisões já feitas (configurado por variáveis de ambiente)
+result_cache = ResultCache()
+
+
+def create_zip_from_parts(entries: list, compression: str = "auto") -> bytes:
+    """Cria um arquivo ZIP com os PDFs gerados (pares nome, conteúdo)."""
+    return b''.join(iter_zip(entries, compression))
+
+
+def progress_reporter(total_pages: int):
+    """
+    Cria uma barra de progresso e a função que a atualiza durante a divisão.
+    
+    Args:
+        total_pages: Total de páginas do documento
+    
+    Returns:
+        Tupla (barra de progresso, função de progresso para o PDFSplitter)
+    """
+    bar = st.progress(0.0, text="Processando documento...")
+    last_percent = [-1]
+    
+    def report(pages_done: int, bytes_written: int, parts_done: int) -> None:
+        # Atualiza só quando o percentual muda, para não sobrecarregar a interface
+        percent = pages_done * 100 // max(total_pages, 1)
+        if percent != last_percent[0]:
+            last_percent[0] = percent
+            bar.progress(
+                percent / 100,
+                text=(
+                    f"Processando página {pages_done} de {total_pages} "
+                    f"({parts_done} arquivo(s), {bytes_written / (1024 * 1024):.2f} MB)"
+                )
+            )
+    
+    return bar, report
+
+
+def split_with_cache(key: str, generate_parts, total_pages: int) -> tuple:
+    """
+    Devolve as partes guardadas no cache ou gera e guarda novas partes.
+    
+    Args:
+        key: Chave do resultado (hash do PDF e parâmetros)
+        generate_parts: Função que recebe a função de progresso e gera as
+            partes (início, fim, buffer)
+        total_pages: Total de páginas do documento, para a barra de progresso
+    
+    Returns:
+        Tupla (lista de partes (início, fim, conteúdo), veio do cache)
+    """
+    cached = result_cache.get(key)
+    if cached is not None:
+        return list(iter_cached_parts(cached)), True
+    
+    bar, report = progress_reporter(total_pages)
+    parts = [
+        (start_page, end_page, buffer.getvalue())
+        for start_page, end_page, buffer in generate_parts(report)
+    ]
+    bar.empty()
+    result_cache.put(key, parts)
+    return parts, False
+
+
+def render_plan_preview(plan: list):
+    """Mostra a prévia da divisão planejada, sem gerar nenhum arquivo."""
+    if not plan:
+        return
+    
+    sizes_mb = [part['tamanho_estimado_bytes'] / (1024 * 1024) for part in plan]
+    st.info(
+        f"📊 Prévia: {len(plan)} arquivo(s) serão gerados, "
+        f"de {min(sizes_mb):.2f} a {max(sizes_mb):.2f} MB (estimado)"
+    )
+    
+    with st.expander("🔎 Ver partes planejadas"):
+        for part, size_mb in zip(plan, sizes_mb):
+            st.markdown(
+                f"- Parte {part['parte']:03d}: páginas {part['pagina_inicial']}-{part['pagina_final']} "
+                f"(~{size_mb:.2f} MB)"
+            )
+
+
+def render_split_result(parts: list, base_name: str, compression: str, from_cache: bool):
+    """Mostra o resultado da divisão com o botão de download do ZIP."""
+    entries = [
+        (f"{base_name}_parte_{part_num:03d}_paginas_{start_page + 1}-{end_page}.pdf", data)
+        for part_num, (start_page, end_page, data) in enumerate(parts, start=1)
+    ]
+    
+    if from_cache:
+        st.success(f"✅ {len(entries)} arquivo(s) recuperado(s) de uma divisão anterior!")
+    else:
+        st.success(f"✅ {len(entries)} arquivo(s) gerado(s) com sucesso!")
+    
+    # Cria ZIP para download
+    zip_data = create_zip_from_parts(entries, compression)
+    
+    st.download_button(
+        label="📥 Baixar todos os arquivos (ZIP)",
+        data=zip_data,
+        file_name=f"{base_name}_dividido.zip",
+        mime="application/zip",
+        use_container_width=True
+    )
+    
+    # Lista arquivos gerados
+    with st.expander("📁 Ver arquivos gerados"):
+        for fname, data in entries:
+            fsize = len(data) / (1024 * 1024)
+            st.markdown(f"- `{fname}` ({fsize:.2f} MB)")
+
+
+def release_document():
+    """Fecha o documento guardado na sessão e remove o seu arquivo temporário."""
+    document = st.session_state.pop("document", None)
+    if document is not None:
+        document["splitter"].close()
+        if os.path.exists(document["tmp_path"]):
+            os.unlink(document["tmp_path"])
+
+
+def load_document(uploaded_file) -> dict:
+    """
+    Retorna o documento aberto para o upload atual, guardado na sessão.
+    
+    O Streamlit reexecuta o script a cada interação; o PDF só é gravado em
+    disco, aberto e analisado de novo quando o conteúdo do upload muda (o
+    índice de objetos construído sob demanda também é reaproveitado).
+    
+    Args:
+        uploaded_file: Arquivo enviado pelo st.file_uploader
+    
+    Returns:
+        Dicionário com splitter, sha256, info e tmp_path
+    """
+    # Identifica o upload sem reler o conteúdo a cada reexecução
+    upload_id = getattr(uploaded_file, "file_id", None) or (uploaded_file.name, uploaded_file.size)
+    document = st.session_state.get("document")
+    if document is not None and document["upload_id"] == upload_id:
+        return document
+    
+    sha256 = hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
+    if document is not None and document["sha256"] == sha256:
+        document["upload_id"] = upload_id
+        return document
+    
+    # Upload novo: descarta o anterior antes de abrir este
+    release_document()
+    
+    # Salva arquivo temporário, mapeado em memória pelo PDFSplitter
+    uploaded_file.seek(0)
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
+        shutil.copyfileobj(uploaded_file, tmp_file)
+        tmp_path = tmp_file.name
+    
+    try:
+        splitter = PDFSplitter(tmp_path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    
+    document = {
+        "upload_id": upload_id,
+        "sha256": sha256,
+        "splitter": splitter,
+        "info": splitter.get_info(),
+        "tmp_path": tmp_path
+    }
+    st.session_state["document"] = document
+    return document
 
 
 def main():
@@ -389,16 +565,14 @@ def main():
     )
     
     if uploaded_file is not None:
-        # Salva arquivo temporário
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            tmp_path = tmp_file.name
+        base_name = os.path.splitext(uploaded_file.name)[0]
         
         try:
-            # Cria o divisor
-            splitter = PDFSplitter(tmp_path)
-            info = splitter.get_info()
-            info['arquivo'] = uploaded_file.name
+            # Documento aberto uma única vez por upload e reaproveitado nas reexecuções
+            document = load_document(uploaded_file)
+            splitter = document['splitter']
+            sha256 = document['sha256']
+            info = dict(document['info'], arquivo=uploaded_file.name)
             
             # Mostra informações
             render_info_card(info)
@@ -408,6 +582,14 @@ def main():
             # Opções de divisão
             st.markdown("### ✂️ Configuração da Divisão")
             
+            compression = st.selectbox(
+                "Compressão do ZIP",
+                options=list(COMPRESSION_OPTIONS),
+                format_func=COMPRESSION_OPTIONS.get,
+                help="PDFs geralmente já são comprimidos; a opção automática só comprime quando há ganho.",
+                key="compression_select"
+            )
+            
             tab1, tab2 = st.tabs(["📄 Por Páginas", "📦 Por Tamanho"])
             
             with tab1:
@@ -427,34 +609,16 @@ def main():
                     key="pages_input"
                 )
                 
-                estimated_files = (info['total_paginas'] + pages_per_file - 1) // pages_per_file
-                st.info(f"📊 Estimativa: {estimated_files} arquivo(s) serão gerados")
+                render_plan_preview(splitter.plan(pages_per_file=pages_per_file))
                 
                 if st.button("✂️ Dividir por Páginas", key="split_pages", use_container_width=True):
-                    with st.spinner("Processando documento..."):
-                        # Cria diretório temporário
-                        with tempfile.TemporaryDirectory() as tmp_dir:
-                            files = splitter.split_by_pages(pages_per_file, tmp_dir)
-                            
-                            st.success(f"✅ {len(files)} arquivo(s) gerado(s) com sucesso!")
-                            
-                            # Cria ZIP para download
-                            zip_data = create_zip_from_files(files)
-                            
-                            st.download_button(
-                                label="📥 Baixar todos os arquivos (ZIP)",
-                                data=zip_data,
-                                file_name=f"{os.path.splitext(uploaded_file.name)[0]}_dividido.zip",
-                                mime="application/zip",
-                                use_container_width=True
-                            )
-                            
-                            # Lista arquivos gerados
-                            with st.expander("📁 Ver arquivos gerados"):
-                                for f in files:
-                                    fname = os.path.basename(f)
-                                    fsize = os.path.getsize(f) / (1024 * 1024)
-                                    st.markdown(f"- `{fname}` ({fsize:.2f} MB)")
+                    key = cache_key(sha256, normalize_params(pages_per_file=pages_per_file))
+                    parts, from_cache = split_with_cache(
+                        key,
+                        lambda progress: splitter.iter_page_parts(pages_per_file, progress),
+                        info['total_paginas']
+                    )
+                    render_split_result(parts, base_name, compression, from_cache)
             
             with tab2:
                 st.markdown("""
@@ -477,44 +641,26 @@ def main():
                 if info['tamanho_mb'] <= max_size_mb:
                     st.warning(f"⚠️ O arquivo já é menor que {max_size_mb} MB. Não será necessário dividir.")
                 else:
-                    estimated_files_size = int(info['tamanho_mb'] / max_size_mb) + 1
-                    st.info(f"📊 Estimativa: aproximadamente {estimated_files_size} arquivo(s)")
+                    render_plan_preview(splitter.plan(max_size_mb=max_size_mb))
                 
                 if st.button("✂️ Dividir por Tamanho", key="split_size", use_container_width=True):
-                    with st.spinner("Processando documento..."):
-                        # Cria diretório temporário
-                        with tempfile.TemporaryDirectory() as tmp_dir:
-                            files = splitter.split_by_size(max_size_mb, tmp_dir)
-                            
-                            st.success(f"✅ {len(files)} arquivo(s) gerado(s) com sucesso!")
-                            
-                            # Cria ZIP para download
-                            zip_data = create_zip_from_files(files)
-                            
-                            st.download_button(
-                                label="📥 Baixar todos os arquivos (ZIP)",
-                                data=zip_data,
-                                file_name=f"{os.path.splitext(uploaded_file.name)[0]}_dividido.zip",
-                                mime="application/zip",
-                                use_container_width=True
-                            )
-                            
-                            # Lista arquivos gerados
-                            with st.expander("📁 Ver arquivos gerados"):
-                                for f in files:
-                                    fname = os.path.basename(f)
-                                    fsize = os.path.getsize(f) / (1024 * 1024)
-                                    st.markdown(f"- `{fname}` ({fsize:.2f} MB)")
+                    key = cache_key(sha256, normalize_params(max_size_mb=max_size_mb))
+                    parts, from_cache = split_with_cache(
+                        key,
+                        lambda progress: splitter.iter_size_parts(
+                            max_size_mb * 1024 * 1024, progress=progress
+                        ),
+                        info['total_paginas']
+                    )
+                    render_split_result(parts, base_name, compression, from_cache)
         
         except Exception as e:
             st.error(f"❌ Erro ao processar o arquivo: {str(e)}")
-        
-        finally:
-            # Remove arquivo temporário
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
     
     else:
+        # Upload removido: libera o documento da sessão
+        release_document()
+        
         # Estado vazio - instruções
         st.markdown("""
         <div class="info-card">
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Divisão em lote de vários PDFs.
+
+Aceita arquivos, diretórios e padrões glob, divide os PDFs em um pool de
+processos e registra cada resultado em um manifesto JSONL. Em uma nova
+execução, os arquivos cujo conteúdo (SHA-256) e parâmetros já constam como
+concluídos no manifesto são ignorados.
+"""
+
+import contextlib
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from pdf_splitter import PDFSplitter
+
+
+# Tamanho dos blocos lidos ao calcular o hash dos arquivos
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Nome do manifesto criado no diretório de saída
+MANIFEST_NAME = 'manifest.jsonl'
+
+
+def file_sha256(path: str) -> str:
+    """
+    Calcula o SHA-256 do conteúdo de um arquivo.
+
+    Args:
+        path: Caminho do arquivo
+
+    Returns:
+        Hash em hexadecimal
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def params_key(params: dict) -> str:
+    """Serializa os parâmetros da divisão de forma estável, para comparação."""
+    return json.dumps(params, sort_keys=True)
+
+
+def _glob_base(pattern: str) -> str:
+    """Diretório inicial de um padrão glob: os componentes antes do primeiro curinga."""
+    base = []
+    for part in pattern.replace(os.sep, '/').split('/'):
+        if glob.has_magic(part):
+            break
+        base.append(part)
+    return '/'.join(base) or os.curdir
+
+
+def collect_inputs(sources: List[str]) -> List[Tuple[str, str]]:
+    """
+    Expande arquivos, diretórios e padrões glob em uma lista de PDFs.
+
+    O nome relativo de cada PDF parte da entrada de onde ele veio: do
+    diretório informado, do diretório inicial do padrão glob (antes do
+    primeiro curinga) ou, para um arquivo, só o seu nome. Assim, dir1/a.pdf
+    e dir2/a.pdf de um mesmo padrão não gravam no mesmo subdiretório, e o
+    nome não muda quando outras entradas são acrescentadas ao lote.
+
+    Args:
+        sources: Caminhos de arquivos, diretórios (percorridos
+            recursivamente) ou padrões glob
+
+    Returns:
+        Lista de tuplas (caminho do PDF, nome relativo usado na saída), sem
+        repetições e na ordem em que foram encontrados
+    """
+    inputs = []
+    seen = set()
+
+    def add(path: str, name: str) -> None:
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            inputs.append((path, name))
+
+    for source in sources:
+        if os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                for filename in sorted(files):
+                    if filename.lower().endswith('.pdf'):
+                        path = os.path.join(root, filename)
+                        add(path, os.path.relpath(path, source))
+        elif glob.has_magic(source):
+            base = _glob_base(source)
+            for path in sorted(glob.glob(source, recursive=True)):
+                if os.path.isfile(path) and path.lower().endswith('.pdf'):
+                    add(path, os.path.relpath(path, base))
+        elif os.path.isfile(source):
+            add(source, os.path.basename(source))
+        else:
+            raise FileNotFoundError(f"Arquivo não encontrado: {source}")
+
+    return inputs
+
+
+def output_dirs(inputs: List[Tuple[str, str]], output_dir: str) -> List[str]:
+    """
+    Escolhe o subdiretório de saída de cada PDF do lote.
+
+    Nomes que ainda coincidem sem a extensão (a.pdf e a.PDF, ou arquivos de
+    mesmo nome informados um a um) recebem um sufixo numérico (a_2, a_3...).
+
+    Args:
+        inputs: Tuplas (caminho do PDF, nome relativo) de collect_inputs
+        output_dir: Diretório de saída do lote
+
+    Returns:
+        Caminho do subdiretório de cada PDF, na mesma ordem
+    """
+    dirs = []
+    used = set()
+    for _, name in inputs:
+        base = os.path.splitext(name)[0]
+        candidate = base
+        suffix = 2
+        while os.path.normcase(candidate) in used:
+            candidate = f"{base}_{suffix}"
+            suffix += 1
+        used.add(os.path.normcase(candidate))
+        dirs.append(os.path.join(output_dir, candidate))
+    return dirs
+
+
+def iter_manifest(path: str) -> Iterator[Dict]:
+    """Lê os registros de um manifesto, ignorando linhas incompletas de execuções interrompidas."""
+    with open(path, encoding='utf-8') as manifest:
+        for line in manifest:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+class BatchManifest:
+    """Manifesto JSONL com o resultado de cada arquivo processado."""
+
+    def __init__(self, path: str):
+        """
+        Carrega o manifesto existente, se houver.
+
+        Args:
+            path: Caminho do arquivo JSONL
+        """
+        self.path = path
+        self.done: Dict[Tuple[str, str, str], List[str]] = {}
+
+        if os.path.exists(path):
+            for record in iter_manifest(path):
+                self._add(record)
+
+    def _add(self, record: dict) -> None:
+        """Guarda as partes de um registro concluído, por conteúdo, parâmetros e saída."""
+        if record.get('status') == 'concluido':
+            output_dir = os.path.normpath(record['saida'])
+            self.done[(record['sha256'], params_key(record['parametros']), output_dir)] = record['partes']
+
+    def is_done(self, sha256: str, params: dict, output_dir: str) -> bool:
+        """
+        Indica se o conteúdo já foi dividido com os mesmos parâmetros em output_dir.
+
+        As partes listadas no manifesto precisam continuar no disco; se
+        alguma foi apagada, o arquivo é dividido de novo.
+        """
+        parts = self.done.get((sha256, params_key(params), os.path.normpath(output_dir)))
+        if parts is None:
+            return False
+        return all(os.path.isfile(os.path.join(output_dir, part)) for part in parts)
+
+    def record(self, record: dict) -> None:
+        """Acrescenta um resultado ao manifesto e o grava imediatamente."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(self.path, 'a', encoding='utf-8') as manifest:
+            manifest.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+        self._add(record)
+
+
+def split_file(
+    input_pdf: str, output_dir: str, params: dict, sha256: Optional[str] = None
+) -> dict:
+    """
+    Divide um PDF conforme os parâmetros do lote.
+
+    Executada nos processos do pool; erros são devolvidos no registro em
+    vez de interromper o lote.
+
+    Args:
+        input_pdf: Caminho do PDF
+        output_dir: Diretório de saída das partes deste PDF
+        params: Parâmetros da divisão ('paginas' ou 'tamanho_mb', 'estrategia',
+            'streams_de_objetos', 'otimizar_imagens')
+        sha256: Hash do conteúdo, se já calculado
+
+    Returns:
+        Registro do manifesto para o arquivo
+    """
+    started = time.perf_counter()
+    record = {
+        'arquivo': input_pdf,
+        'parametros': params,
+        'saida': output_dir,
+        'data': datetime.now(timezone.utc).isoformat(timespec='seconds')
+    }
+
+    try:
+        record['sha256'] = sha256 or file_sha256(input_pdf)
+
+        # As mensagens de cada parte ficam de fora da saída do lote
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            with PDFSplitter(
+                input_pdf, object_streams=params.get('streams_de_objetos', False)
+            ) as splitter:
+                record['total_paginas'] = splitter.total_pages
+                images = params.get('otimizar_imagens')
+                if images:
+                    # O lote já usa um processo por arquivo
+                    report = splitter.optimize_images(
+                        max_dpi=images['dpi_maximo'],
+                        quality=images['qualidade_jpeg'],
+                        max_page_mb=params.get('tamanho_mb'),
+                        workers=1
+                    )
+                    record['imagens'] = report
+                if params.get('paginas'):
+                    files = splitter.split_by_pages(params['paginas'], output_dir)
+                else:
+                    files = splitter.split_by_size(
+                        params['tamanho_mb'], output_dir, strategy=params.get('estrategia', 'greedy')
+                    )
+
+        record['status'] = 'concluido'
+        record['partes'] = [os.path.basename(path) for path in files]
+    except Exception as e:
+        record['status'] = 'erro'
+        record['erro'] = str(e)
+
+    record['tempo_s'] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def run_batch(
+    sources: List[str],
+    output_dir: str,
+    params: dict,
+    jobs: int = 1,
+    manifest_path: Optional[str] = None,
+    on_result: Optional[Callable[[int, int, dict], None]] = None
+) -> List[dict]:
+    """
+    Divide vários PDFs, um por processo do pool.
+
+    Cada PDF é gravado em um subdiretório de output_dir com o seu nome
+    relativo à entrada de onde veio (ver collect_inputs e output_dirs). Os
+    resultados são gravados no manifesto assim que cada arquivo termina, de
+    forma que um lote interrompido pode ser retomado.
+
+    Args:
+        sources: Arquivos, diretórios ou padrões glob
+        output_dir: Diretório de saída
+        params: Parâmetros da divisão ('paginas' ou 'tamanho_mb', 'estrategia',
+            'streams_de_objetos', 'otimizar_imagens')
+        jobs: Número de processos (0 usa todos os núcleos disponíveis)
+        manifest_path: Caminho do manifesto (padrão: output_dir/manifest.jsonl)
+        on_result: Função chamada a cada arquivo com (posição, total, registro)
+
+    Returns:
+        Lista com o registro de cada arquivo, na ordem em que terminaram
+    """
+    if jobs < 0:
+        raise ValueError("Número de processos não pode ser negativo")
+
+    inputs = collect_inputs(sources)
+    manifest = BatchManifest(manifest_path or os.path.join(output_dir, MANIFEST_NAME))
+    jobs = jobs or os.cpu_count() or 1
+
+    tasks = list(zip([input_pdf for input_pdf, _ in inputs], output_dirs(inputs, output_dir)))
+    results = []
+
+    def finish(record: dict) -> None:
+        if record['status'] != 'ignorado':
+            manifest.record(record)
+        results.append(record)
+        if on_result:
+            on_result(len(results), len(tasks), record)
+
+    # O hash é calculado antes, para não enviar ao pool o que já está pronto
+    pending = []
+    for input_pdf, part_dir in tasks:
+        try:
+            sha256 = file_sha256(input_pdf)
+        except OSError as e:
+            finish({'arquivo': input_pdf, 'parametros': params, 'status': 'erro', 'erro': str(e)})
+            continue
+        if manifest.is_done(sha256, params, part_dir):
+            finish({'arquivo': input_pdf, 'sha256': sha256, 'parametros': params, 'status': 'ignorado'})
+        else:
+            pending.append((input_pdf, part_dir, sha256))
+
+    if jobs == 1 or len(pending) <= 1:
+        for input_pdf, part_dir, sha256 in pending:
+            finish(split_file(input_pdf, part_dir, params, sha256))
+        return results
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as executor:
+        futures = [
+            executor.submit(split_file, input_pdf, part_dir, params, sha256)
+            for input_pdf, part_dir, sha256 in pending
+        ]
+        for future in as_completed(futures):
+            finish(future.result())
+
+    return results
@@ -0,0 +1,37 @@
+"""
+Benchmark de /api/split pelo cliente de testes do Flask.
+
+Mede o caminho completo da API: upload, divisão por tamanho e envio do
+ZIP em streaming, que é consumido por inteiro a cada rodada.
+"""
+
+import io
+
+import pytest
+
+from api.index import app
+
+# Número aproximado de partes desejado
+SIZE_PARTS = 8
+
+
+@pytest.fixture(scope='module')
+def client():
+    return app.test_client()
+
+
+def bench_api_split(measure, corpus, client):
+    with open(corpus['path'], 'rb') as source:
+        data = source.read()
+    max_size_mb = corpus['size_bytes'] / (1024 * 1024) / SIZE_PARTS
+
+    def run():
+        response = client.post('/api/split', data={
+            'file': (io.BytesIO(data), 'documento.pdf'),
+            'max_size_mb': str(max_size_mb)
+        }, content_type='multipart/form-data')
+        body = response.get_data()
+        assert response.status_code == 200, body[:200]
+        return len(body)
+
+    assert measure(run, corpus['pages'], corpus['size_bytes'])
@@ -0,0 +1,98 @@
+"""
+Benchmarks da divisão em arquivos (split_by_pages e split_by_size) e da
+extração de páginas (extract).
+
+Cada rodada abre o PDF de novo, como faz o CLI, de forma que o tempo
+inclui a leitura da origem e a construção do índice de objetos. A
+extração não constrói o índice: o seu tempo deve acompanhar o número de
+páginas extraídas, e não o tamanho do documento (o que
+bench_extract_reads_few_objects confere contando os objetos lidos).
+"""
+
+import shutil
+
+from PyPDF2 import PdfReader
+
+import page_tree
+from corpora import build_corpus
+from pdf_splitter import PDFSplitter
+
+# Páginas por parte em split_by_pages
+PAGES_PER_FILE = 50
+
+# Número aproximado de partes desejado em split_by_size
+SIZE_PARTS = 8
+
+# Objetos que a árvore de páginas pode ler para localizar poucas páginas
+MAX_TREE_READS = 20
+
+
+def _clean(output_dir):
+    """Remove as partes da rodada anterior antes de cada rodada."""
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def bench_split_by_pages(measure, corpus, tmp_path):
+    output_dir = str(tmp_path / 'output')
+
+    def run():
+        with PDFSplitter(corpus['path']) as splitter:
+            return splitter.split_by_pages(PAGES_PER_FILE, output_dir)
+
+    files = measure(
+        run, corpus['pages'], corpus['size_bytes'],
+        setup=lambda: _clean(output_dir)
+    )
+    assert files
+
+
+def bench_split_by_size(measure, corpus, tmp_path):
+    output_dir = str(tmp_path / 'output')
+    max_size_mb = corpus['size_bytes'] / (1024 * 1024) / SIZE_PARTS
+
+    def run():
+        with PDFSplitter(corpus['path']) as splitter:
+            return splitter.split_by_size(max_size_mb, output_dir)
+
+    files = measure(
+        run, corpus['pages'], corpus['size_bytes'],
+        setup=lambda: _clean(output_dir)
+    )
+    assert files
+
+
+def bench_extract(measure, corpus):
+    # Páginas do início, do meio e do fim do documento
+    ranges = f"1-2, {corpus['pages'] // 2}, {corpus['pages']}"
+
+    def run():
+        with PDFSplitter(corpus['path']) as splitter:
+            return splitter.extract(ranges)
+
+    buffer = measure(run, corpus['pages'], corpus['size_bytes'])
+    assert buffer.getbuffer().nbytes
+
+
+def bench_extract_reads_few_objects(corpus_dir, monkeypatch):
+    # Árvore plana com milhares de páginas: cada página é acessada pela posição
+    path = build_corpus('large', corpus_dir)
+    reads = []
+
+    def counting_read(source, offset, idnum):
+        reads.append(idnum)
+        return read_raw_object(source, offset, idnum)
+
+    def counting_get_object(reader, indirect_reference):
+        reads.append(indirect_reference)
+        return get_object(reader, indirect_reference)
+
+    read_raw_object = page_tree.read_raw_object
+    get_object = PdfReader.get_object
+    with PDFSplitter(path) as splitter:
+        monkeypatch.setattr(page_tree, 'read_raw_object', counting_read)
+        monkeypatch.setattr(PdfReader, 'get_object', counting_get_object)
+        tree = splitter.page_tree
+        for page_num in (0, 1, 2, splitter.total_pages - 1):
+            tree.page_ref(page_num)
+
+    assert len(reads) <= MAX_TREE_READS, f"{len(reads)} objetos lidos para 4 páginas"
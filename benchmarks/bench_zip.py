@@ -0,0 +1,39 @@
+"""
+Benchmark da criação do ZIP a partir de partes já geradas.
+
+As partes são geradas uma única vez por corpus; a rodada mede apenas o
+iter_zip em cada política de compressão.
+"""
+
+import os
+
+import pytest
+
+from pdf_splitter import PDFSplitter
+from zip_stream import COMPRESSION_POLICIES, iter_zip
+
+# Páginas por parte
+PAGES_PER_FILE = 50
+
+
+@pytest.fixture
+def parts(corpus, tmp_path):
+    """Conteúdo das partes do corpus, divididas por número de páginas."""
+    with PDFSplitter(corpus['path']) as splitter:
+        files = splitter.split_by_pages(PAGES_PER_FILE, str(tmp_path))
+
+    contents = []
+    for file_path in files:
+        with open(file_path, 'rb') as part:
+            contents.append((os.path.basename(file_path), part.read()))
+    return contents
+
+
+@pytest.mark.parametrize('compression', COMPRESSION_POLICIES)
+def bench_zip(measure, corpus, parts, compression):
+    parts_size = sum(len(data) for _name, data in parts)
+
+    def run():
+        return sum(len(chunk) for chunk in iter_zip(parts, compression))
+
+    assert measure(run, corpus['pages'], parts_size)
@@ -0,0 +1,109 @@
+"""
+Fixtures compartilhadas pelos benchmarks.
+
+Os corpora são gerados uma única vez e guardados no cache do pytest. Cada
+benchmark registra em extra_info as páginas por segundo, os MB por segundo
+e o pico de memória residente, que vão para o JSON salvo pelo
+pytest-benchmark (--benchmark-autosave) junto com os tempos.
+"""
+
+import os
+import resource
+import sys
+
+import pytest
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from corpora import CORPORA, build_corpus  # noqa: E402
+from pdf_probe import probe_pdf  # noqa: E402
+
+
+def _read_status_kb(field: str):
+    """Lê um campo em kB de /proc/self/status (apenas Linux)."""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss() -> bool:
+    """
+    Zera o pico de memória residente do processo (VmHWM).
+
+    Returns:
+        True se o pico pôde ser zerado; caso contrário o pico medido é o
+        de toda a vida do processo
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> float:
+    """Pico de memória residente do processo em MB."""
+    peak_kb = _read_status_kb('VmHWM')
+    if peak_kb is None:
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == 'darwin':
+            peak_kb //= 1024
+    return round(peak_kb / 1024, 2)
+
+
+@pytest.fixture(scope='session')
+def corpus_dir(request):
+    """Diretório persistente onde os corpora ficam guardados."""
+    return str(request.config.cache.mkdir('pdf_corpora'))
+
+
+@pytest.fixture(scope='session', params=sorted(CORPORA))
+def corpus(request, corpus_dir):
+    """PDF de cada corpus, com páginas e tamanho do arquivo."""
+    path = build_corpus(request.param, corpus_dir)
+    info = probe_pdf(path)
+    return {
+        'name': request.param,
+        'path': path,
+        'pages': info['total_paginas'],
+        'size_bytes': info['tamanho_bytes']
+    }
+
+
+@pytest.fixture
+def measure(benchmark):
+    """
+    Executa o benchmark e registra vazão e pico de memória.
+
+    Uso: measure(função, pages=..., size_bytes=..., setup=..., rounds=...)
+    """
+    def run(function, pages: int, size_bytes: int, setup=None, rounds: int = 3):
+        reset_peak_rss()
+        baseline_mb = peak_rss_mb()
+        result = benchmark.pedantic(function, setup=setup, rounds=rounds, iterations=1)
+
+        # Com --benchmark-disable não há tempos (execução só como teste de fumaça)
+        if benchmark.stats is None:
+            return result
+
+        mean = benchmark.stats.stats.mean
+        peak_mb = peak_rss_mb()
+        benchmark.extra_info.update({
+            'pages': pages,
+            'size_mb': round(size_bytes / (1024 * 1024), 2),
+            'pages_per_s': round(pages / mean, 1),
+            'mb_per_s': round(size_bytes / (1024 * 1024) / mean, 2),
+            'peak_rss_mb': peak_mb,
+            'peak_rss_delta_mb': round(peak_mb - baseline_mb, 2)
+        })
+        return result
+
+    return run
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Geração dos PDFs usados nos benchmarks.
+
+Cada corpus representa um formato de documento comum nos processos:
+texto puro, digitalizações (imagens), fontes embutidas compartilhadas,
+documentos muito longos e PDFs com atualizações incrementais. A geração é
+determinística, para que os resultados de versões diferentes sejam
+comparáveis.
+"""
+
+import io
+import os
+import random
+import re
+
+from PIL import Image
+from PyPDF2 import PdfReader
+from PyPDF2.generic import ArrayObject, DecodedStreamObject, IndirectObject, NameObject
+import reportlab
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from create_test_pdf import create_test_pdf
+
+
+# Alterar quando a geração mudar, para não reaproveitar corpora antigos
+CORPUS_VERSION = 1
+
+# Páginas do corpus de documento longo (pode ser reduzido via ambiente)
+LARGE_PAGES = int(os.environ.get('BENCH_LARGE_PAGES', 5000))
+
+# Fontes TrueType distribuídas com o ReportLab
+_FONTS_DIR = os.path.join(os.path.dirname(reportlab.__file__), 'fonts')
+_SHARED_FONTS = {
+    'Vera': 'Vera.ttf',
+    'VeraBd': 'VeraBd.ttf',
+    'VeraIt': 'VeraIt.ttf',
+    'VeraBI': 'VeraBI.ttf',
+}
+
+
+def create_image_pdf(filename: str, num_pages: int = 50, seed: int = 1) -> None:
+    """
+    Cria um PDF que simula digitalizações: uma imagem JPEG diferente por página.
+
+    Args:
+        filename: Nome do arquivo a ser criado
+        num_pages: Número de páginas a criar
+        seed: Semente do gerador de ruído
+    """
+    rng = random.Random(seed)
+    c = canvas.Canvas(filename, pagesize=A4)
+    width, height = A4
+
+    for _page_num in range(num_pages):
+        # Ruído em baixa resolução ampliado, parecido com papel digitalizado
+        noise = Image.frombytes('L', (425, 600), rng.randbytes(425 * 600))
+        scan = noise.resize((850, 1200))
+        jpeg = io.BytesIO()
+        scan.save(jpeg, 'JPEG', quality=70)
+        jpeg.seek(0)
+
+        c.drawImage(ImageReader(jpeg), 0, 0, width=width, height=height)
+        c.showPage()
+
+    c.save()
+
+
+def create_shared_font_pdf(filename: str, num_pages: int = 300) -> None:
+    """
+    Cria um PDF de texto com fontes TrueType embutidas usadas por todas as páginas.
+
+    Args:
+        filename: Nome do arquivo a ser criado
+        num_pages: Número de páginas a criar
+    """
+    for name, font_file in _SHARED_FONTS.items():
+        pdfmetrics.registerFont(TTFont(name, os.path.join(_FONTS_DIR, font_file)))
+
+    c = canvas.Canvas(filename, pagesize=A4)
+    _width, height = A4
+
+    for page_num in range(1, num_pages + 1):
+        y = height - 1 * inch
+        for name in _SHARED_FONTS:
+            c.setFont(name, 12)
+            for line in range(8):
+                c.drawString(
+                    1 * inch, y,
+                    f"Página {page_num}, linha {line + 1}: petição, citação, decisão — {name}"
+                )
+                y -= 0.25 * inch
+        c.showPage()
+
+    c.save()
+
+
+def append_incremental_update(filename: str, every: int = 10, seed: int = 1) -> None:
+    """
+    Acrescenta uma atualização incremental ao final de um PDF existente.
+
+    Uma a cada `every` páginas recebe um novo stream de conteúdo (um
+    carimbo), gravado junto com a nova versão do objeto da página, uma nova
+    tabela xref e um trailer com /Prev apontando para a anterior.
+
+    Args:
+        filename: PDF a ser atualizado
+        every: Intervalo entre as páginas carimbadas
+        seed: Semente usada no texto do carimbo
+    """
+    with open(filename, 'rb') as source:
+        data = source.read()
+
+    reader = PdfReader(io.BytesIO(data))
+    prev_xref = int(re.findall(rb'startxref\s+(\d+)', data)[-1])
+    next_id = int(reader.trailer['/Size'])
+
+    update = io.BytesIO()
+    update.write(b'\n')
+    offset = len(data) + 1
+    entries = {}
+
+    def write_object(idnum: int, obj) -> None:
+        entries[idnum] = offset + update.tell() - 1
+        update.write(f"{idnum} 0 obj\n".encode())
+        obj.write_to_stream(update, None)
+        update.write(b"\nendobj\n")
+
+    rng = random.Random(seed)
+    pages_root = reader.trailer['/Root'].raw_get('/Pages')
+    for page_num in range(0, len(reader.pages), every):
+        page = reader.pages[page_num]
+        page_id = page.indirect_reference.idnum
+
+        stamp = DecodedStreamObject()
+        stamp.set_data(
+            f"BT /F1 9 Tf 40 20 Td (Juntada {rng.randrange(10**6):06d}) Tj ET".encode()
+        )
+        stamp_id = next_id
+        next_id += 1
+        write_object(stamp_id, stamp)
+
+        contents = page.get('/Contents')
+        if isinstance(contents, ArrayObject):
+            new_contents = ArrayObject(contents)
+        else:
+            new_contents = ArrayObject([page.raw_get('/Contents')])
+        new_contents.append(IndirectObject(stamp_id, 0, reader))
+        page[NameObject('/Contents')] = new_contents
+        if '/Parent' not in page:
+            page[NameObject('/Parent')] = pages_root
+        write_object(page_id, page)
+
+    xref_offset = offset + update.tell() - 1
+    update.write(b"xref\n")
+    for idnum in sorted(entries):
+        update.write(f"{idnum} 1\n{entries[idnum]:010d} 00000 n \n".encode())
+    root = reader.trailer.raw_get('/Root')
+    update.write(
+        f"trailer\n<< /Size {next_id} /Root {root.idnum} {root.generation} R "
+        f"/Prev {prev_xref} >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+    )
+
+    with open(filename, 'ab') as target:
+        target.write(update.getvalue())
+
+
+def create_incremental_pdf(filename: str, num_pages: int = 300, updates: int = 3) -> None:
+    """
+    Cria um PDF de texto com várias atualizações incrementais.
+
+    Args:
+        filename: Nome do arquivo a ser criado
+        num_pages: Número de páginas a criar
+        updates: Número de atualizações incrementais acrescentadas
+    """
+    create_test_pdf(filename, num_pages)
+    for update in range(updates):
+        append_incremental_update(filename, every=10 + update, seed=update)
+
+
+# Nome do corpus -> função que o gera
+CORPORA = {
+    'text': lambda filename: create_test_pdf(filename, 300),
+    'image': create_image_pdf,
+    'shared_font': create_shared_font_pdf,
+    'large': lambda filename: create_test_pdf(filename, LARGE_PAGES),
+    'incremental': create_incremental_pdf,
+}
+
+
+def build_corpus(name: str, directory: str) -> str:
+    """
+    Gera (ou reaproveita) o PDF de um corpus.
+
+    Args:
+        name: Nome do corpus (chave de CORPORA)
+        directory: Diretório onde os PDFs ficam guardados entre execuções
+
+    Returns:
+        Caminho do PDF gerado
+    """
+    suffix = f"_{LARGE_PAGES}" if name == 'large' else ''
+    filename = os.path.join(directory, f"{name}{suffix}_v{CORPUS_VERSION}.pdf")
+
+    if not os.path.exists(filename):
+        # Gera com outro nome e renomeia, para não reaproveitar arquivos incompletos
+        partial = filename + '.part'
+        CORPORA[name](partial)
+        os.replace(partial, filename)
+
+    return filename
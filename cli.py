@@ -6,8 +6,14 @@ Cliente: RODOVALHO ADVOGADOS
 """
 
 import argparse
+import os
 import sys
+from batch import MANIFEST_NAME, run_batch
+from image_optimizer import DEFAULT_JPEG_QUALITY, DEFAULT_MAX_DPI
 from pdf_splitter import PDFSplitter
+from size_estimator import SPLIT_STRATEGIES
+from instrumentation import SplitProfile, activate, format_profile
+from tribunais import TRIBUNAIS_DEFAULTS, parse_tribunals, tribunal_targets
 
 
 BANNER = """
@@ -24,6 +30,7 @@ def main():
     parser = argparse.ArgumentParser(
         description='Dividir arquivos PDF em tamanhos menores - RODOVALHO ADVOGADOS',
         formatter_class=argparse.RawDescriptionHelpFormatter,
+        fromfile_prefix_chars='@',
         epilog="""
 Exemplos de uso:
   # Dividir por número de páginas (50 páginas por arquivo)
@@ -35,12 +42,54 @@ Exemplos de uso:
   # Especificar diretório de saída
   python cli.py arquivo.pdf -p 50 -o meus_pdfs/
   
+  # Gravar as partes em paralelo usando 8 processos
+  python cli.py arquivo.pdf -p 50 -j 8
+  
+  # Dividir por tamanho em arquivos de tamanhos equilibrados
+  python cli.py arquivo.pdf -s 5 --strategy balanced
+  
+  # Dividir por tamanho cortando onde menos recursos compartilhados se repetem
+  python cli.py arquivo.pdf -s 5 --strategy shared
+  
+  # Gravar as partes com streams de objetos (PDF 1.5), que ficam menores
+  python cli.py arquivo.pdf -s 5 --object-streams
+  
+  # Reduzir as imagens digitalizadas para que cada página caiba no limite
+  python cli.py arquivo.pdf -s 5 --optimize-images --max-dpi 150 --jpeg-quality 75
+  
+  # Dividir o mesmo documento para vários tribunais de uma vez (uma pasta por tribunal)
+  python cli.py arquivo.pdf -t tjsp,trf3,pje
+  
+  # Extrair só algumas páginas em um único PDF
+  python cli.py arquivo.pdf --ranges "1-3, 10, 250-300"
+  
+  # Ver as partes planejadas sem gravar nenhum arquivo
+  python cli.py arquivo.pdf -s 5 --plan
+  
+  # Ver onde o tempo da divisão é gasto, estágio por estágio
+  python cli.py arquivo.pdf -s 5 --profile
+  
   # Ver informações do PDF
   python cli.py arquivo.pdf -i
+  
+  # Dividir em lote todos os PDFs de um diretório, 4 arquivos por vez
+  python cli.py exportacao/ -s 5 -j 4 -o divididos/
+  
+  # Lote a partir de padrões glob ou de uma lista de arquivos (um por linha)
+  python cli.py "processos/**/*.pdf" -s 5
+  python cli.py @lista.txt -p 50
+  
+  # Ver os recursos (fontes, imagens, perfis ICC) compartilhados entre páginas
+  python cli.py arquivo.pdf -i -r
         """
     )
     
-    parser.add_argument('pdf', help='Arquivo PDF para dividir')
+    parser.add_argument(
+        'pdf',
+        nargs='+',
+        help='Arquivo PDF para dividir; vários arquivos, diretórios ou padrões glob '
+             'ativam o modo em lote'
+    )
     
     parser.add_argument(
         '-p', '--pages',
@@ -56,6 +105,20 @@ Exemplos de uso:
         help='Tamanho máximo em MB por arquivo'
     )
     
+    parser.add_argument(
+        '-t', '--tribunals',
+        metavar='LISTA',
+        help='Dividir conforme os limites de um ou mais tribunais, separados por vírgula '
+             f'({", ".join(TRIBUNAIS_DEFAULTS)}); cada tribunal é gravado em DIR/<tribunal>/'
+    )
+    
+    parser.add_argument(
+        '--ranges',
+        metavar='PÁGINAS',
+        help='Extrair as páginas indicadas (ex.: "1-3, 10, 250-300") em um único PDF, '
+             'sem ler o restante do documento'
+    )
+    
     parser.add_argument(
         '-o', '--output',
         default='output',
@@ -63,6 +126,81 @@ Exemplos de uso:
         help='Diretório de saída (padrão: output/)'
     )
     
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        metavar='NUM',
+        help='Processos para gravar as partes em paralelo na divisão por páginas; '
+             'no modo em lote, arquivos processados em paralelo (0 = todos os núcleos; padrão: 1)'
+    )
+    
+    parser.add_argument(
+        '--manifest',
+        metavar='ARQUIVO',
+        help=f'Manifesto JSONL do modo em lote (padrão: DIR/{MANIFEST_NAME}); '
+             'arquivos já concluídos com os mesmos parâmetros são ignorados'
+    )
+    
+    parser.add_argument(
+        '--strategy',
+        choices=SPLIT_STRATEGIES,
+        default='greedy',
+        help='Estratégia da divisão por tamanho: greedy preenche cada arquivo até o limite; '
+             'shared usa o mesmo número de arquivos, cortando onde menos recursos '
+             'compartilhados se repetem; balanced usa o mesmo número de arquivos, '
+             'com tamanhos equilibrados (padrão: greedy)'
+    )
+    
+    parser.add_argument(
+        '--object-streams',
+        action='store_true',
+        help='Gravar as partes com streams de objetos e de referências cruzadas (PDF 1.5), '
+             'que deixam as partes menores e cabem mais páginas em cada uma'
+    )
+    
+    parser.add_argument(
+        '--optimize-images',
+        action='store_true',
+        help='Reduzir e recomprimir as imagens acima da resolução máxima antes de dividir; '
+             'na divisão por tamanho, as páginas maiores que o limite são reduzidas de novo'
+    )
+    
+    parser.add_argument(
+        '--max-dpi',
+        type=int,
+        default=DEFAULT_MAX_DPI,
+        metavar='DPI',
+        help=f'Resolução máxima das imagens com --optimize-images (padrão: {DEFAULT_MAX_DPI})'
+    )
+    
+    parser.add_argument(
+        '--jpeg-quality',
+        type=int,
+        default=DEFAULT_JPEG_QUALITY,
+        metavar='NUM',
+        help=f'Qualidade JPEG (1 a 95) com --optimize-images (padrão: {DEFAULT_JPEG_QUALITY})'
+    )
+    
+    parser.add_argument(
+        '-r', '--resources',
+        action='store_true',
+        help='Mostrar os recursos compartilhados entre páginas e o tamanho de cada um'
+    )
+    
+    parser.add_argument(
+        '--plan',
+        action='store_true',
+        help='Mostrar as partes planejadas (páginas e tamanho estimado) sem gravar arquivos'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Mostrar ao final o tempo, a CPU e os bytes de cada estágio da divisão '
+             '(leitura, índice, planejamento, cópia, serialização, gravação)'
+    )
+    
     parser.add_argument(
         '-i', '--info',
         action='store_true',
@@ -74,56 +212,125 @@ Exemplos de uso:
     # Exibe banner
     print(BANNER)
     
+    # Vários arquivos, diretórios ou padrões glob: modo em lote
+    if len(args.pdf) > 1 or not os.path.isfile(args.pdf[0]) or args.manifest:
+        return run_batch_mode(args)
+    
+    args.pdf = args.pdf[0]
+    if args.ranges:
+        run_mode = run_extract_mode
+    elif args.tribunals:
+        run_mode = run_tribunals_mode
+    else:
+        run_mode = run_split_mode
+    if not args.profile:
+        return run_mode(args)
+    
+    profile = SplitProfile()
+    with activate(profile):
+        status = run_mode(args)
+    print(f"\n⏱️  PERFIL DA DIVISÃO")
+    print(f"{'='*60}")
+    print(format_profile(profile))
+    print(f"{'='*60}")
+    return status
+
+
+def run_split_mode(args) -> int:
+    """Divide um único PDF por páginas ou por tamanho."""
     try:
         # Cria o divisor
-        splitter = PDFSplitter(args.pdf)
-        
-        # Mostra informações
-        info = splitter.get_info()
-        print(f"\n{'='*60}")
-        print(f"📄 INFORMAÇÕES DO PDF")
-        print(f"{'='*60}")
-        print(f"Arquivo: {info['arquivo']}")
-        print(f"Total de páginas: {info['total_paginas']}")
-        print(f"Tamanho: {info['tamanho_mb']} MB ({info['tamanho_bytes']:,} bytes)")
-        print(f"{'='*60}\n")
-        
-        # Se for apenas informação, para aqui
-        if args.info:
+        with PDFSplitter(args.pdf, workers=args.jobs, object_streams=args.object_streams) as splitter:
+            # Mostra informações
+            info = splitter.get_info()
+            print(f"\n{'='*60}")
+            print(f"📄 INFORMAÇÕES DO PDF")
+            print(f"{'='*60}")
+            print(f"Arquivo: {info['arquivo']}")
+            print(f"Total de páginas: {info['total_paginas']}")
+            print(f"Tamanho: {info['tamanho_mb']} MB ({info['tamanho_bytes']:,} bytes)")
+            print(f"Versão do PDF: {info['versao'] or 'desconhecida'}")
+            print(f"{'='*60}\n")
+            
+            if args.resources:
+                report = splitter.get_resource_report()
+                print(f"📎 RECURSOS COMPARTILHADOS")
+                print(f"{'='*60}")
+                for resource in report['recursos'][:10]:
+                    print(
+                        f"Objeto {resource['objeto']:>6} {resource['tipo']:<20} "
+                        f"{resource['tamanho_bytes']:>12,} bytes  {resource['paginas']} páginas"
+                    )
+                print(f"Total compartilhado: {report['bytes_compartilhados']:,} bytes "
+                      f"em {len(report['recursos'])} objetos")
+                print(f"{'='*60}\n")
+            
+            # Se for apenas informação, para aqui
+            if args.info:
+                return 0
+            
+            # Verifica se foi especificado um método de divisão
+            if not args.pages and not args.size:
+                print("Erro: Você deve especificar -p/--pages ou -s/--size para dividir o PDF")
+                print("Use -h para ver ajuda")
+                return 1
+            
+            # Verifica se ambos foram especificados
+            if args.pages and args.size:
+                print("Erro: Especifique apenas -p/--pages OU -s/--size, não ambos")
+                return 1
+            
+            if args.optimize_images:
+                print(f"Otimizando imagens (até {args.max_dpi} DPI, qualidade {args.jpeg_quality})...")
+                report = splitter.optimize_images(
+                    max_dpi=args.max_dpi, quality=args.jpeg_quality, max_page_mb=args.size
+                )
+                print(f"🖼️  Imagens otimizadas: {report['imagens_otimizadas']} de {report['imagens']} "
+                      f"({report['bytes_antes'] / (1024 * 1024):.2f} MB → "
+                      f"{report['bytes_depois'] / (1024 * 1024):.2f} MB)")
+                if report['paginas_acima_do_limite']:
+                    pages = ', '.join(str(page) for page in report['paginas_acima_do_limite'])
+                    print(f"⚠️  Páginas ainda acima do limite: {pages}")
+                print()
+            
+            # Apenas mostra o planejamento, sem gravar as partes
+            if args.plan:
+                plan = splitter.plan(
+                    pages_per_file=args.pages, max_size_mb=args.size, strategy=args.strategy
+                )
+                print(f"📐 PARTES PLANEJADAS")
+                print(f"{'='*60}")
+                for part in plan:
+                    size_mb = part['tamanho_estimado_bytes'] / (1024 * 1024)
+                    print(
+                        f"Parte {part['parte']:03d}: páginas {part['pagina_inicial']}-{part['pagina_final']} "
+                        f"({part['paginas']} páginas, ~{size_mb:.2f} MB)"
+                    )
+                print(f"{'='*60}")
+                print(f"Total de arquivos planejados: {len(plan)}")
+                return 0
+            
+            # Divide o PDF
+            if args.pages:
+                print(f"Dividindo por número de páginas ({args.pages} páginas por arquivo)...")
+                print(f"Diretório de saída: {args.output}/\n")
+                files = splitter.split_by_pages(args.pages, args.output)
+            else:
+                print(f"Dividindo por tamanho ({args.size} MB por arquivo)...")
+                print(f"Diretório de saída: {args.output}/\n")
+                files = splitter.split_by_size(args.size, args.output, strategy=args.strategy)
+            
+            # Resumo
+            print(f"\n{'='*60}")
+            print(f"✅ DIVISÃO CONCLUÍDA COM SUCESSO!")
+            print(f"{'='*60}")
+            print(f"Total de arquivos criados: {len(files)}")
+            print(f"Localização: {args.output}/")
+            print(f"{'='*60}")
+            print(f"\n📌 Desenvolvido por CALLEVA | RM SOFTWARES E TREINAMENTOS LTDA\n")
+            
             return 0
         
-        # Verifica se foi especificado um método de divisão
-        if not args.pages and not args.size:
-            print("Erro: Você deve especificar -p/--pages ou -s/--size para dividir o PDF")
-            print("Use -h para ver ajuda")
-            return 1
-        
-        # Verifica se ambos foram especificados
-        if args.pages and args.size:
-            print("Erro: Especifique apenas -p/--pages OU -s/--size, não ambos")
-            return 1
-        
-        # Divide o PDF
-        if args.pages:
-            print(f"Dividindo por número de páginas ({args.pages} páginas por arquivo)...")
-            print(f"Diretório de saída: {args.output}/\n")
-            files = splitter.split_by_pages(args.pages, args.output)
-        else:
-            print(f"Dividindo por tamanho ({args.size} MB por arquivo)...")
-            print(f"Diretório de saída: {args.output}/\n")
-            files = splitter.split_by_size(args.size, args.output)
-        
-        # Resumo
-        print(f"\n{'='*60}")
-        print(f"✅ DIVISÃO CONCLUÍDA COM SUCESSO!")
-        print(f"{'='*60}")
-        print(f"Total de arquivos criados: {len(files)}")
-        print(f"Localização: {args.output}/")
-        print(f"{'='*60}")
-        print(f"\n📌 Desenvolvido por CALLEVA | RM SOFTWARES E TREINAMENTOS LTDA\n")
-        
-        return 0
-        
     except FileNotFoundError as e:
         print(f"Erro: {e}", file=sys.stderr)
         return 1
@@ -135,5 +342,134 @@ Exemplos de uso:
         return 1
 
 
+def run_tribunals_mode(args) -> int:
+    """Divide um PDF para vários tribunais, com uma única leitura do documento."""
+    if args.pages or args.size or args.plan:
+        print("Erro: -t/--tribunals não pode ser combinado com -p/--pages, -s/--size ou --plan")
+        return 1
+    
+    try:
+        tribunals = parse_tribunals(args.tribunals)
+        targets = tribunal_targets(tribunals)
+        object_streams = args.object_streams or all(
+            TRIBUNAIS_DEFAULTS[key]['object_streams'] for key in tribunals
+        )
+        
+        with PDFSplitter(args.pdf, object_streams=object_streams) as splitter:
+            if args.optimize_images:
+                # As imagens precisam caber no menor limite entre os tribunais
+                report = splitter.optimize_images(
+                    max_dpi=args.max_dpi,
+                    quality=args.jpeg_quality,
+                    max_page_mb=min(target['max_size_mb'] for target in targets.values()),
+                    workers=args.jobs
+                )
+                print(f"🖼️  Imagens otimizadas: {report['imagens_otimizadas']} de {report['imagens']}\n")
+            
+            print(f"Dividindo para {len(tribunals)} tribunais: {', '.join(tribunals)}")
+            print(f"Diretório de saída: {args.output}/\n")
+            files = splitter.split_by_targets(targets, args.output)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    except Exception as e:
+        print(f"Erro inesperado: {e}", file=sys.stderr)
+        return 1
+    
+    print(f"\n{'='*60}")
+    print(f"✅ DIVISÃO POR TRIBUNAL CONCLUÍDA")
+    print(f"{'='*60}")
+    for tribunal in tribunals:
+        print(f"{TRIBUNAIS_DEFAULTS[tribunal]['nome']}: {len(files[tribunal])} arquivos "
+              f"em {os.path.join(args.output, tribunal)}/")
+    print(f"{'='*60}")
+    return 0
+
+
+def run_extract_mode(args) -> int:
+    """Extrai as páginas selecionadas de um PDF em um único arquivo."""
+    if args.pages or args.size or args.tribunals or args.plan or args.optimize_images:
+        print("Erro: --ranges não pode ser combinado com -p/--pages, -s/--size, "
+              "-t/--tribunals, --plan ou --optimize-images")
+        return 1
+    
+    try:
+        with PDFSplitter(args.pdf, object_streams=args.object_streams) as splitter:
+            print(f"Extraindo as páginas {args.ranges} de {splitter.total_pages}...")
+            print(f"Diretório de saída: {args.output}/\n")
+            output_file = splitter.extract_to_file(args.ranges, args.output)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    except Exception as e:
+        print(f"Erro inesperado: {e}", file=sys.stderr)
+        return 1
+    
+    print(f"\n{'='*60}")
+    print(f"✅ EXTRAÇÃO CONCLUÍDA")
+    print(f"{'='*60}")
+    print(f"Arquivo criado: {output_file}")
+    print(f"{'='*60}")
+    return 0
+
+
+def _print_batch_result(position: int, total: int, record: dict) -> None:
+    """Mostra o resultado de um arquivo do lote."""
+    if record['status'] == 'concluido':
+        detail = f"{len(record['partes'])} partes ({record['tempo_s']:.1f} s)"
+    elif record['status'] == 'ignorado':
+        detail = "já processado, ignorado"
+    else:
+        detail = f"ERRO: {record['erro']}"
+    print(f"[{position}/{total}] {record['arquivo']}: {detail}")
+
+
+def run_batch_mode(args) -> int:
+    """Divide vários PDFs usando o pool de processos e o manifesto."""
+    if args.info or args.resources or args.plan or args.tribunals or args.ranges or args.profile:
+        print("Erro: -i/--info, -r/--resources, --plan, -t/--tribunals, --ranges e --profile "
+              "aceitam apenas um arquivo")
+        return 1
+    
+    if bool(args.pages) == bool(args.size):
+        print("Erro: No modo em lote, especifique -p/--pages OU -s/--size")
+        return 1
+    
+    if args.pages:
+        params = {'paginas': args.pages}
+    else:
+        params = {'tamanho_mb': args.size, 'estrategia': args.strategy}
+    if args.object_streams:
+        params['streams_de_objetos'] = True
+    if args.optimize_images:
+        params['otimizar_imagens'] = {'dpi_maximo': args.max_dpi, 'qualidade_jpeg': args.jpeg_quality}
+    
+    print(f"Diretório de saída: {args.output}/\n")
+    
+    try:
+        results = run_batch(
+            args.pdf, args.output, params,
+            jobs=args.jobs, manifest_path=args.manifest, on_result=_print_batch_result
+        )
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    
+    counts = {status: 0 for status in ('concluido', 'ignorado', 'erro')}
+    for record in results:
+        counts[record['status']] += 1
+    
+    print(f"\n{'='*60}")
+    print(f"📦 LOTE CONCLUÍDO")
+    print(f"{'='*60}")
+    print(f"Divididos: {counts['concluido']}")
+    print(f"Ignorados (já processados): {counts['ignorado']}")
+    print(f"Com erro: {counts['erro']}")
+    print(f"Manifesto: {args.manifest or os.path.join(args.output, MANIFEST_NAME)}")
+    print(f"{'='*60}")
+    
+    return 1 if counts['erro'] else 0
+
+
 if __name__ == '__main__':
     sys.exit(main())
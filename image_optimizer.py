@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Otimização das imagens de um PDF antes da divisão.
+
+Documentos digitalizados costumam ter páginas que, sozinhas, passam do
+limite de tamanho dos tribunais. Aqui as imagens acima de uma resolução
+máxima (estimada pelo tamanho da página) são reduzidas e recodificadas:
+imagens em tons de cinza ou coloridas como JPEG, na qualidade escolhida, e
+imagens de 1 bit (digitalizações em preto e branco) como CCITT Group 4. A
+decodificação, o redimensionamento e a codificação rodam em um pool de
+processos, uma imagem por tarefa. Uma imagem só é substituída se ficar
+menor.
+
+Com um tamanho máximo por página, as páginas que continuam acima dele têm
+as imagens reduzidas de novo, com resolução e qualidade menores, até caber
+ou chegar aos mínimos.
+
+Requer o Pillow, importado de forma opcional: sem ele o módulo (e os
+valores padrão usados pela CLI e pela API) continua disponível, e só
+optimize_images falha.
+"""
+
+import io
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set
+
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.filters import ASCII85Decode, ASCIIHexDecode, FlateDecode
+from PyPDF2.generic import (
+    ArrayObject, BooleanObject, DictionaryObject, IndirectObject, NameObject, NumberObject
+)
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow só é exigido ao otimizar as imagens
+    Image = None
+
+
+# Valores padrão da otimização
+DEFAULT_MAX_DPI = 150
+DEFAULT_JPEG_QUALITY = 75
+
+# Limites das reduções extras para páginas acima do tamanho máximo
+MIN_DPI = 50
+MIN_JPEG_QUALITY = 30
+
+# Rodadas de redução extra e fator aplicado à resolução a cada uma
+EXTRA_ROUNDS = 4
+EXTRA_ROUND_FACTOR = 0.7
+
+# Folga antes de reduzir: imagens até 10% acima da resolução máxima ficam como estão
+DPI_TOLERANCE = 1.1
+
+# Codificações ASCII que podem preceder o filtro da imagem
+ASCII_FILTERS = {
+    '/ASCII85Decode': ASCII85Decode, '/A85': ASCII85Decode,
+    '/ASCIIHexDecode': ASCIIHexDecode, '/AHx': ASCIIHexDecode
+}
+
+# Componentes de cor dos espaços aceitos
+_COMPONENTS = {'/DeviceGray': 1, '/CalGray': 1, '/DeviceRGB': 3, '/CalRGB': 3}
+
+
+def _components(color_space) -> Optional[int]:
+    """Número de componentes de cor, ou None se o espaço não for tratado."""
+    color_space = color_space.get_object() if color_space is not None else None
+    if isinstance(color_space, str):
+        return _COMPONENTS.get(color_space)
+    if isinstance(color_space, ArrayObject) and color_space:
+        family = color_space[0]
+        if family in _COMPONENTS:
+            return _COMPONENTS[family]
+        if family == '/ICCBased' and len(color_space) > 1:
+            components = color_space[1].get_object().get('/N')
+            return components if components in (1, 3) else None
+    return None
+
+
+def _as_list(value) -> list:
+    """Valor de /Filter ou /DecodeParms como lista (vazia se ausente)."""
+    value = value.get_object() if value is not None else None
+    if value is None:
+        return []
+    if isinstance(value, ArrayObject):
+        return [item.get_object() for item in value]
+    return [value]
+
+
+def _image_job(image: DictionaryObject) -> Optional[dict]:
+    """
+    Descreve uma imagem para a recodificação em outro processo.
+
+    Returns:
+        Dicionário só com tipos simples (bytes, números, textos), ou None se
+        a imagem não for tratada (máscaras, CMYK, paletas, filtros
+        encadeados além da codificação ASCII)
+    """
+    if image.get('/ImageMask') or isinstance(image.get('/Mask'), ArrayObject):
+        return None
+
+    bits = image.get('/BitsPerComponent')
+    components = _components(image.get('/ColorSpace'))
+    filters = _as_list(image.get('/Filter'))
+    all_parms = _as_list(image.get('/DecodeParms'))
+    if components is None:
+        return None
+
+    # Codificações ASCII à frente do filtro da imagem são desfeitas no processo do pool
+    ascii_filters = []
+    while filters and filters[0] in ASCII_FILTERS:
+        ascii_filters.append(str(filters.pop(0)))
+    if len(filters) > 1:
+        return None
+    image_filter = filters[0] if filters else None
+    parms = all_parms[len(ascii_filters)] if len(all_parms) > len(ascii_filters) else None
+    if not isinstance(parms, (DictionaryObject, type(None))):
+        return None
+
+    if image_filter == '/DCTDecode':
+        if bits != 8:
+            return None
+    elif image_filter == '/CCITTFaxDecode':
+        if bits != 1 or components != 1:
+            return None
+    elif image_filter not in (None, '/FlateDecode') or bits not in (1, 8):
+        return None
+    if bits == 1 and components != 1:
+        return None
+
+    return {
+        'data': image._data,
+        'ascii_filters': ascii_filters,
+        'filter': image_filter,
+        'parms': {
+            str(key): value.value if isinstance(value, BooleanObject) else int(value)
+            for key, value in (parms or {}).items()
+            if isinstance(value, (BooleanObject, int))
+        },
+        'width': int(image['/Width']),
+        'height': int(image['/Height']),
+        'bits': int(bits),
+        'components': components
+    }
+
+
+def _ccitt_tiff(data: bytes, width: int, height: int, parms: dict) -> bytes:
+    """
+    Envolve dados CCITT em um TIFF de uma faixa, para a decodificação pelo Pillow.
+
+    A interpretação fotométrica reproduz /BlackIs1: os pixels lidos pelo
+    Pillow têm o mesmo valor das amostras do PDF.
+    """
+    k = parms.get('/K', 0)
+    compression = 4 if k < 0 else 3
+    photometric = 1 if parms.get('/BlackIs1') else 0
+    entries = [
+        (256, 4, width), (257, 4, height), (258, 3, 1), (259, 3, compression),
+        (262, 3, photometric), (273, 4, 0), (277, 3, 1), (278, 4, height),
+        (279, 4, len(data))
+    ]
+    if compression == 3:
+        # T4Options: codificação 2D quando K > 0
+        entries.append((292, 4, 1 if k > 0 else 0))
+
+    data_offset = 8 + 2 + 12 * len(entries) + 4
+    ifd = struct.pack('<H', len(entries))
+    for tag, field_type, value in entries:
+        if tag == 273:
+            value = data_offset
+        if field_type == 3:
+            ifd += struct.pack('<HHIHH', tag, field_type, 1, value, 0)
+        else:
+            ifd += struct.pack('<HHII', tag, field_type, 1, value)
+    return b'II*\x00' + struct.pack('<I', 8) + ifd + struct.pack('<I', 0) + data
+
+
+def _decode(job: dict) -> Optional['Image.Image']:
+    """Decodifica a imagem descrita por _image_job, ou retorna None."""
+    size = (job['width'], job['height'])
+    image_filter = job['filter']
+    data = job['data']
+    for ascii_filter in job['ascii_filters']:
+        data = ASCII_FILTERS[ascii_filter].decode(data)
+        if isinstance(data, str):
+            data = data.encode('latin-1')
+
+    if image_filter == '/DCTDecode':
+        image = Image.open(io.BytesIO(data))
+        expected = 'L' if job['components'] == 1 else 'RGB'
+        return image if image.mode == expected and image.size == size else None
+
+    if image_filter == '/CCITTFaxDecode':
+        if job['parms'].get('/EncodedByteAlign'):
+            return None
+        columns = job['parms'].get('/Columns', 1728)
+        rows = job['parms'].get('/Rows', job['height'])
+        if (columns, rows) != size:
+            return None
+        image = Image.open(io.BytesIO(_ccitt_tiff(data, columns, rows, job['parms'])))
+        image.load()
+        return image.convert('1') if image.mode != '1' else image
+
+    if image_filter == '/FlateDecode':
+        data = FlateDecode.decode(data, job['parms'] or None)
+
+    if job['bits'] == 1:
+        mode = '1'
+        expected = (job['width'] + 7) // 8 * job['height']
+    else:
+        mode = 'L' if job['components'] == 1 else 'RGB'
+        expected = job['width'] * job['height'] * job['components']
+    if len(data) < expected:
+        return None
+    return Image.frombytes(mode, size, data[:expected])
+
+
+def _encode_bilevel(image: 'Image.Image') -> dict:
+    """Codifica uma imagem de 1 bit como CCITT Group 4 (uma faixa TIFF)."""
+    buffer = io.BytesIO()
+    image.save(buffer, 'TIFF', compression='group4', tiffinfo={278: image.height})
+    tiff = Image.open(buffer)
+    offset = tiff.tag_v2[273][0]
+    length = tiff.tag_v2[279][0]
+    return {
+        'data': buffer.getvalue()[offset:offset + length],
+        'filter': '/CCITTFaxDecode',
+        # Group 4 grava os pixels claros (1 no Pillow) como "pretos"
+        'parms': {'/K': -1, '/Columns': image.width, '/Rows': image.height, '/BlackIs1': True},
+        'bits': 1
+    }
+
+
+def recompress_image(job: dict) -> Optional[dict]:
+    """
+    Reduz e recodifica uma imagem (executada nos processos do pool).
+
+    Args:
+        job: Descrição da imagem (ver _image_job), com 'scale' (fator de
+            redução, até 1) e 'quality' (qualidade JPEG)
+
+    Returns:
+        Dicionário com data, filter, parms, width, height e bits da nova
+        imagem, ou None se ela não puder ser tratada ou não ficar menor
+    """
+    try:
+        image = _decode(job)
+    except Exception:
+        return None
+    if image is None:
+        return None
+
+    scale = job['scale']
+    if scale < 1:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        if image.mode == '1':
+            # Reduz em tons de cinza e volta para 1 bit, preservando traços finos
+            image = image.convert('L').resize(size, Image.LANCZOS, reducing_gap=2.0)
+            image = image.point(lambda value: 255 if value >= 128 else 0).convert('1')
+        else:
+            image = image.resize(size, Image.LANCZOS, reducing_gap=2.0)
+
+    if image.mode == '1':
+        result = _encode_bilevel(image)
+    else:
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=job['quality'], optimize=True)
+        result = {'data': buffer.getvalue(), 'filter': '/DCTDecode', 'parms': None, 'bits': 8}
+
+    if len(result['data']) >= len(job['data']):
+        return None
+    result['width'], result['height'] = image.size
+    return result
+
+
+def _apply(image: DictionaryObject, result: dict) -> None:
+    """Substitui os dados e o dicionário da imagem pelo resultado da recodificação."""
+    image._data = result['data']
+    if hasattr(image, 'decoded_self'):
+        image.decoded_self = None
+    image[NameObject('/Filter')] = NameObject(result['filter'])
+    image[NameObject('/Width')] = NumberObject(result['width'])
+    image[NameObject('/Height')] = NumberObject(result['height'])
+    image[NameObject('/BitsPerComponent')] = NumberObject(result['bits'])
+    if result['parms']:
+        parms = DictionaryObject()
+        for key, value in result['parms'].items():
+            parms[NameObject(key)] = (
+                BooleanObject(value) if isinstance(value, bool) else NumberObject(value)
+            )
+        image[NameObject('/DecodeParms')] = parms
+    elif '/DecodeParms' in image:
+        del image['/DecodeParms']
+
+
+def _stream_length(obj) -> int:
+    """Tamanho dos dados de um stream, ou de uma lista de streams."""
+    obj = obj.get_object() if obj is not None else None
+    if isinstance(obj, ArrayObject):
+        return sum(_stream_length(item) for item in obj)
+    return len(getattr(obj, '_data', b''))
+
+
+def optimize_images(
+    reader: PdfReader,
+    output_pdf: str,
+    max_dpi: float = DEFAULT_MAX_DPI,
+    quality: int = DEFAULT_JPEG_QUALITY,
+    max_page_bytes: Optional[float] = None,
+    workers: int = 0
+) -> dict:
+    """
+    Grava uma cópia do PDF com as imagens reduzidas e recodificadas.
+
+    A resolução de cada imagem é estimada pelo tamanho da página em que ela
+    aparece (como se ocupasse a página inteira), o que nunca a superestima
+    para imagens menores que a página.
+
+    Args:
+        reader: Leitor do PDF de origem
+        output_pdf: Caminho da cópia otimizada
+        max_dpi: Resolução máxima das imagens
+        quality: Qualidade JPEG (1 a 95)
+        max_page_bytes: Tamanho máximo de uma página; as que passarem dele
+            têm as imagens reduzidas de novo, até MIN_DPI e MIN_JPEG_QUALITY
+        workers: Processos para recodificar as imagens (0 usa todos os núcleos)
+
+    Returns:
+        Dicionário com imagens encontradas, imagens otimizadas, bytes das
+        imagens antes e depois e as páginas (base um) que continuam acima
+        de max_page_bytes
+    """
+    if Image is None:
+        raise ImportError("A otimização de imagens requer o Pillow (pip install Pillow)")
+    if max_dpi <= 0:
+        raise ValueError("Resolução máxima deve ser maior que zero")
+    if not 1 <= quality <= 95:
+        raise ValueError("Qualidade JPEG deve estar entre 1 e 95")
+    if workers < 0:
+        raise ValueError("Número de processos não pode ser negativo")
+
+    writer = PdfWriter()
+    jobs: Dict[int, dict] = {}
+    images: Dict[int, DictionaryObject] = {}
+    page_images: List[Set[int]] = []
+    # Resolução estimada de cada imagem (a menor entre as páginas que a usam)
+    dpi: Dict[int, float] = {}
+
+    for source_page in reader.pages:
+        page = writer.add_page(source_page)
+        used = set()
+        resources = page.get('/Resources')
+        xobjects = resources.get_object().get('/XObject') if resources is not None else None
+        page_inches = max(float(page.mediabox.width), float(page.mediabox.height)) / 72
+
+        for name in (xobjects.get_object() if xobjects is not None else {}):
+            reference = xobjects.get_object().raw_get(name)
+            image = reference.get_object()
+            if not isinstance(reference, IndirectObject) or image.get('/Subtype') != '/Image':
+                continue
+            idnum = reference.idnum
+            if idnum not in images:
+                images[idnum] = image
+                job = _image_job(image)
+                if job is not None:
+                    jobs[idnum] = job
+            if idnum in jobs and page_inches > 0:
+                image_dpi = max(jobs[idnum]['width'], jobs[idnum]['height']) / page_inches
+                dpi[idnum] = min(dpi.get(idnum, image_dpi), image_dpi)
+                used.add(idnum)
+        page_images.append(used)
+
+    original_bytes = {idnum: len(image._data) for idnum, image in images.items()}
+    optimized: Set[int] = set()
+
+    def run(targets: Dict[int, float], target_quality: int) -> None:
+        """Recodifica as imagens com a resolução alvo de cada uma."""
+        tasks = []
+        for idnum, target_dpi in targets.items():
+            scale = min(1.0, target_dpi / dpi[idnum])
+            tasks.append((idnum, dict(jobs[idnum], scale=scale, quality=target_quality)))
+        if not tasks:
+            return
+
+        if workers == 1 or len(tasks) == 1:
+            results = [recompress_image(job) for _idnum, job in tasks]
+        else:
+            pool_size = min(workers or os.cpu_count() or 1, len(tasks))
+            with ProcessPoolExecutor(max_workers=pool_size) as executor:
+                results = list(executor.map(recompress_image, [job for _idnum, job in tasks]))
+
+        for (idnum, _job), result in zip(tasks, results):
+            if result is not None and len(result['data']) < len(images[idnum]._data):
+                _apply(images[idnum], result)
+                optimized.add(idnum)
+
+    # Primeira passada: imagens acima da resolução máxima
+    run(
+        {idnum: max_dpi for idnum, image_dpi in dpi.items() if image_dpi > max_dpi * DPI_TOLERANCE},
+        quality
+    )
+
+    def oversized_pages() -> List[int]:
+        if max_page_bytes is None:
+            return []
+        return [
+            page_num for page_num, page in enumerate(writer.pages)
+            if _stream_length(page.get('/Contents')) + sum(
+                len(images[idnum]._data) for idnum in page_images[page_num]
+            ) > max_page_bytes
+        ]
+
+    # Rodadas extras só para as imagens das páginas que ainda não cabem
+    target_dpi = max_dpi
+    target_quality = quality
+    for _round in range(EXTRA_ROUNDS):
+        oversized = oversized_pages()
+        if not oversized or (target_dpi <= MIN_DPI and target_quality <= MIN_JPEG_QUALITY):
+            break
+        target_dpi = max(MIN_DPI, target_dpi * EXTRA_ROUND_FACTOR)
+        target_quality = max(MIN_JPEG_QUALITY, target_quality - 15)
+        run(
+            {
+                idnum: target_dpi
+                for page_num in oversized for idnum in page_images[page_num]
+            },
+            target_quality
+        )
+
+    writer.write(output_pdf)
+
+    return {
+        'imagens': len(images),
+        'imagens_otimizadas': len(optimized),
+        'bytes_antes': sum(original_bytes.values()),
+        'bytes_depois': sum(len(image._data) for image in images.values()),
+        'paginas_acima_do_limite': [page_num + 1 for page_num in oversized_pages()]
+    }
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Medição do tempo gasto em cada estágio de uma divisão.
+
+Um SplitProfile ativo (ver activate) recebe as medições dos estágios
+instrumentados: abertura e leitura do PDF, índice de objetos,
+planejamento, cópia das páginas, serialização, gravação em disco,
+otimização de imagens, recebimento do upload e compressão do ZIP. Para
+cada estágio são acumulados o tempo de relógio e de CPU (sem contar os
+estágios internos a ele), os bytes lidos e gerados e o pico de memória do
+processo. Sem perfil ativo, a medição não faz nada além de uma consulta a
+uma ContextVar.
+
+Os resultados podem ser registrados como JSON no logger "pdf_splitter"
+(log_profile), enviados no cabeçalho Server-Timing (server_timing) ou
+mostrados como tabela (format_profile).
+"""
+
+import contextlib
+import contextvars
+import json
+import logging
+import time
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+logger = logging.getLogger('pdf_splitter')
+
+# Perfil ativo (SplitProfile ou None), próprio de cada thread ou tarefa
+_current = contextvars.ContextVar('pdf_splitter_profile', default=None)
+
+
+def _peak_memory() -> int:
+    """Pico de memória residente do processo em bytes (0 se não disponível)."""
+    if resource is None:
+        return 0
+    # ru_maxrss é em kilobytes no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class StageRecord:
+    """Medição de uma execução de um estágio, onde os bytes processados são informados."""
+
+    __slots__ = ('bytes_in', 'bytes_out')
+
+    def __init__(self, bytes_in: int = 0):
+        self.bytes_in = bytes_in
+        self.bytes_out = 0
+
+
+class SplitProfile:
+    """Tempos, bytes e memória acumulados por estágio."""
+
+    def __init__(self):
+        self.stages: Dict[str, dict] = {}
+        self._started = time.perf_counter()
+        self._started_cpu = time.process_time()
+        # Tempo dos estágios internos, descontado do estágio que os contém
+        self._children: List[List[float]] = []
+
+    def _add(self, name: str, wall: float, cpu: float, record: StageRecord) -> None:
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {
+                'chamadas': 0, 'tempo_s': 0.0, 'cpu_s': 0.0,
+                'bytes_entrada': 0, 'bytes_saida': 0, 'pico_memoria_bytes': 0
+            }
+        stage['chamadas'] += 1
+        stage['tempo_s'] += wall
+        stage['cpu_s'] += cpu
+        stage['bytes_entrada'] += record.bytes_in
+        stage['bytes_saida'] += record.bytes_out
+        stage['pico_memoria_bytes'] = max(stage['pico_memoria_bytes'], _peak_memory())
+
+    def to_dict(self) -> dict:
+        """
+        Resumo do perfil.
+
+        Returns:
+            Dicionário com o tempo total de relógio e de CPU, o pico de
+            memória do processo e os estágios (tempos arredondados)
+        """
+        return {
+            'tempo_total_s': round(time.perf_counter() - self._started, 6),
+            'cpu_total_s': round(time.process_time() - self._started_cpu, 6),
+            'pico_memoria_bytes': _peak_memory(),
+            'estagios': {
+                name: dict(stage, tempo_s=round(stage['tempo_s'], 6), cpu_s=round(stage['cpu_s'], 6))
+                for name, stage in self.stages.items()
+            }
+        }
+
+
+@contextlib.contextmanager
+def activate(profile: SplitProfile) -> Iterator[SplitProfile]:
+    """Torna o perfil ativo no contexto atual (thread ou tarefa) durante o bloco."""
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+
+
+def current_profile() -> Optional[SplitProfile]:
+    """Perfil ativo no contexto atual, ou None."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def stage(name: str, bytes_in: int = 0) -> Iterator[StageRecord]:
+    """
+    Mede um estágio no perfil ativo (sem perfil ativo, não mede nada).
+
+    Args:
+        name: Nome do estágio (usado também no Server-Timing, sem espaços)
+        bytes_in: Bytes lidos pelo estágio, se já conhecidos
+
+    Yields:
+        Registro em que o estágio informa bytes_in e bytes_out
+    """
+    record = StageRecord(bytes_in)
+    profile = _current.get()
+    if profile is None:
+        yield record
+        return
+
+    children = [0.0, 0.0]
+    profile._children.append(children)
+    started = time.perf_counter()
+    started_cpu = time.process_time()
+    try:
+        yield record
+    finally:
+        wall = time.perf_counter() - started
+        cpu = time.process_time() - started_cpu
+        profile._children.pop()
+        if profile._children:
+            profile._children[-1][0] += wall
+            profile._children[-1][1] += cpu
+        profile._add(name, wall - children[0], cpu - children[1], record)
+
+
+def log_profile(profile: SplitProfile, event: str, **fields) -> None:
+    """
+    Registra o perfil como uma linha JSON no logger "pdf_splitter".
+
+    Args:
+        profile: Perfil medido
+        event: Nome do evento (ex.: 'divisao')
+        **fields: Campos extras (arquivo, rota, parâmetros...)
+    """
+    if logger.isEnabledFor(logging.INFO):
+        entry = {'evento': event}
+        entry.update(fields)
+        entry.update(profile.to_dict())
+        logger.info(json.dumps(entry, ensure_ascii=False, default=str))
+
+
+def server_timing(profile: SplitProfile) -> str:
+    """Valor do cabeçalho Server-Timing, com a duração de cada estágio em milissegundos."""
+    summary = profile.to_dict()
+    metrics = [
+        f"{name};dur={stage['tempo_s'] * 1000:.1f}"
+        for name, stage in summary['estagios'].items()
+    ]
+    metrics.append(f"total;dur={summary['tempo_total_s'] * 1000:.1f}")
+    return ', '.join(metrics)
+
+
+def format_profile(profile: SplitProfile) -> str:
+    """Tabela com os estágios do perfil, do mais demorado para o mais rápido."""
+    summary = profile.to_dict()
+    total = summary['tempo_total_s'] or 1e-9
+    lines = [
+        f"{'Estágio':<16}{'Chamadas':>9}{'Tempo (s)':>11}{'CPU (s)':>10}{'%':>7}"
+        f"{'Entrada (MB)':>14}{'Saída (MB)':>12}"
+    ]
+    stages = sorted(summary['estagios'].items(), key=lambda item: -item[1]['tempo_s'])
+    for name, stage in stages:
+        lines.append(
+            f"{name:<16}{stage['chamadas']:>9}{stage['tempo_s']:>11.3f}{stage['cpu_s']:>10.3f}"
+            f"{stage['tempo_s'] / total * 100:>6.1f}%"
+            f"{stage['bytes_entrada'] / (1024 * 1024):>14.2f}{stage['bytes_saida'] / (1024 * 1024):>12.2f}"
+        )
+    lines.append(
+        f"{'total':<16}{'':>9}{summary['tempo_total_s']:>11.3f}{summary['cpu_total_s']:>10.3f}"
+    )
+    lines.append(f"Pico de memória do processo: {summary['pico_memoria_bytes'] / (1024 * 1024):.1f} MB")
+    return '\n'.join(lines)
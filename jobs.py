@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Execução de divisões em segundo plano.
+
+A API recebe o PDF, enfileira um job e responde imediatamente com o seu
+identificador; o progresso e o resultado (ZIP) são consultados depois. O
+JobBackend define a interface usada pela API; o LocalJobBackend executa os
+jobs em um pool de threads do próprio processo, com limite de fila, e pode
+ser substituído por um backend com fila externa.
+
+Configuração por variáveis de ambiente:
+    PDF_SPLITTER_JOB_WORKERS: jobs executados ao mesmo tempo
+    PDF_SPLITTER_JOB_QUEUE: jobs aguardando na fila além dos em execução
+    PDF_SPLITTER_JOB_TTL: segundos que um job finalizado fica disponível
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+from instrumentation import SplitProfile, activate, log_profile
+from metrics import ACTIVE_SPLITS, INPUT_BYTES, OUTPUT_BYTES, PAGES_PROCESSED
+from pdf_splitter import CancellationToken, PDFSplitter, SplitCancelled
+from zip_stream import iter_zip
+
+
+# Estados de um job
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_ERROR = 'error'
+JOB_CANCELLED = 'cancelled'
+
+# Valores padrão quando as variáveis de ambiente não estão definidas
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 8
+DEFAULT_TTL_SECONDS = 60 * 60
+
+
+class QueueFull(Exception):
+    """A fila de jobs está cheia; o cliente deve tentar de novo mais tarde."""
+
+
+class Job:
+    """Estado e progresso de uma divisão em segundo plano."""
+
+    def __init__(self, input_path: str, base_name: str, options: dict):
+        """
+        Cria um job na fila.
+
+        Args:
+            input_path: PDF a dividir (removido ao fim do job)
+            base_name: Nome base das partes e do ZIP
+            options: max_size_mb, max_pages, strategy, compression,
+                object_streams e optimize_images (com max_dpi e jpeg_quality)
+        """
+        self.id = uuid.uuid4().hex
+        self.input_path = input_path
+        self.base_name = base_name
+        self.options = options
+        self.status = JOB_QUEUED
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.total_pages: Optional[int] = None
+        self.pages_done = 0
+        self.parts_written = 0
+        self.bytes_written = 0
+        self.result_path: Optional[str] = None
+        self.error: Optional[str] = None
+        self.cancel_token = CancellationToken()
+
+    def to_dict(self) -> dict:
+        """Representação do job devolvida pela API."""
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'pages_total': self.total_pages,
+            'pages_done': self.pages_done,
+            'parts_written': self.parts_written,
+            'bytes_written': self.bytes_written,
+            'error': self.error
+        }
+
+
+class JobBackend:
+    """Interface dos backends de jobs usados pela API."""
+
+    def submit(self, input_path: str, base_name: str, options: dict) -> Job:
+        """
+        Enfileira a divisão de um PDF.
+
+        Args:
+            input_path: PDF a dividir; o backend passa a ser dono do arquivo
+            base_name: Nome base das partes e do ZIP
+            options: max_size_mb, max_pages, strategy, compression,
+                object_streams e optimize_images (com max_dpi e jpeg_quality)
+
+        Returns:
+            Job criado
+
+        Raises:
+            QueueFull: Se não houver espaço na fila
+        """
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        """Número de jobs em cada estado (JOB_QUEUED, JOB_RUNNING...), para as métricas."""
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Retorna o job com o identificador, ou None se não existir (ou tiver expirado)."""
+        raise NotImplementedError
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Pede o cancelamento de um job na fila ou em execução.
+
+        Args:
+            job_id: Identificador do job
+
+        Returns:
+            Job cancelado, ou None se não existir
+        """
+        raise NotImplementedError
+
+
+def run_job(job: Job, output_dir: str) -> None:
+    """
+    Divide o PDF de um job e grava o ZIP, atualizando o progresso a cada página.
+
+    Args:
+        job: Job a executar
+        output_dir: Diretório onde o ZIP é gravado
+    """
+    result_path = os.path.join(output_dir, f"{job.id}.zip")
+
+    def progress(pages_done: int, _bytes_written: int, _parts_done: int) -> None:
+        job.pages_done = pages_done
+
+    profile = SplitProfile()
+    running = False
+    try:
+        job.cancel_token.check()
+        job.status = JOB_RUNNING
+        ACTIVE_SPLITS.inc()
+        running = True
+        INPUT_BYTES.inc(os.path.getsize(job.input_path))
+
+        with activate(profile), PDFSplitter(
+            job.input_path, object_streams=job.options.get('object_streams', False)
+        ) as splitter:
+            job.total_pages = splitter.total_pages
+            if job.options.get('optimize_images'):
+                splitter.optimize_images(
+                    max_dpi=job.options['max_dpi'],
+                    quality=job.options['jpeg_quality'],
+                    max_page_mb=job.options['max_size_mb']
+                )
+                job.cancel_token.check()
+            parts = splitter.iter_parts(
+                max_size_mb=job.options['max_size_mb'],
+                max_pages=job.options['max_pages'],
+                strategy=job.options['strategy'],
+                progress=progress,
+                cancel=job.cancel_token
+            )
+
+            def entries():
+                for part_num, (start_page, end_page), buffer in parts:
+                    data = buffer.getvalue()
+                    PAGES_PROCESSED.inc(end_page - start_page)
+                    OUTPUT_BYTES.inc(len(data))
+                    yield (
+                        f"{job.base_name}_parte_{part_num:03d}_pag_{start_page + 1}-{end_page}.pdf",
+                        data
+                    )
+                    job.parts_written = part_num
+
+            with open(result_path, 'wb') as result:
+                for chunk in iter_zip(entries(), job.options['compression']):
+                    result.write(chunk)
+                    job.bytes_written += len(chunk)
+
+        job.result_path = result_path
+        job.status = JOB_DONE
+    except SplitCancelled:
+        if os.path.exists(result_path):
+            os.unlink(result_path)
+        job.status = JOB_CANCELLED
+    except Exception as e:
+        if os.path.exists(result_path):
+            os.unlink(result_path)
+        job.error = str(e)
+        job.status = JOB_ERROR
+    finally:
+        if running:
+            ACTIVE_SPLITS.dec()
+        job.finished_at = time.time()
+        log_profile(profile, 'job', job_id=job.id, status=job.status, arquivo=job.base_name)
+        if os.path.exists(job.input_path):
+            os.unlink(job.input_path)
+
+
+class LocalJobBackend(JobBackend):
+    """Executa os jobs em um pool de threads do próprio processo."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        output_dir: Optional[str] = None
+    ):
+        """
+        Inicializa o backend.
+
+        Args:
+            workers: Jobs executados ao mesmo tempo (padrão: PDF_SPLITTER_JOB_WORKERS ou 2)
+            queue_size: Jobs aguardando além dos em execução (padrão:
+                PDF_SPLITTER_JOB_QUEUE ou 8)
+            ttl_seconds: Tempo que um job finalizado e seu ZIP ficam disponíveis
+                (padrão: PDF_SPLITTER_JOB_TTL ou 1 hora)
+            output_dir: Diretório dos ZIPs (padrão: diretório temporário próprio)
+        """
+        if workers is None:
+            workers = int(os.environ.get('PDF_SPLITTER_JOB_WORKERS', DEFAULT_WORKERS))
+        if queue_size is None:
+            queue_size = int(os.environ.get('PDF_SPLITTER_JOB_QUEUE', DEFAULT_QUEUE_SIZE))
+        if ttl_seconds is None:
+            ttl_seconds = float(os.environ.get('PDF_SPLITTER_JOB_TTL', DEFAULT_TTL_SECONDS))
+
+        self.ttl_seconds = ttl_seconds
+        self.output_dir = output_dir or tempfile.mkdtemp(prefix='pdf_splitter_jobs_')
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pdf-job')
+        # Vagas para jobs em execução ou aguardando; sem vaga, a API responde 429
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._jobs: Dict[str, Job] = {}
+        # Tarefas do pool dos jobs ainda não iniciados, para cancelá-los na fila
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, input_path: str, base_name: str, options: dict) -> Job:
+        self._purge_expired()
+
+        if not self._slots.acquire(blocking=False):
+            raise QueueFull("Fila de processamento cheia, tente novamente em instantes")
+
+        job = Job(input_path, base_name, options)
+        with self._lock:
+            self._jobs[job.id] = job
+
+        try:
+            with self._lock:
+                self._futures[job.id] = self._executor.submit(self._run, job)
+        except Exception:
+            self._slots.release()
+            with self._lock:
+                del self._jobs[job.id]
+            raise
+
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        counts = {status: 0 for status in (JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_ERROR, JOB_CANCELLED)}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return counts
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._purge_expired()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+
+        job.cancel_token.cancel()
+        # Um job ainda na fila sai dela na hora e libera a vaga; um em execução
+        # para na próxima verificação do token
+        with self._lock:
+            future = self._futures.pop(job.id, None)
+        if future is not None and future.cancel():
+            job.status = JOB_CANCELLED
+            job.finished_at = time.time()
+            if os.path.exists(job.input_path):
+                os.unlink(job.input_path)
+            self._slots.release()
+        return job
+
+    def shutdown(self) -> None:
+        """Aguarda os jobs em andamento e remove os ZIPs gerados."""
+        self._executor.shutdown(wait=True)
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def _run(self, job: Job) -> None:
+        with self._lock:
+            self._futures.pop(job.id, None)
+        try:
+            run_job(job, self.output_dir)
+        finally:
+            self._slots.release()
+
+    def _purge_expired(self) -> None:
+        """Remove os jobs finalizados há mais tempo que o TTL, com seus ZIPs."""
+        now = time.time()
+        with self._lock:
+            expired = [
+                job for job in self._jobs.values()
+                if job.finished_at is not None and now - job.finished_at > self.ttl_seconds
+            ]
+            for job in expired:
+                del self._jobs[job.id]
+
+        for job in expired:
+            if job.result_path and os.path.exists(job.result_path):
+                os.unlink(job.result_path)
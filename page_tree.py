@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Localização de páginas pela árvore de páginas.
+
+O PyPDF2 monta a lista de todas as páginas (reader.pages) interpretando
+cada nó e cada página do documento, e a cópia direta (pdf_raw_copy) lê a
+árvore inteira ao ser preparada. Para extrair poucas páginas, a página N é
+encontrada descendo da raiz só pelos nós que a contêm, guiado pelo /Count
+de cada nó: em uma árvore balanceada são lidos poucos nós por nível, e em
+uma árvore plana (todas as páginas em um só /Kids, como gravam muitos
+geradores) o filho é acessado diretamente pela posição. Os nós lidos e as
+contagens acumuladas dos seus filhos ficam em cache, e as consultas
+seguintes não leem nada de novo.
+
+Os nós são lidos diretamente do arquivo, como na cópia direta: um /Kids
+com milhares de referências é separado por uma expressão regular em vez de
+ser interpretado objeto a objeto pelo PyPDF2. Nós com strings ou
+comentários, em streams de objetos ou em PDFs criptografados são lidos
+pelo PyPDF2.
+"""
+
+import bisect
+import io
+import re
+from typing import Dict, List, Optional, Tuple
+
+from PyPDF2 import PageObject, PdfReader
+from PyPDF2.generic import IndirectObject, NameObject, read_object
+
+from pdf_raw_copy import INHERITABLE_KEYS, RawObject, object_offsets, read_raw_object
+
+
+# Profundidade máxima aceita; árvores reais têm poucos níveis
+MAX_DEPTH = 64
+
+# Entrada /Kids com um array só de referências indiretas, e cada referência dele
+_KIDS_ENTRY = re.compile(rb'/Kids\s*(\[(?:\s*\d+\s+\d+\s+R)*\s*\])')
+_KID = re.compile(rb'(\d+)\s+(\d+)\s+R')
+
+
+class PageTreeError(Exception):
+    """A árvore de páginas não pode ser percorrida pelo /Count; a lista completa deve ser usada."""
+
+
+class _RawKids:
+    """Referências de um /Kids lido do arquivo, convertidas em IndirectObject só quando usadas."""
+
+    __slots__ = ('_refs', '_reader')
+
+    def __init__(self, refs: List[Tuple[bytes, bytes]], reader: PdfReader):
+        self._refs = refs
+        self._reader = reader
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+    def __getitem__(self, index: int) -> IndirectObject:
+        idnum, generation = self._refs[index]
+        return IndirectObject(int(idnum), int(generation), self._reader)
+
+    def __iter__(self):
+        for index in range(len(self._refs)):
+            yield self[index]
+
+
+class _Node:
+    """Nó /Pages lido: filhos, atributos herdados por eles e início de cada filho."""
+
+    __slots__ = ('kids', 'count', 'inherited', 'starts')
+
+    def __init__(self, kids, count: int, inherited: dict):
+        self.kids = kids
+        self.count = count
+        self.inherited = inherited
+        # Página (relativa ao nó) em que cada filho começa, mais o total; calculado no primeiro uso
+        self.starts: Optional[List[int]] = None
+
+
+class PageTreeIndex:
+    """Índice das páginas construído sob demanda a partir da árvore de páginas."""
+
+    def __init__(self, reader: PdfReader):
+        """
+        Prepara o índice sem ler nenhum nó além da raiz.
+
+        Args:
+            reader: Leitor do PDF de origem
+
+        Raises:
+            PageTreeError: Se a raiz da árvore de páginas não puder ser lida
+        """
+        self.reader = reader
+        self._source = reader.stream
+        # Sem criptografia, os nós podem ser lidos diretamente do arquivo
+        self._offsets = {} if reader.is_encrypted else object_offsets(reader)
+        self._nodes: Dict[int, _Node] = {}
+        self._kinds: Dict[int, str] = {}
+        self._types: Dict[int, str] = {}
+        self._pages: Dict[int, Tuple[IndirectObject, dict]] = {}
+
+        root = reader.trailer['/Root'].raw_get('/Pages')
+        if type(root) is not IndirectObject:
+            raise PageTreeError("Árvore de páginas sem referência indireta")
+        self._root = self._node(root, {})
+        self.count = self._root.count
+
+    def _raw(self, idnum: int, check: bool = True) -> Optional[RawObject]:
+        """Objeto lido diretamente do arquivo, ou None se precisar do PyPDF2."""
+        offset = self._offsets.get(idnum)
+        if offset is None or idnum in self.reader.xref_objStm:
+            return None
+        raw = read_raw_object(self._source, offset, idnum)
+        if raw is None or raw.is_stream or (check and raw.entries is None):
+            return None
+        return raw
+
+    def _raw_node(self, idnum: int, inherited: dict) -> Optional[_Node]:
+        """Lê um nó /Pages diretamente do arquivo, ou retorna None se precisar do PyPDF2."""
+        raw = self._raw(idnum, check=False)
+        if raw is None:
+            return None
+
+        # O /Kids é separado antes de localizar as entradas, para não percorrer as referências uma a uma
+        entries = list(_KIDS_ENTRY.finditer(raw.text))
+        if len(entries) != 1:
+            return None
+        kids = entries[0].group(1)
+        raw = RawObject(raw.text[:entries[0].start()] + b'/Kids []' + raw.text[entries[0].end():])
+        if raw.entries is None or '/Kids' not in raw.entries:
+            return None
+
+        count = raw.value('/Count')
+        if count is None or not count.isdigit():
+            return None
+
+        inherited = dict(inherited)
+        for key in INHERITABLE_KEYS:
+            value = raw.value(key)
+            if value is not None:
+                # Só o valor é interpretado, dentro de um array para que "N G R" seja lido inteiro
+                parsed = read_object(io.BytesIO(b'[' + value + b' ]'), self.reader)
+                if len(parsed) != 1:
+                    return None
+                inherited[key] = parsed[0]
+
+        return _Node(_RawKids(_KID.findall(kids), self.reader), int(count), inherited)
+
+    def _node(self, reference: IndirectObject, inherited: dict) -> _Node:
+        """Lê um nó /Pages (uma única vez), com os atributos que os filhos herdam."""
+        node = self._nodes.get(reference.idnum)
+        if node is not None:
+            return node
+
+        try:
+            node = self._raw_node(reference.idnum, inherited)
+        except Exception:
+            node = None
+        if node is not None:
+            self._nodes[reference.idnum] = node
+            return node
+
+        obj = reference.get_object()
+        if not isinstance(obj, dict) or '/Kids' not in obj:
+            raise PageTreeError(f"Nó inválido na árvore de páginas: {reference.idnum}")
+
+        kids = list(obj['/Kids'])
+        if any(type(kid) is not IndirectObject for kid in kids):
+            raise PageTreeError("Página sem referência indireta")
+
+        count = obj.get('/Count')
+        if not isinstance(count, int) or count < 0:
+            raise PageTreeError(f"/Count inválido no nó {reference.idnum}")
+
+        inherited = dict(inherited)
+        for key in INHERITABLE_KEYS:
+            if key in obj:
+                inherited[key] = obj.raw_get(key)
+
+        node = self._nodes[reference.idnum] = _Node(kids, int(count), inherited)
+        return node
+
+    def _kind(self, reference: IndirectObject) -> str:
+        """'/Page' ou '/Pages' para um filho da árvore."""
+        kind = self._kinds.get(reference.idnum)
+        if kind is None:
+            kind = self._raw_kind(reference.idnum)
+        if kind is None:
+            obj = reference.get_object()
+            if not isinstance(obj, dict):
+                raise PageTreeError(f"Nó inválido na árvore de páginas: {reference.idnum}")
+            kind = obj.get('/Type', '/Pages' if '/Kids' in obj else '/Page')
+        self._kinds[reference.idnum] = kind
+        return kind
+
+    def _raw_kind(self, idnum: int) -> Optional[str]:
+        """/Type de um objeto lido diretamente do arquivo ('/Pages' ou '/Page' se ausente)."""
+        raw = self._raw(idnum)
+        if raw is None:
+            return None
+        kind = raw.value('/Type')
+        if kind is not None:
+            return kind.decode('latin-1')
+        return '/Pages' if '/Kids' in raw.entries else '/Page'
+
+    def _starts(self, node: _Node) -> List[int]:
+        """Início de cada filho do nó, lendo os filhos uma única vez."""
+        if node.starts is None:
+            starts = [0]
+            for kid in node.kids:
+                if self._kind(kid) == '/Page':
+                    starts.append(starts[-1] + 1)
+                else:
+                    starts.append(starts[-1] + self._node(kid, node.inherited).count)
+            if starts[-1] != node.count:
+                raise PageTreeError("/Count diferente do número de páginas do nó")
+            node.starts = starts
+        return node.starts
+
+    def page_ref(self, page_num: int) -> Tuple[IndirectObject, dict]:
+        """
+        Localiza uma página.
+
+        Args:
+            page_num: Número da página (base zero)
+
+        Returns:
+            Tupla (referência da página, atributos herdados da árvore que a
+            página pode não ter)
+
+        Raises:
+            IndexError: Se a página não existir
+            PageTreeError: Se a árvore for inconsistente com os /Count
+        """
+        found = self._pages.get(page_num)
+        if found is not None:
+            return found
+        if not 0 <= page_num < self.count:
+            raise IndexError(f"Página {page_num + 1} não existe")
+
+        node = self._root
+        offset = page_num
+        for _depth in range(MAX_DEPTH):
+            # Nó com um filho por página: só o filho na posição é lido; se ele
+            # for um /Pages (há um /Pages vazio deslocando as posições), os
+            # inícios de todos os filhos são calculados abaixo
+            if node.starts is None and node.count == len(node.kids):
+                kid = node.kids[offset]
+                if self._kind(kid) == '/Page':
+                    found = self._pages[page_num] = (kid, node.inherited)
+                    return found
+
+            starts = self._starts(node)
+            position = bisect.bisect_right(starts, offset) - 1
+            kid = node.kids[position]
+            offset -= starts[position]
+            if self._kind(kid) == '/Page':
+                found = self._pages[page_num] = (kid, node.inherited)
+                return found
+            node = self._node(kid, node.inherited)
+
+        raise PageTreeError("Árvore de páginas profunda demais ou com ciclo")
+
+    def page(self, page_num: int) -> PageObject:
+        """Página com os atributos herdados, como em reader.pages[page_num]."""
+        reference, inherited = self.page_ref(page_num)
+        page = PageObject(self.reader, reference)
+        page.update(reference.get_object())
+        for key, value in inherited.items():
+            if key not in page:
+                page[NameObject(key)] = value
+        return page
+
+    def is_page(self, idnum: int) -> bool:
+        """Se o objeto é uma página (de qualquer parte da árvore)."""
+        kind = self._kinds.get(idnum)
+        if kind is None:
+            kind = self._types.get(idnum)
+        if kind is None:
+            raw = self._raw(idnum)
+            if raw is not None:
+                kind = raw.value('/Type')
+                kind = self._types[idnum] = kind.decode('latin-1') if kind is not None else ''
+        if kind is None:
+            obj = self.reader.get_object(idnum)
+            kind = self._types[idnum] = obj.get('/Type', '') if isinstance(obj, dict) else ''
+        return kind == '/Page'
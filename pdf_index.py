@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Índice do grafo de objetos de um PDF.
+
+Percorre uma única vez os objetos alcançáveis a partir de cada página e
+registra, para cada página, o conjunto transitivo de objetos referenciados,
+o tamanho em bytes de cada objeto e quantas páginas compartilham cada um.
+"""
+
+from typing import Dict, FrozenSet, List, Set
+from PyPDF2 import PdfReader
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+
+
+# Chaves que o PdfWriter não copia ao adicionar uma página
+IGNORED_KEYS = ('/Parent', '/StructParents')
+
+
+class _ByteCounter:
+    """Destino de escrita que apenas conta os bytes recebidos."""
+
+    def __init__(self):
+        self.count = 0
+
+    def write(self, data: bytes) -> int:
+        self.count += len(data)
+        return len(data)
+
+
+def serialized_size(obj) -> int:
+    """
+    Retorna o número de bytes que o objeto ocupa quando serializado.
+
+    Args:
+        obj: Objeto PDF já resolvido
+
+    Returns:
+        Tamanho serializado em bytes (sem cabeçalho de objeto indireto)
+    """
+    counter = _ByteCounter()
+    obj.write_to_stream(counter, None)
+    return counter.count
+
+
+def object_kind(obj) -> str:
+    """
+    Descreve o tipo de um objeto para relatórios (ex.: "/Font /TrueType").
+
+    Args:
+        obj: Objeto PDF já resolvido
+
+    Returns:
+        /Type e /Subtype do objeto ou, na falta deles, o papel mais provável
+    """
+    if isinstance(obj, DictionaryObject):
+        kind = ' '.join(str(obj[key]) for key in ('/Type', '/Subtype') if key in obj)
+        if kind:
+            return kind
+        if isinstance(obj, StreamObject):
+            if any(key in obj for key in ('/Length1', '/Length2', '/Length3')):
+                return '/FontFile'
+            if '/N' in obj:
+                return '/ICCBased'
+            return 'stream'
+        return 'dicionário'
+    if isinstance(obj, ArrayObject):
+        return 'array'
+    return type(obj).__name__
+
+
+class PdfObjectIndex:
+    """Mapeia cada página aos objetos indiretos que ela referencia."""
+
+    def __init__(self, reader: PdfReader):
+        """
+        Constrói o índice percorrendo o grafo de objetos uma única vez.
+
+        Args:
+            reader: Leitor do PDF de origem
+        """
+        self.reader = reader
+        self.page_objects: List[FrozenSet[int]] = []
+        self.object_sizes: Dict[int, int] = {}
+        self.object_pages: Dict[int, int] = {}
+        self.object_kinds: Dict[int, str] = {}
+        self.stream_objects: Set[int] = set()
+        # Referências diretas de cada objeto, resolvidas uma única vez
+        self._children: Dict[int, List[int]] = {}
+
+        pages = list(reader.pages)
+        self.page_ids = [self._object_id(page) for page in pages]
+        self._page_id_set = set(self.page_ids)
+
+        # Páginas são visitadas pela versão com atributos herdados já aplicados
+        for page in pages:
+            self._visit(page)
+
+        for page_id in self.page_ids:
+            objects = self._closure(page_id)
+            self.page_objects.append(objects)
+            for idnum in objects:
+                self.object_pages[idnum] = self.object_pages.get(idnum, 0) + 1
+
+    @property
+    def total_pages(self) -> int:
+        """Número de páginas indexadas."""
+        return len(self.page_objects)
+
+    def _object_id(self, obj) -> int:
+        """Retorna o número do objeto indireto de origem ou -1."""
+        ref = getattr(obj, 'indirect_reference', None)
+        if ref is not None and ref.pdf is self.reader:
+            return ref.idnum
+        return -1
+
+    def _visit(self, root) -> None:
+        """
+        Registra um objeto indireto e tudo o que ele alcança.
+
+        Cada objeto é resolvido e medido uma única vez; objetos diretos
+        aninhados são percorridos até encontrar as referências para outros
+        objetos indiretos.
+
+        Args:
+            root: Objeto indireto já resolvido
+        """
+        pending = [root]
+
+        while pending:
+            obj = pending.pop()
+            idnum = self._object_id(obj)
+            if idnum in self._children:
+                continue
+
+            self.object_sizes[idnum] = serialized_size(obj)
+            self.object_kinds[idnum] = object_kind(obj)
+            if isinstance(obj, StreamObject):
+                self.stream_objects.add(idnum)
+            self._children[idnum] = children = []
+            stack = [obj]
+
+            while stack:
+                item = stack.pop()
+
+                if isinstance(item, IndirectObject):
+                    if item.idnum not in self._children and item.idnum not in self._page_id_set:
+                        resolved = item.get_object()
+                        if resolved is None:
+                            continue
+                        pending.append(resolved)
+                    children.append(item.idnum)
+                    continue
+
+                if item is not obj:
+                    nested_id = self._object_id(item)
+                    if nested_id >= 0:
+                        # Objeto indireto já resolvido e embutido (atributos herdados)
+                        pending.append(item)
+                        children.append(nested_id)
+                        continue
+
+                if isinstance(item, DictionaryObject):
+                    for key, value in item.items():
+                        if key not in IGNORED_KEYS:
+                            stack.append(value)
+                elif isinstance(item, ArrayObject):
+                    stack.extend(item)
+
+    def _closure(self, idnum: int) -> FrozenSet[int]:
+        """Retorna o conjunto transitivo de objetos a partir de idnum."""
+        seen: Set[int] = {idnum}
+        stack = [idnum]
+        while stack:
+            for child in self._children.get(stack.pop(), ()):
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+        return frozenset(seen)
+
+    def is_shared(self, idnum: int) -> bool:
+        """Indica se o objeto é referenciado por mais de uma página."""
+        return self.object_pages.get(idnum, 0) > 1
+
+    def page_size(self, page_num: int) -> int:
+        """
+        Retorna o tamanho bruto de todos os objetos de uma página.
+
+        Args:
+            page_num: Índice da página (base zero)
+
+        Returns:
+            Soma dos tamanhos dos objetos, compartilhados ou não
+        """
+        return sum(self.object_sizes.get(idnum, 0) for idnum in self.page_objects[page_num])
+
+    def unique_size(self, page_num: int) -> int:
+        """Retorna o tamanho dos objetos usados apenas por esta página."""
+        return sum(
+            self.object_sizes.get(idnum, 0)
+            for idnum in self.page_objects[page_num]
+            if not self.is_shared(idnum)
+        )
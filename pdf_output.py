@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Gravação das partes geradas.
+
+As partes podem ser gravadas no formato clássico, com cada objeto indireto
+como texto e uma tabela de referências cruzadas com 20 bytes por objeto, ou
+no formato compacto do PDF 1.5: os objetos que não são streams (páginas,
+dicionários de recursos, fontes, anotações) são agrupados em streams de
+objetos comprimidos, e a tabela de referências cruzadas vira ela mesma um
+stream comprimido. Streams (conteúdo das páginas, imagens, fontes
+embutidas) são copiados como estão, pois já costumam ter filtro próprio.
+"""
+
+import io
+import re
+import zlib
+from typing import List, Optional, Sequence, Tuple
+
+from PyPDF2 import PdfWriter
+from PyPDF2.generic import StreamObject
+
+
+# Objetos em cada stream de objetos (partes grandes geram vários streams)
+OBJECTS_PER_STREAM = 100
+
+# Versão mínima do PDF com streams de objetos e de referências cruzadas
+OBJECT_STREAMS_VERSION = b'1.5'
+
+# Segunda linha do arquivo: comentário binário, como no PdfWriter
+BINARY_MARKER = b'%\xE2\xE3\xCF\xD3\n'
+
+_VERSION_PATTERN = re.compile(rb'%PDF-(\d\.\d)')
+
+# Objeto já serializado, sem "N 0 obj" e "endobj": (texto, se é um stream)
+SerializedObject = Tuple[bytes, bool]
+
+
+def pdf_header(version: bytes) -> bytes:
+    """Linha de cabeçalho "%PDF-x.y"."""
+    return b'%PDF-' + version
+
+
+def header_version(header) -> bytes:
+    """Versão declarada em um cabeçalho "%PDF-x.y" (1.3 se não for reconhecida)."""
+    if isinstance(header, str):
+        header = header.encode()
+    match = _VERSION_PATTERN.match(header)
+    return match.group(1) if match else b'1.3'
+
+
+def write_pdf(
+    version: bytes,
+    objects: Sequence[SerializedObject],
+    root: int,
+    info: Optional[int] = None,
+    object_streams: bool = False
+) -> io.BytesIO:
+    """
+    Grava um PDF a partir dos objetos já serializados.
+
+    Args:
+        version: Versão do PDF (ex.: b'1.4'); com streams de objetos, no
+            mínimo 1.5
+        objects: Objetos na ordem de numeração (o primeiro é o objeto 1)
+        root: Número do catálogo
+        info: Número do dicionário de informações (opcional)
+        object_streams: Agrupa os objetos em streams de objetos e grava a
+            tabela de referências cruzadas como stream
+
+    Returns:
+        Buffer com o PDF gravado
+    """
+    if object_streams:
+        return _write_object_streams(version, objects, root, info)
+
+    out = io.BytesIO()
+    out.write(pdf_header(version) + b'\n' + BINARY_MARKER)
+    offsets = []
+    for number, (body, _is_stream) in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b'%d 0 obj\n' % number)
+        out.write(body)
+        out.write(b'\nendobj\n')
+
+    xref_location = out.tell()
+    out.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(offsets) + 1))
+    out.write(b''.join(b'%010d 00000 n \n' % offset for offset in offsets))
+    trailer = b'/Size %d\n/Root %d 0 R\n' % (len(offsets) + 1, root)
+    if info is not None:
+        trailer += b'/Info %d 0 R\n' % info
+    out.write(
+        b'trailer\n<<\n%s>>\nstartxref\n%d\n%%%%EOF\n' % (trailer, xref_location)
+    )
+    return out
+
+
+def _field_width(value: int) -> int:
+    """Bytes necessários para um campo da tabela de referências cruzadas."""
+    return max(1, (value.bit_length() + 7) // 8)
+
+
+def _write_object_streams(
+    version: bytes,
+    objects: Sequence[SerializedObject],
+    root: int,
+    info: Optional[int]
+) -> io.BytesIO:
+    """Grava um PDF com streams de objetos e stream de referências cruzadas."""
+    version = max(version, OBJECT_STREAMS_VERSION)
+    out = io.BytesIO()
+    out.write(pdf_header(version) + b'\n' + BINARY_MARKER)
+
+    # Entradas da tabela: (tipo, posição ou stream de objetos, geração ou índice)
+    entries: List[Tuple[int, int, int]] = [(0, 0, 65535)]
+    packed = []
+    for number, (body, is_stream) in enumerate(objects, start=1):
+        if is_stream:
+            entries.append((1, out.tell(), 0))
+            out.write(b'%d 0 obj\n' % number)
+            out.write(body)
+            out.write(b'\nendobj\n')
+        else:
+            entries.append(None)
+            packed.append((number, body))
+
+    number = len(objects)
+    for first in range(0, len(packed), OBJECTS_PER_STREAM):
+        group = packed[first:first + OBJECTS_PER_STREAM]
+        number += 1
+
+        # Cabeçalho "número posição" de cada objeto, seguido dos objetos
+        bodies = []
+        positions = []
+        position = 0
+        for index, (packed_number, body) in enumerate(group):
+            entries[packed_number] = (2, number, index)
+            positions.append(b'%d %d' % (packed_number, position))
+            bodies.append(body)
+            position += len(body) + 1
+        header = b' '.join(positions) + b'\n'
+        data = zlib.compress(header + b'\n'.join(bodies) + b'\n')
+
+        entries.append((1, out.tell(), 0))
+        out.write(
+            b'%d 0 obj\n<<\n/Type /ObjStm\n/N %d\n/First %d\n/Filter /FlateDecode\n'
+            b'/Length %d\n>>\nstream\n' % (number, len(group), len(header), len(data))
+        )
+        out.write(data)
+        out.write(b'\nendstream\nendobj\n')
+
+    # O próprio stream de referências cruzadas também tem uma entrada
+    number += 1
+    xref_location = out.tell()
+    entries.append((1, xref_location, 0))
+
+    width = _field_width(max(value for _kind, value, _extra in entries))
+    table = b''.join(
+        kind.to_bytes(1, 'big') + value.to_bytes(width, 'big') + extra.to_bytes(2, 'big')
+        for kind, value, extra in entries
+    )
+    data = zlib.compress(table)
+
+    trailer = b'/Size %d\n/Root %d 0 R\n' % (len(entries), root)
+    if info is not None:
+        trailer += b'/Info %d 0 R\n' % info
+    out.write(
+        b'%d 0 obj\n<<\n/Type /XRef\n%s/W [ 1 %d 2 ]\n/Filter /FlateDecode\n'
+        b'/Length %d\n>>\nstream\n' % (number, trailer, width, len(data))
+    )
+    out.write(data)
+    out.write(b'\nendstream\nendobj\nstartxref\n%d\n%%%%EOF\n' % xref_location)
+    return out
+
+
+def write_pdf_writer(writer: PdfWriter, object_streams: bool = False) -> io.BytesIO:
+    """
+    Grava o conteúdo de um PdfWriter, opcionalmente com streams de objetos.
+
+    O PdfWriter do PyPDF2 3.x só grava o formato clássico; aqui os objetos
+    são preparados como no PdfWriter.write e serializados por write_pdf.
+
+    Args:
+        writer: PdfWriter com as páginas já adicionadas
+        object_streams: Agrupa os objetos em streams de objetos
+
+    Returns:
+        Buffer com o PDF gravado
+    """
+    if not object_streams:
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        return buffer
+
+    # Mesma preparação do PdfWriter.write_stream: catálogo e referências resolvidas
+    if not writer._root:
+        writer._root = writer._add_object(writer._root_object)
+    writer._sweep_indirect_references(writer._root)
+
+    objects = []
+    body = io.BytesIO()
+    for obj in writer._objects:
+        if obj is None:
+            objects.append((b'null', False))
+            continue
+        body.seek(0)
+        body.truncate()
+        obj.write_to_stream(body, None)
+        objects.append((body.getvalue(), isinstance(obj, StreamObject)))
+
+    return write_pdf(
+        header_version(writer.pdf_header),
+        objects,
+        writer._root.idnum,
+        writer._info.idnum,
+        object_streams=True
+    )
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Leitura rápida de metadados de arquivos PDF.
+
+Obtém número de páginas, versão, criptografia, linearização, tamanho e
+produtor lendo apenas o trailer, a tabela (ou stream) de referências
+cruzadas e o objeto /Root/Pages, sem percorrer a árvore de páginas.
+"""
+
+import mmap
+import os
+import re
+from typing import Optional
+from PyPDF2 import PdfReader
+
+from page_tree import PageTreeIndex
+
+
+# Bytes do início do arquivo inspecionados (cabeçalho e dicionário de linearização)
+HEAD_SIZE = 1024
+
+_VERSION_PATTERN = re.compile(rb'%PDF-(\d\.\d)')
+
+
+def open_source(input_pdf: str) -> mmap.mmap:
+    """
+    Mapeia o PDF de origem em memória, somente para leitura.
+
+    O leitor consome o arquivo diretamente do mapeamento, sem carregar uma
+    cópia inteira no heap do Python; só as páginas efetivamente lidas passam
+    a ocupar memória residente.
+
+    Args:
+        input_pdf: Caminho do PDF de origem
+
+    Returns:
+        Mapeamento somente leitura do arquivo
+    """
+    if os.path.getsize(input_pdf) == 0:
+        raise ValueError(f"Arquivo vazio: {input_pdf}")
+
+    with open(input_pdf, 'rb') as source_file:
+        return mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _page_count(reader: PdfReader) -> int:
+    """
+    Retorna o número de páginas a partir de /Root/Pages/Count.
+
+    Lê a raiz diretamente do arquivo quando possível (ver page_tree), sem
+    interpretar o /Kids; só percorre a árvore de páginas inteira se o
+    /Count estiver ausente ou inválido.
+    """
+    try:
+        return PageTreeIndex(reader).count
+    except Exception:
+        pass
+
+    try:
+        count = reader.trailer['/Root']['/Pages']['/Count']
+        if isinstance(count, int) and count >= 0:
+            return int(count)
+    except Exception:
+        pass
+
+    return len(reader.pages)
+
+
+def _producer(reader: PdfReader) -> Optional[str]:
+    """Retorna o produtor do documento, se disponível."""
+    try:
+        metadata = reader.metadata
+        return str(metadata.producer) if metadata and metadata.producer else None
+    except Exception:
+        return None
+
+
+def probe_reader(reader: PdfReader, source) -> dict:
+    """
+    Extrai os metadados de um PDF já aberto.
+
+    Args:
+        reader: Leitor do PDF (apenas trailer e xref precisam estar lidos)
+        source: Conteúdo do arquivo (mapeamento ou bytes)
+
+    Returns:
+        Dicionário com total de páginas, versão, criptografia, linearização
+        e produtor
+    """
+    head = source[:HEAD_SIZE]
+    match = _VERSION_PATTERN.search(head)
+    version = match.group(1).decode() if match else None
+
+    # O catálogo pode declarar uma versão mais nova que a do cabeçalho
+    try:
+        catalog_version = reader.trailer['/Root'].get('/Version')
+        if catalog_version and (version is None or str(catalog_version)[1:] > version):
+            version = str(catalog_version)[1:]
+    except Exception:
+        pass
+
+    return {
+        'total_paginas': _page_count(reader),
+        'versao': version,
+        'criptografado': reader.is_encrypted,
+        'linearizado': b'/Linearized' in head,
+        'produtor': _producer(reader)
+    }
+
+
+def probe_pdf(input_pdf: str) -> dict:
+    """
+    Lê rapidamente os metadados de um arquivo PDF.
+
+    Args:
+        input_pdf: Caminho do arquivo PDF
+
+    Returns:
+        Dicionário com as mesmas chaves de PDFSplitter.get_info
+    """
+    if not os.path.exists(input_pdf):
+        raise FileNotFoundError(f"Arquivo não encontrado: {input_pdf}")
+
+    file_size = os.path.getsize(input_pdf)
+    info = {
+        'arquivo': input_pdf,
+        'tamanho_bytes': file_size,
+        'tamanho_mb': round(file_size / (1024 * 1024), 2)
+    }
+
+    with open_source(input_pdf) as source:
+        info.update(probe_reader(PdfReader(source), source))
+
+    return info
@@ -0,0 +1,583 @@
+#!/usr/bin/env python3
+"""
+Cópia direta de intervalos de páginas.
+
+O PdfWriter clona cada página e todo o grafo de objetos que ela alcança,
+interpretando cada objeto, e ao gravar percorre esse grafo de novo para
+resolver as referências. Aqui os objetos são copiados byte a byte do PDF de
+origem mapeado em memória: só as referências "N G R" são renumeradas, e o
+conteúdo dos streams nunca é interpretado, decodificado ou recodificado.
+Cada objeto é preparado uma única vez (um molde com as posições das
+referências) e reaproveitado por todas as partes que o usam.
+
+Das páginas são removidos /Parent e /StructParents, como no PdfWriter, e
+acrescentados os atributos herdados da árvore de páginas. Objetos cujo
+dicionário tem strings ou comentários (onde "N G R" poderia ser texto) são
+serializados a partir do objeto interpretado pelo PyPDF2, no mesmo formato
+do PdfWriter.
+
+Só se aplica a intervalos autocontidos, cujos objetos não apontam para
+páginas fora do intervalo, para a árvore de páginas ou para o catálogo, e a
+PDFs sem criptografia nem streams de objetos; nos demais casos,
+NotSelfContained indica que o PdfWriter deve ser usado.
+"""
+
+import io
+import re
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from PyPDF2 import PdfReader
+from PyPDF2.generic import IndirectObject, NullObject, StreamObject
+
+from instrumentation import stage
+from pdf_output import header_version, write_pdf
+
+if TYPE_CHECKING:
+    from page_tree import PageTreeIndex
+
+
+# Atributos que as páginas herdam dos nós da árvore de páginas
+INHERITABLE_KEYS = ('/Resources', '/MediaBox', '/CropBox', '/Rotate')
+
+# Chaves da página que o PdfWriter não copia
+IGNORED_PAGE_KEYS = ('/Parent', '/StructParents')
+
+# Tipos de objeto que pertencem ao documento inteiro, e não a páginas
+DOCUMENT_TYPES = ('/Pages', '/Catalog')
+
+# Cabeçalho "N G obj" na posição indicada pela tabela de referências cruzadas
+_OBJECT_HEADER = re.compile(rb'\s*(\d+)\s+(\d+)\s+obj\b')
+
+# Primeira palavra-chave após o cabeçalho: início do stream ou fim do objeto
+_BODY_END = re.compile(rb'(?<=[\s>])stream(?:\r\n|\n|\r)|endobj')
+
+# Fim do stream após o conteúdo
+_STREAM_END = re.compile(rb'\s*endstream')
+
+# Referência indireta "N G R", delimitada como um token
+_REFERENCE = re.compile(rb'(?<![^\s\[\]<>(){}])(\d+)\s+\d+\s+R(?![^\s\[\]<>(){}/%])')
+
+# /Type de objetos do documento inteiro, em qualquer nível do objeto
+_DOCUMENT_TYPE = re.compile(rb'/Type\s*/(?:Pages|Catalog)(?![^\s\[\]<>(){}/%])')
+
+# Tokens de um objeto sem strings nem comentários
+_TOKEN = re.compile(rb'<<|>>|\[|\]|/[^\s/\[\]<>(){}%]*|[^\s/\[\]<>(){}%]+')
+
+# Molde de um objeto: trechos literais (bytes), referências (número do
+# objeto de origem) e intervalos do arquivo de origem (slice)
+Template = List[Union[bytes, int, slice]]
+
+
+class NotSelfContained(Exception):
+    """O intervalo não pode ser copiado diretamente e precisa do PdfWriter."""
+
+
+class RawObject:
+    """Texto de um objeto na origem, com as entradas do dicionário de nível mais alto."""
+
+    def __init__(self, text: bytes, is_stream: bool = False):
+        self.text = text
+        self.is_stream = is_stream
+        self._parsed = None
+
+    def _parse(self) -> None:
+        if self._parsed is None:
+            self._parsed = _top_level_entries(self.text) or (None, len(self.text))
+
+    @property
+    def entries(self) -> Optional[Dict[str, Tuple[int, int]]]:
+        """Entradas do dicionário (chave -> início e fim), ou None se não for um dicionário."""
+        self._parse()
+        return self._parsed[0]
+
+    @property
+    def end(self) -> int:
+        """Posição do ">>" que fecha o dicionário."""
+        self._parse()
+        return self._parsed[1]
+
+    def value(self, key: str) -> Optional[bytes]:
+        """Texto do valor de uma entrada, ou None se ela não existir."""
+        if self.entries is None or key not in self.entries:
+            return None
+        start, end = self.entries[key]
+        return self.text[start + len(key):end].strip()
+
+
+def object_offsets(reader: PdfReader) -> Dict[int, int]:
+    """Posição de cada objeto no arquivo (a última versão, se houver várias gerações)."""
+    offsets: Dict[int, int] = {}
+    for generation in sorted(reader.xref):
+        offsets.update(reader.xref[generation])
+    return offsets
+
+
+def read_raw_object(source, offset: int, idnum: int) -> Optional[RawObject]:
+    """
+    Lê o texto de um objeto na origem, sem interpretá-lo.
+
+    Args:
+        source: Conteúdo do arquivo (mapeamento ou bytes)
+        offset: Posição do objeto, indicada pela tabela de referências cruzadas
+        idnum: Número do objeto esperado nessa posição
+
+    Returns:
+        Objeto bruto (para streams, o texto inclui a palavra-chave
+        "stream" e o fim de linha), ou None se ele precisar ser
+        interpretado pelo PyPDF2
+    """
+    header = _OBJECT_HEADER.match(source, offset)
+    if header is None or int(header.group(1)) != idnum:
+        return None
+
+    body_end = _BODY_END.search(source, header.end())
+    if body_end is None:
+        return None
+    text = source[header.end():body_end.start()]
+
+    # Em strings e comentários, "N G R" poderia ser texto e não referência
+    if b'(' in text or b'%' in text:
+        return None
+
+    if body_end.group() == b'endobj':
+        return RawObject(text.rstrip())
+    return RawObject(text + body_end.group(), is_stream=True)
+
+
+def _is_stream(obj) -> bool:
+    # As classes do PyPDF2 são Protocols, e isinstance com elas é lento
+    return StreamObject in type(obj).__mro__
+
+
+def _top_level_entries(text: bytes) -> Optional[Tuple[Dict[str, Tuple[int, int]], int]]:
+    """
+    Localiza as entradas do dicionário de nível mais alto de um objeto.
+
+    Um nome nesse nível é chave quando o token anterior não é uma chave:
+    valores nunca são dois nomes seguidos.
+
+    Args:
+        text: Texto do objeto, sem strings nem comentários
+
+    Returns:
+        Tupla (chave -> (início da chave, início da chave seguinte), posição
+        do ">>" final), ou None se o objeto não for um dicionário
+    """
+    entries = {}
+    depth = 0
+    previous_was_key = False
+    current = None
+
+    for token in _TOKEN.finditer(text):
+        value = token.group()
+
+        if depth == 0 and value != b'<<':
+            return None
+
+        if value == b'<<' or value == b'[':
+            previous_was_key = False
+            depth += 1
+        elif value == b'>>' or value == b']':
+            depth -= 1
+            if depth == 0:
+                if current is not None:
+                    entries[current[0]] = (current[1], token.start())
+                return entries, token.start()
+        elif depth == 1:
+            if value[:1] == b'/' and not previous_was_key:
+                if current is not None:
+                    entries[current[0]] = (current[1], token.start())
+                current = (value.decode('latin-1'), token.start())
+                previous_was_key = True
+            else:
+                previous_was_key = False
+
+    return None
+
+
+class RawPageCopier:
+    """Gera PDFs com intervalos de páginas copiando os objetos da origem diretamente."""
+
+    def __init__(self, reader: PdfReader, page_tree: Optional["PageTreeIndex"] = None):
+        """
+        Prepara a cópia direta a partir de um leitor já aberto.
+
+        Percorre só os nós da árvore de páginas; as páginas em si não são
+        interpretadas. Com page_tree, nem a árvore é percorrida: cada página
+        é localizada pelo índice quando é copiada.
+
+        Args:
+            reader: Leitor do PDF de origem (o arquivo precisa continuar aberto)
+            page_tree: PageTreeIndex do leitor (ver page_tree), para copiar
+                poucas páginas sem ler as demais
+
+        Raises:
+            NotSelfContained: Se o PDF for criptografado, usar streams de
+                objetos ou tiver uma árvore de páginas que não possa ser lida
+                diretamente
+        """
+        if reader.is_encrypted:
+            raise NotSelfContained("PDF criptografado")
+        if reader.xref_objStm:
+            raise NotSelfContained("PDF com streams de objetos")
+
+        self.reader = reader
+        self._source = reader.stream
+
+        self._offsets = object_offsets(reader)
+
+        self._templates: Dict[int, Template] = {}
+        self._references: Dict[int, List[int]] = {}
+        self._inherited: Dict[int, dict] = {}
+        self._raw_pages: Dict[int, Optional[RawObject]] = {}
+        self._streams: Set[int] = set()
+        self._page_tree = page_tree
+        if page_tree is None:
+            self.page_ids = self._walk_page_tree()
+            self._page_id_set = set(self.page_ids)
+
+        # Mesma versão que o PdfWriter declararia: a maior entre 1.3 e a da origem
+        self.version = max(header_version(reader.pdf_header), b'1.3')
+
+    def _raw_object(self, idnum: int) -> Optional[RawObject]:
+        """Lê o texto de um objeto na origem, sem interpretá-lo (ver read_raw_object)."""
+        offset = self._offsets.get(idnum)
+        if offset is None:
+            raise NotSelfContained(f"Objeto {idnum} inexistente")
+        return read_raw_object(self._source, offset, idnum)
+
+    def _node_type(self, idnum: int) -> Tuple[str, Optional[RawObject]]:
+        """
+        Tipo de um nó da árvore de páginas.
+
+        Returns:
+            Tupla ('/Pages' ou '/Page', objeto bruto ou None se o nó
+            precisar ser interpretado)
+        """
+        raw = self._raw_object(idnum)
+        if raw is not None and raw.entries is not None:
+            kind = raw.value('/Type')
+            if kind is not None:
+                return kind.decode('latin-1'), raw
+            return ('/Pages' if '/Kids' in raw.entries else '/Page'), raw
+
+        node = self.reader.get_object(idnum)
+        if not isinstance(node, dict):
+            raise NotSelfContained(f"Nó inválido na árvore de páginas: {idnum}")
+        return node.get('/Type', '/Pages' if '/Kids' in node else '/Page'), None
+
+    def _walk_page_tree(self) -> List[int]:
+        """
+        Lista as páginas na ordem do documento e guarda os atributos que cada uma herda.
+
+        Returns:
+            Números dos objetos das páginas
+        """
+        root = self.reader.trailer['/Root'].raw_get('/Pages')
+        if type(root) is not IndirectObject:
+            raise NotSelfContained("Árvore de páginas sem referência indireta")
+
+        page_ids = []
+        visited = set()
+        stack = [(root.idnum, {})]
+
+        while stack:
+            idnum, inherited = stack.pop()
+            if idnum in visited:
+                raise NotSelfContained("Árvore de páginas com ciclo")
+            visited.add(idnum)
+
+            kind, raw = self._node_type(idnum)
+            if kind == '/Page':
+                page_ids.append(idnum)
+                self._raw_pages[idnum] = raw
+                self._inherited[idnum] = inherited
+                continue
+
+            node = self.reader.get_object(idnum)
+            inherited = dict(inherited)
+            for key in INHERITABLE_KEYS:
+                if key in node:
+                    inherited[key] = node.raw_get(key)
+
+            kids = node.get('/Kids', [])
+            if any(type(kid) is not IndirectObject for kid in kids):
+                raise NotSelfContained("Página sem referência indireta")
+            # A pilha é percorrida do fim, então os filhos entram invertidos
+            stack.extend((kid.idnum, inherited) for kid in reversed(kids))
+
+        return page_ids
+
+    def _page_id(self, page_num: int) -> int:
+        """Número do objeto de uma página (com page_tree, localizada no primeiro uso)."""
+        if self._page_tree is None:
+            return self.page_ids[page_num]
+
+        reference, inherited = self._page_tree.page_ref(page_num)
+        idnum = reference.idnum
+        if idnum not in self._inherited:
+            self._inherited[idnum] = inherited
+            self._raw_pages[idnum] = self._raw_object(idnum)
+        return idnum
+
+    def _is_page(self, idnum: int) -> bool:
+        """Se o objeto é uma página da origem."""
+        if self._page_tree is None:
+            return idnum in self._page_id_set
+        return self._page_tree.is_page(idnum)
+
+    def _raw_template(self, raw: RawObject, drop: Tuple[str, ...] = ()) -> Template:
+        """
+        Monta o molde de um objeto bruto, sem as entradas em drop.
+
+        Para streams, o conteúdo entra como um intervalo da origem, lido só
+        na gravação.
+        """
+        text = raw.text
+        if drop and raw.entries is not None:
+            cuts = sorted(raw.entries[key] for key in drop if key in raw.entries)
+            kept = []
+            position = 0
+            for start, end in cuts:
+                kept.append(text[position:start])
+                position = end
+            kept.append(text[position:])
+            text = b''.join(kept)
+
+        template: Template = []
+        position = 0
+        for reference in _REFERENCE.finditer(text):
+            template.append(text[position:reference.start()])
+            template.append(int(reference.group(1)))
+            position = reference.end()
+        template.append(text[position:])
+        return template
+
+    def _stream_range(self, idnum: int, raw: RawObject) -> Optional[slice]:
+        """Intervalo do conteúdo de um stream na origem, ou None se não puder ser delimitado."""
+        length = raw.value('/Length')
+        if length is None:
+            return None
+        reference = _REFERENCE.fullmatch(length)
+        if reference is not None:
+            length = self.reader.get_object(int(reference.group(1)))
+            if not isinstance(length, int):
+                return None
+        elif length.isdigit():
+            length = int(length)
+        else:
+            return None
+
+        header = _OBJECT_HEADER.match(self._source, self._offsets[idnum])
+        data_start = header.end() + len(raw.text)
+        data_end = data_start + length
+        if not _STREAM_END.match(self._source, data_end):
+            return None
+        return slice(data_start, data_end)
+
+    def _parsed_template(self, obj, top: bool = True) -> Template:
+        """Monta o molde de um objeto interpretado pelo PyPDF2, no formato do PdfWriter."""
+        template: Template = []
+        out = io.BytesIO()
+
+        def flush() -> None:
+            template.append(out.getvalue())
+            out.seek(0)
+            out.truncate()
+
+        def write(value, top: bool = False) -> None:
+            value_type = type(value)
+            if value_type is IndirectObject:
+                flush()
+                template.append(value.idnum)
+                return
+
+            ref = getattr(value, 'indirect_reference', None)
+            if not top and ref is not None and ref.pdf is self.reader:
+                # Objeto indireto já resolvido e embutido em outro
+                flush()
+                template.append(ref.idnum)
+                return
+
+            if issubclass(value_type, dict):
+                is_stream = _is_stream(value)
+                out.write(b'<<\n')
+                for key, item in value.items():
+                    if is_stream and key == '/Length':
+                        continue
+                    key.write_to_stream(out, None)
+                    out.write(b' ')
+                    write(item)
+                    out.write(b'\n')
+
+                if is_stream:
+                    out.write(b'/Length %d\n>>\nstream\n' % len(value._data))
+                    flush()
+                    template.append(value._data)
+                    out.write(b'\nendstream')
+                else:
+                    out.write(b'>>')
+            elif issubclass(value_type, list):
+                out.write(b'[')
+                for item in value:
+                    out.write(b' ')
+                    write(item)
+                out.write(b' ]')
+            else:
+                value.write_to_stream(out, None)
+
+        write(obj, top)
+        flush()
+        return template
+
+    def _set_template(self, idnum: int, template: Template) -> None:
+        self._templates[idnum] = template
+        self._references[idnum] = [item for item in template if type(item) is int]
+
+    def _prepare_object(self, idnum: int) -> None:
+        """Prepara o molde de um objeto que não é página, uma única vez."""
+        if idnum in self._templates:
+            return
+
+        raw = self._raw_object(idnum)
+        if raw is not None:
+            if _DOCUMENT_TYPE.search(raw.text):
+                raise NotSelfContained(f"Referência à árvore de páginas ou ao catálogo: {idnum}")
+
+            if raw.is_stream:
+                data = self._stream_range(idnum, raw)
+                if data is not None:
+                    template = self._raw_template(raw)
+                    template.extend([data, b'\nendstream'])
+                    self._set_template(idnum, template)
+                    self._streams.add(idnum)
+                    return
+            else:
+                self._set_template(idnum, self._raw_template(raw))
+                return
+
+        obj = self.reader.get_object(idnum)
+        if obj is None or isinstance(obj, NullObject):
+            raise NotSelfContained(f"Objeto {idnum} inexistente")
+        if isinstance(obj, dict) and obj.get('/Type') in DOCUMENT_TYPES:
+            raise NotSelfContained(f"Referência a {obj['/Type']}")
+        self._set_template(idnum, self._parsed_template(obj))
+        if _is_stream(obj):
+            self._streams.add(idnum)
+
+    def _prepare_page(self, page_num: int) -> None:
+        """Prepara o molde de uma página: sem /Parent nem /StructParents, com atributos herdados."""
+        idnum = self._page_id(page_num)
+        if idnum in self._templates:
+            return
+
+        raw = self._raw_pages.pop(idnum, None)
+        if raw is None or raw.entries is None or raw.is_stream:
+            raise NotSelfContained(f"Página {page_num + 1} não pode ser copiada diretamente")
+
+        # Sem o ">>" final, para acrescentar os atributos herdados e o novo /Parent
+        page = RawObject(raw.text[:raw.end])
+        page._parsed = (raw.entries, raw.end)
+        template = self._raw_template(page, IGNORED_PAGE_KEYS)
+        for key, value in self._inherited[idnum].items():
+            if key not in raw.entries:
+                template.append(b'\n' + key.encode() + b' ')
+                template.extend(self._parsed_template(value, top=False))
+        template.append(b'\n/Parent 2 0 R\n>>')
+        self._set_template(idnum, template)
+
+    def render(
+        self,
+        start_page: int,
+        end_page: int,
+        on_page: Optional[Callable[[int], None]] = None,
+        object_streams: bool = False
+    ) -> io.BytesIO:
+        """
+        Gera em memória um PDF com as páginas [start_page, end_page).
+
+        Args:
+            start_page: Primeira página (base zero)
+            end_page: Página final (exclusiva)
+            on_page: Função chamada antes de cada página, com o seu número
+            object_streams: Grava com streams de objetos (ver pdf_output)
+
+        Returns:
+            Buffer com o PDF gerado
+
+        Raises:
+            NotSelfContained: Se o intervalo não puder ser copiado diretamente
+        """
+        return self.render_pages(range(start_page, end_page), on_page, object_streams)
+
+    def render_pages(
+        self,
+        page_nums: Iterable[int],
+        on_page: Optional[Callable[[int], None]] = None,
+        object_streams: bool = False
+    ) -> io.BytesIO:
+        """
+        Gera em memória um PDF com as páginas indicadas, na ordem dada.
+
+        Args:
+            page_nums: Números das páginas (base zero, sem repetições)
+            on_page: Função chamada antes de cada página, com o seu número
+            object_streams: Grava com streams de objetos (ver pdf_output)
+
+        Returns:
+            Buffer com o PDF gerado
+
+        Raises:
+            NotSelfContained: Se as páginas não puderem ser copiadas diretamente
+        """
+        page_nums = list(page_nums)
+
+        # 1: catálogo; 2: árvore de páginas; 3 em diante: páginas e seus objetos
+        numbers: Dict[int, int] = {}
+        order: List[int] = []
+        for page_num in page_nums:
+            idnum = self._page_id(page_num)
+            numbers[idnum] = len(order) + 3
+            order.append(idnum)
+
+        for page_num in page_nums:
+            if on_page is not None:
+                on_page(page_num)
+
+            self._prepare_page(page_num)
+            pending = [self._page_id(page_num)]
+            while pending:
+                for reference in self._references[pending.pop()]:
+                    if reference in numbers:
+                        continue
+                    if self._is_page(reference):
+                        raise NotSelfContained(f"Referência à página de origem {reference}")
+                    self._prepare_object(reference)
+                    numbers[reference] = len(order) + 3
+                    order.append(reference)
+                    pending.append(reference)
+
+        page_count = len(page_nums)
+        kids = b' '.join(b'%d 0 R' % number for number in range(3, 3 + page_count))
+        objects = [
+            (b'<<\n/Type /Catalog\n/Pages 2 0 R\n>>', False),
+            (b'<<\n/Type /Pages\n/Count %d\n/Kids [ %s ]\n>>' % (page_count, kids), False)
+        ]
+
+        source = self._source
+        for idnum in order:
+            body = []
+            for item in self._templates[idnum]:
+                item_type = type(item)
+                if item_type is int:
+                    body.append(b'%d 0 R' % numbers[item])
+                elif item_type is slice:
+                    body.append(source[item])
+                else:
+                    body.append(item)
+            objects.append((b''.join(body), idnum in self._streams))
+
+        with stage('serializacao') as record:
+            buffer = write_pdf(self.version, objects, 1, object_streams=object_streams)
+            record.bytes_out = buffer.tell()
+        return buffer
@@ -3,146 +3,1030 @@
 Módulo para dividir arquivos PDF em tamanhos menores.
 """
 
+import io
 import os
-from typing import List
-from PyPDF2 import PdfReader, PdfWriter
+import re
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from PyPDF2 import PageObject, PdfReader, PdfWriter
+import image_optimizer
+from instrumentation import stage
+from page_tree import PageTreeError, PageTreeIndex
+from pdf_index import PdfObjectIndex
+from pdf_output import write_pdf_writer
+from pdf_probe import open_source, probe_reader
+from pdf_raw_copy import NotSelfContained, RawPageCopier
+from size_estimator import SPLIT_STRATEGIES, PageSizeEstimator
+
+
+# Função chamada com (páginas processadas, bytes gravados, partes concluídas)
+ProgressCallback = Callable[[int, int, int], None]
+
+# Item de uma seleção de páginas: "10" ou "250-300"
+_PAGE_RANGE = re.compile(r'\s*(\d+)\s*(?:-\s*(\d+)\s*)?')
+
+
+class SplitCancelled(Exception):
+    """A divisão foi interrompida por um CancellationToken."""
+
+
+class CancellationToken:
+    """Sinaliza, de qualquer thread, que uma divisão em andamento deve parar."""
+    
+    def __init__(self):
+        self._event = threading.Event()
+    
+    def cancel(self) -> None:
+        """Pede o cancelamento; a divisão para antes da próxima página."""
+        self._event.set()
+    
+    @property
+    def cancelled(self) -> bool:
+        """Indica se o cancelamento foi pedido."""
+        return self._event.is_set()
+    
+    def check(self) -> None:
+        """
+        Interrompe a divisão se o cancelamento foi pedido.
+        
+        Raises:
+            SplitCancelled: Se cancel() já foi chamado
+        """
+        if self._event.is_set():
+            raise SplitCancelled("Divisão cancelada")
+
+
+class _SplitTracker:
+    """Acompanha uma divisão: verifica o cancelamento e informa o progresso."""
+    
+    def __init__(
+        self,
+        progress: Optional[ProgressCallback] = None,
+        cancel: Optional[CancellationToken] = None
+    ):
+        self._progress = progress
+        self._cancel = cancel
+        self.pages_done = 0
+        self.bytes_written = 0
+        self.parts_done = 0
+    
+    def check(self) -> None:
+        """Interrompe a divisão se o cancelamento foi pedido."""
+        if self._cancel is not None:
+            self._cancel.check()
+    
+    def page(self, page_num: int) -> None:
+        """Registra a página page_num (base zero) como processada."""
+        self.check()
+        if page_num + 1 > self.pages_done:
+            self.pages_done = page_num + 1
+            self._report()
+    
+    def part(self, end_page: int, size: int) -> None:
+        """Registra uma parte concluída, que termina em end_page (exclusiva)."""
+        self.pages_done = max(self.pages_done, end_page)
+        self.bytes_written += size
+        self.parts_done += 1
+        self._report()
+    
+    def _report(self) -> None:
+        if self._progress is not None:
+            self._progress(self.pages_done, self.bytes_written, self.parts_done)
+
+
+class _SharedRanges:
+    """Partes com o mesmo intervalo de páginas em mais de um destino, geradas uma só vez."""
+    
+    def __init__(self, uses: Dict[Tuple[int, int], int]):
+        # Intervalos planejados para mais de um destino e usos que ainda faltam
+        self._uses = {page_range: count for page_range, count in uses.items() if count > 1}
+        self._data: Dict[Tuple[int, int], bytes] = {}
+        self.reused = 0
+    
+    def render(
+        self, start_page: int, end_page: int, render: Callable[[], io.BytesIO]
+    ) -> io.BytesIO:
+        """Gera a parte com render() ou devolve uma cópia da já gerada para outro destino."""
+        page_range = (start_page, end_page)
+        if page_range not in self._uses:
+            return render()
+        
+        data = self._data.get(page_range)
+        if data is None:
+            buffer = render()
+            self._data[page_range] = buffer.getvalue()
+        else:
+            buffer = io.BytesIO()
+            buffer.write(data)
+            self.reused += 1
+        
+        # Libera a parte depois do último destino que a usa
+        self._uses[page_range] -= 1
+        if not self._uses[page_range]:
+            del self._uses[page_range]
+            self._data.pop(page_range, None)
+        return buffer
+
+
+def parse_page_ranges(ranges: str, total_pages: int) -> List[int]:
+    """
+    Interpreta uma seleção de páginas como "1-3, 10, 250-300".
+    
+    Args:
+        ranges: Páginas (base um) e intervalos inclusivos separados por vírgula
+        total_pages: Número de páginas do PDF
+    
+    Returns:
+        Números das páginas (base zero) na ordem da seleção; páginas
+        repetidas aparecem uma só vez
+    
+    Raises:
+        ValueError: Se a seleção for inválida, vazia ou passar do fim do PDF
+    """
+    pages = []
+    seen = set()
+    for item in ranges.split(','):
+        if not item.strip():
+            continue
+        match = _PAGE_RANGE.fullmatch(item)
+        if match is None:
+            raise ValueError(f"Intervalo de páginas inválido: '{item.strip()}'")
+        first = int(match.group(1))
+        last = int(match.group(2) or first)
+        if first < 1 or last < first:
+            raise ValueError(f"Intervalo de páginas inválido: '{item.strip()}'")
+        if last > total_pages:
+            raise ValueError(f"Página {last} não existe (o PDF tem {total_pages} páginas)")
+        
+        for page_num in range(first - 1, last):
+            if page_num not in seen:
+                seen.add(page_num)
+                pages.append(page_num)
+    
+    if not pages:
+        raise ValueError("Informe ao menos uma página")
+    return pages
+
+
+def format_page_ranges(pages: List[int]) -> str:
+    """Seleção compacta ("1-3,10,250-300") das páginas em base zero, na ordem dada."""
+    ranges = []
+    first = last = None
+    for page_num in pages:
+        if last is not None and page_num == last + 1:
+            last = page_num
+            continue
+        if first is not None:
+            ranges.append(f"{first + 1}-{last + 1}" if last > first else f"{first + 1}")
+        first = last = page_num
+    if first is not None:
+        ranges.append(f"{first + 1}-{last + 1}" if last > first else f"{first + 1}")
+    return ','.join(ranges)
+
+
+def _remove_files(paths: List[str]) -> None:
+    """Remove os arquivos de uma divisão interrompida."""
+    for path in paths:
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def _render_pages(
+    pages: Iterable[Tuple[int, PageObject]],
+    on_page: Optional[Callable[[int], None]] = None,
+    object_streams: bool = False
+) -> io.BytesIO:
+    """
+    Gera em memória um PDF com as páginas indicadas, usando o PdfWriter.
+    
+    Args:
+        pages: Pares (número da página em base zero, página), na ordem do PDF gerado
+        on_page: Função chamada antes de cada página, com o seu número
+            (pode interromper a geração lançando uma exceção)
+        object_streams: Grava com streams de objetos (ver pdf_output)
+    
+    Returns:
+        Buffer com o PDF gerado
+    """
+    writer = PdfWriter()
+    for page_num, page in pages:
+        if on_page is not None:
+            on_page(page_num)
+        writer.add_page(page)
+    
+    with stage('serializacao') as record:
+        buffer = write_pdf_writer(writer, object_streams)
+        record.bytes_out = buffer.tell()
+    return buffer
+
+
+def _open_copier(
+    reader: PdfReader, page_tree: Optional[PageTreeIndex] = None
+) -> Optional[RawPageCopier]:
+    """Prepara a cópia direta das páginas, ou retorna None se o PDF não permitir."""
+    try:
+        return RawPageCopier(reader, page_tree)
+    except NotSelfContained:
+        return None
+
+
+def _render_range(
+    reader: PdfReader,
+    copier: Optional[RawPageCopier],
+    start_page: int,
+    end_page: int,
+    on_page: Optional[Callable[[int], None]] = None,
+    object_streams: bool = False
+) -> io.BytesIO:
+    """
+    Gera em memória um PDF com as páginas [start_page, end_page).
+    
+    Copia o intervalo diretamente da origem quando possível; se ele não for
+    autocontido, usa o PdfWriter.
+    """
+    # A serialização é medida à parte, dentro da cópia
+    with stage('copia'):
+        if copier is not None:
+            try:
+                return copier.render(start_page, end_page, on_page, object_streams)
+            except NotSelfContained:
+                pass
+        pages = ((page_num, reader.pages[page_num]) for page_num in range(start_page, end_page))
+        return _render_pages(pages, on_page, object_streams)
+
+
+# Leitor do PDF de origem, cópia direta e formato de saída em cada processo do pool
+_worker_source = None
+_worker_copier = None
+_worker_object_streams = False
+
+
+def _init_worker(input_pdf: str, raw_copy: bool = True, object_streams: bool = False) -> None:
+    """
+    Abre o PDF de origem, mapeado em memória, uma vez por processo do pool.
+    
+    Args:
+        input_pdf: Caminho do PDF de origem
+        raw_copy: Se as partes podem ser copiadas diretamente da origem
+        object_streams: Se as partes são gravadas com streams de objetos
+    """
+    global _worker_source, _worker_copier, _worker_object_streams
+    _worker_source = PdfReader(open_source(input_pdf))
+    _worker_copier = _open_copier(_worker_source) if raw_copy else None
+    _worker_object_streams = object_streams
+
+
+def _write_part(start_page: int, end_page: int, output_file: str) -> int:
+    """
+    Escreve uma parte em um processo do pool.
+    
+    Usa o leitor aberto por _init_worker e gera a parte exatamente como o
+    caminho sequencial.
+    
+    Args:
+        start_page: Primeira página (base zero)
+        end_page: Página final (exclusiva)
+        output_file: Caminho do arquivo a ser criado
+    
+    Returns:
+        Tamanho do arquivo criado em bytes
+    """
+    buffer = _render_range(
+        _worker_source, _worker_copier, start_page, end_page,
+        object_streams=_worker_object_streams
+    )
+    
+    with open(output_file, 'wb') as output:
+        output.write(buffer.getbuffer())
+    
+    return buffer.tell()
 
 
 class PDFSplitter:
     """Classe para dividir arquivos PDF em partes menores."""
     
-    def __init__(self, input_pdf: str):
+    def __init__(
+        self,
+        input_pdf: str,
+        workers: int = 1,
+        raw_copy: bool = True,
+        object_streams: bool = False
+    ):
         """
         Inicializa o divisor de PDF.
         
         Args:
             input_pdf: Caminho para o arquivo PDF de entrada
+            workers: Número de processos para gravar as partes em paralelo
+                (0 usa todos os núcleos disponíveis)
+            raw_copy: Copia as partes autocontidas diretamente da origem, sem
+                reconstruí-las com o PdfWriter (ver pdf_raw_copy)
+            object_streams: Grava as partes com streams de objetos e de
+                referências cruzadas (PDF 1.5), que as deixam menores
         """
         if not os.path.exists(input_pdf):
             raise FileNotFoundError(f"Arquivo não encontrado: {input_pdf}")
         
+        if workers < 0:
+            raise ValueError("Número de processos não pode ser negativo")
+        
         self.input_pdf = input_pdf
-        self.reader = PdfReader(input_pdf)
-        self.total_pages = len(self.reader.pages)
+        self.workers = workers or os.cpu_count() or 1
+        self.raw_copy = raw_copy
+        self.object_streams = object_streams
+        # Arquivo de onde as páginas são lidas: o próprio input_pdf, ou a
+        # cópia com imagens otimizadas (ver optimize_images)
+        self._source_path = input_pdf
+        self._optimized_path: Optional[str] = None
+        with stage('abertura', bytes_in=os.path.getsize(input_pdf)):
+            self._open(input_pdf)
+            # Lê só trailer, xref e /Root/Pages/Count, sem percorrer as páginas
+            try:
+                self._metadata = probe_reader(self.reader, self._source)
+            except Exception:
+                self._source.close()
+                raise
+        self.total_pages = self._metadata['total_paginas']
+    
+    def _open(self, path: str) -> None:
+        """Abre o arquivo de onde as páginas são lidas e descarta o índice já construído."""
+        source = open_source(path)
+        try:
+            reader = PdfReader(source)
+        except Exception:
+            source.close()
+            raise
+        self._source = source
+        self._source_path = path
+        self.reader = reader
+        self._index = None
+        self._estimator = None
+        self._copier = None
+        self._page_tree: Optional[PageTreeIndex] = None
+        self._page_copier: Optional[RawPageCopier] = None
+        self._shared: Optional[_SharedRanges] = None
+    
+    def close(self) -> None:
+        """Libera o mapeamento do arquivo de origem e remove a cópia otimizada."""
+        self._source.close()
+        if self._optimized_path is not None:
+            _remove_files([self._optimized_path])
+            self._optimized_path = None
+    
+    def __enter__(self) -> "PDFSplitter":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    @property
+    def index(self) -> PdfObjectIndex:
+        """Índice do grafo de objetos, construído uma única vez no primeiro uso."""
+        if self._index is None:
+            with stage('indice'):
+                self._index = PdfObjectIndex(self.reader)
+        return self._index
+    
+    @property
+    def estimator(self) -> PageSizeEstimator:
+        """Estimador de tamanho das partes, baseado no índice de objetos."""
+        if self._estimator is None:
+            index = self.index
+            with stage('indice'):
+                self._estimator = PageSizeEstimator(index, self.object_streams)
+        return self._estimator
+    
+    @property
+    def copier(self) -> Optional[RawPageCopier]:
+        """Cópia direta das páginas, preparada no primeiro uso (None se desativada ou inviável)."""
+        if self._copier is None and self.raw_copy:
+            self._copier = _open_copier(self.reader)
+            if self._copier is None:
+                self.raw_copy = False
+        return self._copier
     
-    def split_by_pages(self, pages_per_file: int, output_dir: str = "output") -> List[str]:
+    @property
+    def page_tree(self) -> PageTreeIndex:
+        """Índice da árvore de páginas, que localiza cada página sem ler as demais."""
+        if self._page_tree is None:
+            self._page_tree = PageTreeIndex(self.reader)
+        return self._page_tree
+    
+    def _render(
+        self, start_page: int, end_page: int, tracker: Optional[_SplitTracker] = None
+    ) -> io.BytesIO:
+        """Gera em memória um PDF com as páginas [start_page, end_page)."""
+        on_page = tracker.page if tracker is not None else None
+        
+        def render() -> io.BytesIO:
+            return _render_range(
+                self.reader, self.copier, start_page, end_page, on_page, self.object_streams
+            )
+        
+        # Na divisão para vários destinos (iter_targets), intervalos repetidos são reaproveitados
+        if self._shared is not None:
+            return self._shared.render(start_page, end_page, render)
+        return render()
+    
+    def iter_size_parts(
+        self,
+        max_size_bytes: float,
+        max_pages: Optional[int] = None,
+        strategy: str = 'greedy',
+        progress: Optional[ProgressCallback] = None,
+        cancel: Optional[CancellationToken] = None
+    ) -> Iterator[Tuple[int, int, io.BytesIO]]:
         """
-        Divide o PDF em arquivos menores por número de páginas.
+        Gera as partes limitadas por tamanho (e opcionalmente por páginas).
+        
+        Os limites das partes são planejados a partir das estimativas do
+        índice de objetos. Cada parte é escrita uma única vez; se o tamanho
+        real exceder o limite, a estimativa é recalibrada e o restante do
+        documento replanejado.
         
         Args:
-            pages_per_file: Número de páginas por arquivo
-            output_dir: Diretório de saída para os arquivos divididos
+            max_size_bytes: Tamanho máximo em bytes para cada parte
+            max_pages: Número máximo de páginas por parte (opcional)
+            strategy: Estratégia de planejamento ('greedy' ou 'shared')
+            progress: Função chamada a cada página e a cada parte com
+                (páginas processadas, bytes gerados, partes concluídas)
+            cancel: Token verificado antes de cada página
         
-        Returns:
-            Lista com os caminhos dos arquivos criados
+        Yields:
+            Tuplas (página inicial, página final exclusiva, buffer do PDF)
+        
+        Raises:
+            SplitCancelled: Se o cancelamento for pedido durante a divisão
         """
+        tracker = _SplitTracker(progress, cancel)
+        tracker.check()
+        estimator = self.estimator
+        
+        # Fator de correção aplicado quando a estimativa fica abaixo do real
+        correction = 1.0
+        current_start_page = 0
+        plan = {}
+        
+        while current_start_page < self.total_pages:
+            # Planeja as partes restantes a partir das estimativas de tamanho
+            if current_start_page not in plan:
+                with stage('planejamento'):
+                    plan = {
+                        start: (end, size)
+                        for start, end, size in estimator.plan_by_size(
+                            max_size_bytes / correction, max_pages, strategy, current_start_page
+                        )
+                    }
+            current_page, estimated_size = plan[current_start_page]
+            
+            # Única escrita da parte, que também serve de verificação
+            buffer = self._render(current_start_page, current_page, tracker)
+            part_size = buffer.tell()
+            
+            # Se a estimativa ficou abaixo do real, recalibra e replaneja
+            if part_size > max_size_bytes and current_page - current_start_page > 1:
+                correction = max(correction * 1.05, part_size / estimated_size * 1.02)
+                plan = {}
+                continue
+            
+            tracker.part(current_page, part_size)
+            yield current_start_page, current_page, buffer
+            current_start_page = current_page
+    
+    def _page_ranges(self, pages_per_file: int) -> List[Tuple[int, int]]:
+        """Intervalos de páginas de cada parte (não dependem do tamanho)."""
         if pages_per_file <= 0:
             raise ValueError("Número de páginas por arquivo deve ser maior que zero")
         
+        return [
+            (start_page, min(start_page + pages_per_file, self.total_pages))
+            for start_page in range(0, self.total_pages, pages_per_file)
+        ]
+    
+    def iter_page_parts(
+        self,
+        pages_per_file: int,
+        progress: Optional[ProgressCallback] = None,
+        cancel: Optional[CancellationToken] = None
+    ) -> Iterator[Tuple[int, int, io.BytesIO]]:
+        """
+        Gera as partes com número fixo de páginas, uma de cada vez.
+        
+        Args:
+            pages_per_file: Número de páginas por parte
+            progress: Função chamada a cada página e a cada parte com
+                (páginas processadas, bytes gerados, partes concluídas)
+            cancel: Token verificado antes de cada página
+        
+        Yields:
+            Tuplas (página inicial, página final exclusiva, buffer do PDF)
+        
+        Raises:
+            SplitCancelled: Se o cancelamento for pedido durante a divisão
+        """
+        ranges = self._page_ranges(pages_per_file)
+        tracker = _SplitTracker(progress, cancel)
+        tracker.check()
+        
+        for start_page, end_page in ranges:
+            buffer = self._render(start_page, end_page, tracker)
+            tracker.part(end_page, buffer.tell())
+            yield start_page, end_page, buffer
+    
+    def _check_split_mode(
+        self,
+        pages_per_file: Optional[int],
+        max_size_mb: Optional[float],
+        strategy: str
+    ) -> None:
+        """Valida o modo de divisão: por páginas ou por tamanho, nunca os dois."""
+        if (pages_per_file is None) == (max_size_mb is None):
+            raise ValueError("Informe o número de páginas por arquivo ou o tamanho máximo")
+        
+        if pages_per_file is not None:
+            if pages_per_file <= 0:
+                raise ValueError("Número de páginas por arquivo deve ser maior que zero")
+        else:
+            if max_size_mb <= 0:
+                raise ValueError("Tamanho máximo deve ser maior que zero")
+            if strategy not in SPLIT_STRATEGIES:
+                raise ValueError(f"Estratégia de divisão inválida: {strategy}")
+    
+    def iter_parts(
+        self,
+        pages_per_file: Optional[int] = None,
+        max_size_mb: Optional[float] = None,
+        max_pages: Optional[int] = None,
+        strategy: str = 'greedy',
+        progress: Optional[ProgressCallback] = None,
+        cancel: Optional[CancellationToken] = None
+    ) -> Iterator[Tuple[int, Tuple[int, int], io.BytesIO]]:
+        """
+        Gera as partes da divisão uma de cada vez, sem gravar nada em disco.
+        
+        Só a parte corrente fica em memória: cada uma pode ser enviada para
+        um ZIP, uma resposta HTTP ou um armazenamento de objetos antes que a
+        próxima seja gerada. As opções são validadas na chamada, antes da
+        primeira parte.
+        
+        Args:
+            pages_per_file: Páginas por parte (divisão por páginas)
+            max_size_mb: Tamanho máximo em MB (divisão por tamanho)
+            max_pages: Número máximo de páginas por parte na divisão por tamanho
+            strategy: Estratégia da divisão por tamanho
+            progress: Função chamada a cada página e a cada parte com
+                (páginas processadas, bytes gerados, partes concluídas)
+            cancel: Token verificado antes de cada página
+        
+        Returns:
+            Iterador de tuplas (número da parte, (página inicial, página final
+            exclusiva), buffer do PDF posicionado no início)
+        
+        Raises:
+            ValueError: Se as opções de divisão forem inválidas
+        """
+        self._check_split_mode(pages_per_file, max_size_mb, strategy)
+        
+        if pages_per_file is not None:
+            parts = self.iter_page_parts(pages_per_file, progress, cancel)
+        else:
+            parts = self.iter_size_parts(
+                max_size_mb * 1024 * 1024, max_pages, strategy, progress, cancel
+            )
+        return self._number_parts(parts)
+    
+    def iter_targets(
+        self,
+        targets: Dict[str, dict],
+        cancel: Optional[CancellationToken] = None
+    ) -> Iterator[Tuple[str, Iterator[Tuple[int, Tuple[int, int], io.BytesIO]]]]:
+        """
+        Divide o PDF para vários destinos (ex.: tribunais) com um só índice.
+        
+        O documento é lido e o custo das páginas calculado uma única vez; as
+        partes com o mesmo intervalo de páginas em mais de um destino são
+        geradas uma só vez e guardadas em memória até o último destino que
+        as usa. As partes de cada destino devem ser consumidas antes de
+        avançar para o próximo.
+        
+        Args:
+            targets: Nome do destino -> opções de iter_parts (pages_per_file
+                ou max_size_mb, max_pages e strategy)
+            cancel: Token verificado antes de cada página
+        
+        Returns:
+            Iterador de pares (nome do destino, partes no formato de iter_parts)
+        
+        Raises:
+            ValueError: Se as opções de algum destino forem inválidas
+        """
+        if not targets:
+            raise ValueError("Informe ao menos um destino")
+        for options in targets.values():
+            self._check_split_mode(
+                options.get('pages_per_file'), options.get('max_size_mb'),
+                options.get('strategy', 'greedy')
+            )
+        
+        # Os planos de todos os destinos mostram quais intervalos se repetem
+        uses = Counter(
+            (start_page, end_page)
+            for options in targets.values()
+            for start_page, end_page, _size in self._plan_chunks(**options)
+        )
+        return self._iter_targets(targets, _SharedRanges(uses), cancel)
+    
+    def _iter_targets(
+        self,
+        targets: Dict[str, dict],
+        shared: _SharedRanges,
+        cancel: Optional[CancellationToken]
+    ) -> Iterator[Tuple[str, Iterator[Tuple[int, Tuple[int, int], io.BytesIO]]]]:
+        self._shared = shared
+        try:
+            for name, options in targets.items():
+                yield name, self.iter_parts(cancel=cancel, **options)
+        finally:
+            self._shared = None
+    
+    def split_by_targets(
+        self,
+        targets: Dict[str, dict],
+        output_dir: str = "output",
+        cancel: Optional[CancellationToken] = None
+    ) -> Dict[str, List[str]]:
+        """
+        Divide o PDF para vários destinos, um subdiretório por destino.
+        
+        Args:
+            targets: Nome do destino -> opções de iter_parts (ver iter_targets)
+            output_dir: Diretório de saída; cada destino grava em output_dir/nome
+            cancel: Token verificado antes de cada página; ao cancelar, os
+                arquivos já gravados de todos os destinos são removidos
+        
+        Returns:
+            Dicionário nome do destino -> caminhos dos arquivos criados
+        
+        Raises:
+            SplitCancelled: Se o cancelamento for pedido durante a divisão
+        """
+        created_files: Dict[str, List[str]] = {}
+        try:
+            for name, parts in self.iter_targets(targets, cancel):
+                created_files[name] = self._write_parts(parts, os.path.join(output_dir, name))
+        except SplitCancelled:
+            for files in created_files.values():
+                _remove_files(files)
+            raise
+        
+        return created_files
+    
+    @staticmethod
+    def _number_parts(
+        parts: Iterator[Tuple[int, int, io.BytesIO]]
+    ) -> Iterator[Tuple[int, Tuple[int, int], io.BytesIO]]:
+        """Numera as partes a partir de um e volta cada buffer ao início."""
+        for part_num, (start_page, end_page, buffer) in enumerate(parts, start=1):
+            buffer.seek(0)
+            yield part_num, (start_page, end_page), buffer
+    
+    def _part_filename(self, part_num: int, start_page: int, end_page: int) -> str:
+        """Nome do arquivo de uma parte com as páginas [start_page, end_page)."""
+        base_name = os.path.splitext(os.path.basename(self.input_pdf))[0]
+        return f"{base_name}_parte_{part_num:03d}_paginas_{start_page+1}-{end_page}.pdf"
+    
+    def _write_parts(
+        self,
+        parts: Iterator[Tuple[int, Tuple[int, int], io.BytesIO]],
+        output_dir: str
+    ) -> List[str]:
+        """
+        Grava no diretório de saída as partes geradas por iter_parts.
+        
+        Se a divisão for cancelada, os arquivos já gravados são removidos.
+        
+        Returns:
+            Lista com os caminhos dos arquivos criados
+        """
         # Cria diretório de saída se não existir
         os.makedirs(output_dir, exist_ok=True)
         
         created_files = []
-        base_name = os.path.splitext(os.path.basename(self.input_pdf))[0]
+        try:
+            for part_num, (start_page, end_page), buffer in parts:
+                output_file = os.path.join(
+                    output_dir, self._part_filename(part_num, start_page, end_page)
+                )
+                with stage('gravacao') as record, open(output_file, 'wb') as output:
+                    record.bytes_out = output.write(buffer.getbuffer())
+                
+                file_size_mb = len(buffer.getbuffer()) / (1024 * 1024)
+                created_files.append(output_file)
+                print(f"Criado: {output_file} ({end_page - start_page} páginas, {file_size_mb:.2f} MB)")
+        except SplitCancelled:
+            _remove_files(created_files)
+            raise
         
-        # Calcula número de arquivos necessários
-        num_files = (self.total_pages + pages_per_file - 1) // pages_per_file
+        return created_files
+    
+    def split_by_pages(
+        self,
+        pages_per_file: int,
+        output_dir: str = "output",
+        progress: Optional[ProgressCallback] = None,
+        cancel: Optional[CancellationToken] = None
+    ) -> List[str]:
+        """
+        Divide o PDF em arquivos menores por número de páginas.
         
-        for i in range(num_files):
-            writer = PdfWriter()
-            start_page = i * pages_per_file
-            end_page = min((i + 1) * pages_per_file, self.total_pages)
-            
-            # Adiciona páginas ao novo PDF
-            for page_num in range(start_page, end_page):
-                writer.add_page(self.reader.pages[page_num])
-            
-            # Salva o arquivo
-            output_file = os.path.join(
-                output_dir, 
-                f"{base_name}_parte_{i+1:03d}_paginas_{start_page+1}-{end_page}.pdf"
-            )
-            
-            with open(output_file, 'wb') as output:
-                writer.write(output)
-            
-            created_files.append(output_file)
-            print(f"Criado: {output_file} ({end_page - start_page} páginas)")
+        Com vários processos, o progresso e o cancelamento são verificados
+        a cada parte, e não a cada página.
+        
+        Args:
+            pages_per_file: Número de páginas por arquivo
+            output_dir: Diretório de saída para os arquivos divididos
+            progress: Função chamada com (páginas processadas, bytes
+                gravados, partes concluídas)
+            cancel: Token verificado antes de cada página; ao cancelar, os
+                arquivos já gravados são removidos
+        
+        Returns:
+            Lista com os caminhos dos arquivos criados
+        
+        Raises:
+            SplitCancelled: Se o cancelamento for pedido durante a divisão
+        """
+        ranges = self._page_ranges(pages_per_file)
+        
+        if self.workers <= 1 or len(ranges) <= 1:
+            parts = self.iter_parts(pages_per_file=pages_per_file, progress=progress, cancel=cancel)
+            return self._write_parts(parts, output_dir)
+        
+        os.makedirs(output_dir, exist_ok=True)
+        created_files = []
+        tracker = _SplitTracker(progress, cancel)
+        output_files = [
+            os.path.join(output_dir, self._part_filename(part_num, start_page, end_page))
+            for part_num, (start_page, end_page) in enumerate(ranges, start=1)
+        ]
+        
+        # As partes são independentes: cada processo abre a origem e grava uma delas
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, len(ranges)),
+            initializer=_init_worker,
+            initargs=(self._source_path, self.raw_copy, self.object_streams)
+        ) as executor:
+            futures = [
+                executor.submit(_write_part, start_page, end_page, output_file)
+                for (start_page, end_page), output_file in zip(ranges, output_files)
+            ]
+            try:
+                # Os resultados são lidos na ordem das partes
+                for future, output_file, (start_page, end_page) in zip(futures, output_files, ranges):
+                    tracker.check()
+                    # Cópia e gravação rodam nos processos; aqui só a espera por eles
+                    with stage('processos') as record:
+                        size = record.bytes_out = future.result()
+                    tracker.part(end_page, size)
+                    created_files.append(output_file)
+                    print(
+                        f"Criado: {output_file} ({end_page - start_page} páginas, "
+                        f"{size / (1024 * 1024):.2f} MB)"
+                    )
+            except SplitCancelled:
+                # Descarta as partes ainda na fila e espera as que estão em execução
+                executor.shutdown(wait=True, cancel_futures=True)
+                _remove_files(output_files)
+                raise
         
         return created_files
     
-    def split_by_size(self, max_size_mb: float, output_dir: str = "output") -> List[str]:
+    def split_by_size(
+        self,
+        max_size_mb: float,
+        output_dir: str = "output",
+        max_pages: Optional[int] = None,
+        strategy: str = 'greedy',
+        progress: Optional[ProgressCallback] = None,
+        cancel: Optional[CancellationToken] = None
+    ) -> List[str]:
         """
         Divide o PDF em arquivos menores por tamanho máximo.
         
         Args:
             max_size_mb: Tamanho máximo em MB para cada arquivo
             output_dir: Diretório de saída para os arquivos divididos
+            max_pages: Número máximo de páginas por arquivo (opcional)
+            strategy: Estratégia de planejamento ('greedy' ou 'shared')
+            progress: Função chamada com (páginas processadas, bytes
+                gravados, partes concluídas)
+            cancel: Token verificado antes de cada página; ao cancelar, os
+                arquivos já gravados são removidos
         
         Returns:
             Lista com os caminhos dos arquivos criados
+        
+        Raises:
+            SplitCancelled: Se o cancelamento for pedido durante a divisão
+        """
+        parts = self.iter_parts(
+            max_size_mb=max_size_mb,
+            max_pages=max_pages,
+            strategy=strategy,
+            progress=progress,
+            cancel=cancel
+        )
+        return self._write_parts(parts, output_dir)
+    
+    def plan(
+        self,
+        pages_per_file: Optional[int] = None,
+        max_size_mb: Optional[float] = None,
+        max_pages: Optional[int] = None,
+        strategy: str = 'greedy'
+    ) -> List[dict]:
         """
-        if max_size_mb <= 0:
-            raise ValueError("Tamanho máximo deve ser maior que zero")
+        Planeja a divisão sem gerar nenhuma parte.
         
-        # Cria diretório de saída se não existir
-        os.makedirs(output_dir, exist_ok=True)
+        Os intervalos são os mesmos que split_by_pages/split_by_size gravam
+        (na divisão por tamanho, só mudam se o tamanho real de uma parte
+        exceder o limite e ela precisar ser replanejada), e os tamanhos vêm do
+        custo de cada página no índice de objetos.
         
-        created_files = []
-        base_name = os.path.splitext(os.path.basename(self.input_pdf))[0]
-        max_size_bytes = max_size_mb * 1024 * 1024
+        Args:
+            pages_per_file: Páginas por parte (divisão por páginas)
+            max_size_mb: Tamanho máximo em MB (divisão por tamanho)
+            max_pages: Número máximo de páginas por parte na divisão por tamanho
+            strategy: Estratégia da divisão por tamanho
         
-        file_num = 1
-        current_writer = PdfWriter()
-        current_start_page = 0
-        current_page = 0
+        Returns:
+            Lista de dicionários com número da parte, páginas inicial e final
+            (base um), número de páginas e tamanho estimado em bytes
+        """
+        self._check_split_mode(pages_per_file, max_size_mb, strategy)
+        chunks = self._plan_chunks(pages_per_file, max_size_mb, max_pages, strategy)
         
-        while current_page < self.total_pages:
-            # Adiciona página ao writer atual
-            current_writer.add_page(self.reader.pages[current_page])
-            current_page += 1
-            
-            # Verifica o tamanho temporário
-            temp_file = os.path.join(output_dir, f"temp_{file_num}.pdf")
-            with open(temp_file, 'wb') as temp:
-                current_writer.write(temp)
-            
-            temp_size = os.path.getsize(temp_file)
-            
-            # Se excedeu o tamanho ou é a última página
-            if temp_size > max_size_bytes or current_page == self.total_pages:
-                # Se excedeu e tem mais de uma página, remove a última e salva
-                if temp_size > max_size_bytes and current_page - current_start_page > 1:
-                    current_page -= 1
-                    current_writer = PdfWriter()
-                    for page_num in range(current_start_page, current_page):
-                        current_writer.add_page(self.reader.pages[page_num])
-                
-                # Salva o arquivo final
-                output_file = os.path.join(
-                    output_dir,
-                    f"{base_name}_parte_{file_num:03d}_paginas_{current_start_page+1}-{current_page}.pdf"
+        return [
+            {
+                'parte': part_num,
+                'pagina_inicial': start_page + 1,
+                'pagina_final': end_page,
+                'paginas': end_page - start_page,
+                'tamanho_estimado_bytes': size
+            }
+            for part_num, (start_page, end_page, size) in enumerate(chunks, start=1)
+        ]
+    
+    def optimize_images(
+        self,
+        max_dpi: float = image_optimizer.DEFAULT_MAX_DPI,
+        quality: int = image_optimizer.DEFAULT_JPEG_QUALITY,
+        max_page_mb: Optional[float] = None,
+        workers: Optional[int] = None
+    ) -> dict:
+        """
+        Reduz e recomprime as imagens antes da divisão.
+        
+        As imagens acima de max_dpi são reduzidas e recodificadas (JPEG para
+        cores e tons de cinza, CCITT G4 para imagens de um bit), e as partes
+        passam a ser geradas de uma cópia otimizada do PDF, removida em
+        close(). Com max_page_mb, as páginas que continuam maiores que o
+        limite têm as imagens reduzidas de novo, com resolução e qualidade
+        menores, para que caibam sozinhas em uma parte. Deve ser chamado
+        antes da divisão.
+        
+        Args:
+            max_dpi: Resolução máxima das imagens
+            quality: Qualidade JPEG (1 a 95)
+            max_page_mb: Tamanho máximo de uma página em MB (opcional)
+            workers: Processos para recodificar as imagens (padrão: os
+                mesmos da divisão)
+        
+        Returns:
+            Dicionário com o número de imagens, as otimizadas, os bytes em
+            imagens antes e depois e as páginas ainda acima do limite
+        """
+        fd, output_path = tempfile.mkstemp(prefix='pdf_splitter_otimizado_', suffix='.pdf')
+        os.close(fd)
+        try:
+            with stage('imagens') as record:
+                report = image_optimizer.optimize_images(
+                    self.reader,
+                    output_path,
+                    max_dpi=max_dpi,
+                    quality=quality,
+                    max_page_bytes=max_page_mb * 1024 * 1024 if max_page_mb else None,
+                    workers=self.workers if workers is None else workers
                 )
-                
-                with open(output_file, 'wb') as output:
-                    current_writer.write(output)
-                
-                file_size_mb = os.path.getsize(output_file) / (1024 * 1024)
-                created_files.append(output_file)
-                print(f"Criado: {output_file} ({current_page - current_start_page} páginas, {file_size_mb:.2f} MB)")
-                
-                # Limpa arquivo temporário
-                os.remove(temp_file)
-                
-                # Reinicia para o próximo arquivo
-                file_num += 1
-                current_writer = PdfWriter()
-                current_start_page = current_page
-            else:
-                # Remove arquivo temporário
-                os.remove(temp_file)
+                record.bytes_in = report['bytes_antes']
+                record.bytes_out = report['bytes_depois']
+            previous_source = self._source
+            self._open(output_path)
+        except Exception:
+            _remove_files([output_path])
+            raise
         
-        return created_files
+        # Uma segunda otimização substitui a cópia anterior
+        previous_source.close()
+        if self._optimized_path is not None:
+            _remove_files([self._optimized_path])
+        self._optimized_path = output_path
+        return report
+    
+    def extract(self, ranges: str) -> io.BytesIO:
+        """
+        Gera em memória um PDF só com as páginas selecionadas.
+        
+        As páginas são localizadas pela árvore de páginas (ver page_tree) e
+        copiadas sem ler as demais nem construir o índice de objetos: o
+        tempo depende das páginas extraídas, e não do tamanho do documento.
+        
+        Args:
+            ranges: Seleção de páginas em base um, como "1-3, 10, 250-300"
+                (ver parse_page_ranges); o PDF gerado segue a ordem da seleção
+        
+        Returns:
+            Buffer do PDF posicionado no início
+        
+        Raises:
+            ValueError: Se a seleção for inválida
+        """
+        return self._extract(parse_page_ranges(ranges, self.total_pages))
+    
+    def extract_to_file(self, ranges: str, output_dir: str = "output") -> str:
+        """
+        Grava no diretório de saída um PDF só com as páginas selecionadas (ver extract).
+        
+        Returns:
+            Caminho do arquivo criado
+        """
+        pages = parse_page_ranges(ranges, self.total_pages)
+        buffer = self._extract(pages)
+        
+        os.makedirs(output_dir, exist_ok=True)
+        base_name = os.path.splitext(os.path.basename(self.input_pdf))[0]
+        selection = format_page_ranges(pages).replace(',', '_')
+        output_file = os.path.join(output_dir, f"{base_name}_paginas_{selection}.pdf")
+        with stage('gravacao') as record, open(output_file, 'wb') as output:
+            record.bytes_out = output.write(buffer.getbuffer())
+        
+        print(f"Criado: {output_file} ({len(pages)} páginas, "
+              f"{len(buffer.getbuffer()) / (1024 * 1024):.2f} MB)")
+        return output_file
+    
+    def _extract(self, pages: List[int]) -> io.BytesIO:
+        """Gera o PDF com as páginas (base zero), pela árvore de páginas se possível."""
+        try:
+            buffer = self._render_selection(pages, self.page_tree)
+        except PageTreeError:
+            # Árvore inconsistente com os /Count: usa a lista completa de páginas
+            buffer = self._render_selection(pages, None)
+        buffer.seek(0)
+        return buffer
+    
+    def _render_selection(
+        self, pages: List[int], page_tree: Optional[PageTreeIndex]
+    ) -> io.BytesIO:
+        """Gera o PDF com as páginas, localizadas por page_tree ou, sem ele, por reader.pages."""
+        with stage('copia'):
+            if page_tree is None:
+                copier = self.copier
+            elif self._copier is not None or not self.raw_copy:
+                # A cópia direta do documento inteiro já foi preparada (ou está desativada)
+                copier = self._copier
+            else:
+                if self._page_copier is None:
+                    self._page_copier = _open_copier(self.reader, page_tree)
+                copier = self._page_copier
+            
+            if copier is not None:
+                try:
+                    return copier.render_pages(pages, object_streams=self.object_streams)
+                except NotSelfContained:
+                    pass
+            
+            get_page = page_tree.page if page_tree is not None else self.reader.pages.__getitem__
+            return _render_pages(
+                ((page_num, get_page(page_num)) for page_num in pages),
+                object_streams=self.object_streams
+            )
+    
+    def _plan_chunks(
+        self,
+        pages_per_file: Optional[int] = None,
+        max_size_mb: Optional[float] = None,
+        max_pages: Optional[int] = None,
+        strategy: str = 'greedy'
+    ) -> List[Tuple[int, int, int]]:
+        """Intervalos planejados (página inicial, página final exclusiva, tamanho estimado)."""
+        estimator = self.estimator
+        with stage('planejamento'):
+            if pages_per_file is not None:
+                return estimator.plan_by_pages(pages_per_file)
+            return estimator.plan_by_size(max_size_mb * 1024 * 1024, max_pages, strategy)
     
     def get_info(self) -> dict:
         """
@@ -154,12 +1038,50 @@ class PDFSplitter:
         file_size = os.path.getsize(self.input_pdf)
         file_size_mb = file_size / (1024 * 1024)
         
-        return {
+        info = {
             'arquivo': self.input_pdf,
             'total_paginas': self.total_pages,
             'tamanho_bytes': file_size,
             'tamanho_mb': round(file_size_mb, 2)
         }
+        info.update(self._metadata)
+        return info
+    
+    def get_resource_report(self, min_pages: int = 2) -> dict:
+        """
+        Relata os recursos (fontes, imagens, perfis ICC...) compartilhados entre páginas.
+        
+        Cada parte gerada carrega uma cópia própria de cada recurso usado
+        pelas suas páginas; os recursos grandes e muito compartilhados são os
+        que mais aumentam o total gravado.
+        
+        Args:
+            min_pages: Número mínimo de páginas que usam o recurso
+        
+        Returns:
+            Dicionário com o total de páginas, os bytes em recursos
+            compartilhados e a lista de recursos, do maior para o menor
+        """
+        index = self.index
+        resources = [
+            {
+                'objeto': idnum,
+                'tipo': index.object_kinds.get(idnum, ''),
+                'tamanho_bytes': index.object_sizes.get(idnum, 0),
+                'paginas': pages
+            }
+            for idnum, pages in index.object_pages.items()
+            if pages >= min_pages and idnum >= 0
+        ]
+        resources.sort(key=lambda resource: (-resource['tamanho_bytes'], resource['objeto']))
+        
+        return {
+            'total_paginas': self.total_pages,
+            'bytes_compartilhados': sum(
+                resource['tamanho_bytes'] for resource in resources if resource['paginas'] > 1
+            ),
+            'recursos': resources
+        }
 
 
 def main():
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Cache em disco dos resultados de divisão.
+
+Cada resultado é identificado pelo SHA-256 do PDF de entrada e pelos
+parâmetros da divisão normalizados; o nome do arquivo enviado não faz parte
+da chave, e as partes são nomeadas por quem as lê. O tamanho total é
+limitado com descarte dos resultados usados há mais tempo (LRU), e cada
+resultado expira após um tempo configurável.
+
+Configuração por variáveis de ambiente:
+    PDF_SPLITTER_CACHE_DIR: diretório do cache
+    PDF_SPLITTER_CACHE_MAX_MB: tamanho máximo em MB (0 desativa o cache)
+    PDF_SPLITTER_CACHE_TTL: validade de cada resultado em segundos
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+
+# Valores padrão quando as variáveis de ambiente não estão definidas
+DEFAULT_MAX_MB = 512
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+# Arquivo com a descrição das partes de cada resultado
+META_NAME = 'meta.json'
+
+# Segundos após o último uso em que um resultado não é descartado pelo limite de
+# tamanho, para que as partes de um ZIP em envio não sejam removidas no meio dele
+IN_USE_SECONDS = 5 * 60
+
+
+def normalize_params(
+    pages_per_file: Optional[int] = None,
+    max_size_mb: Optional[float] = None,
+    max_pages: Optional[int] = None,
+    strategy: str = 'greedy',
+    object_streams: bool = False,
+    max_dpi: Optional[int] = None,
+    jpeg_quality: Optional[int] = None
+) -> dict:
+    """
+    Normaliza os parâmetros da divisão para compor a chave do cache.
+
+    Args:
+        pages_per_file: Páginas por parte (divisão por páginas)
+        max_size_mb: Tamanho máximo em MB (divisão por tamanho)
+        max_pages: Número máximo de páginas por parte na divisão por tamanho
+        strategy: Estratégia da divisão por tamanho
+        object_streams: Se as partes são gravadas com streams de objetos
+        max_dpi: Resolução máxima das imagens, se forem otimizadas antes
+        jpeg_quality: Qualidade JPEG das imagens otimizadas
+
+    Returns:
+        Dicionário com apenas os parâmetros que afetam o resultado
+    """
+    if pages_per_file:
+        params = {'modo': 'paginas', 'paginas': int(pages_per_file)}
+    else:
+        params = {
+            'modo': 'tamanho',
+            'tamanho_bytes': int(float(max_size_mb) * 1024 * 1024),
+            'max_paginas': int(max_pages) if max_pages else None,
+            'estrategia': strategy
+        }
+    # Só entram na chave quando ativados, para manter as chaves já existentes
+    if object_streams:
+        params['streams_de_objetos'] = True
+    if max_dpi:
+        params['otimizar_imagens'] = {
+            'dpi_maximo': int(max_dpi), 'qualidade_jpeg': int(jpeg_quality)
+        }
+    return params
+
+
+def cache_key(sha256: str, params: dict) -> str:
+    """
+    Monta a chave do cache a partir do hash do PDF e dos parâmetros.
+
+    Args:
+        sha256: SHA-256 do PDF de entrada
+        params: Parâmetros normalizados (ver normalize_params)
+
+    Returns:
+        Chave em hexadecimal
+    """
+    payload = sha256 + json.dumps(params, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class _CacheWriter:
+    """Grava as partes de um resultado e as publica no cache de uma só vez."""
+
+    def __init__(self, cache: "ResultCache", key: str):
+        self._cache = cache
+        self._key = key
+        self._directory = os.path.join(cache.directory, f".tmp-{key}-{uuid.uuid4().hex}")
+        self._parts: List[Tuple[int, int, str]] = []
+        self._size = 0
+        self._closed = False
+        os.makedirs(self._directory)
+
+    def add(self, start_page: int, end_page: int, data: bytes) -> None:
+        """Grava uma parte com as páginas [start_page, end_page)."""
+        filename = f"parte_{len(self._parts) + 1:04d}.pdf"
+        with open(os.path.join(self._directory, filename), 'wb') as part:
+            part.write(data)
+        self._parts.append((start_page, end_page, filename))
+        self._size += len(data)
+
+    def commit(self) -> None:
+        """Publica o resultado no cache e aplica o limite de tamanho."""
+        if self._closed:
+            return
+        if self._size > self._cache.max_bytes:
+            # Maior que o cache inteiro: guardar só descartaria os demais resultados
+            self.discard()
+            return
+        self._closed = True
+
+        meta = {'criado': time.time(), 'tamanho_bytes': self._size, 'partes': self._parts}
+        with open(os.path.join(self._directory, META_NAME), 'w') as meta_file:
+            json.dump(meta, meta_file)
+
+        try:
+            os.rename(self._directory, self._cache.entry_path(self._key))
+        except OSError:
+            # Outro processo publicou o mesmo resultado antes
+            shutil.rmtree(self._directory, ignore_errors=True)
+            return
+
+        self._cache.evict()
+
+    def discard(self) -> None:
+        """Descarta as partes gravadas (sem efeito após commit)."""
+        if not self._closed:
+            self._closed = True
+            shutil.rmtree(self._directory, ignore_errors=True)
+
+
+class ResultCache:
+    """Cache em disco de partes geradas, com limite de tamanho (LRU) e validade."""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_mb: Optional[float] = None,
+        ttl_seconds: Optional[float] = None
+    ):
+        """
+        Inicializa o cache.
+
+        Args:
+            directory: Diretório do cache (padrão: PDF_SPLITTER_CACHE_DIR ou
+                pdf_splitter_cache no diretório temporário do sistema)
+            max_mb: Tamanho máximo em MB (padrão: PDF_SPLITTER_CACHE_MAX_MB ou 512;
+                0 desativa o cache)
+            ttl_seconds: Validade de cada resultado em segundos (padrão:
+                PDF_SPLITTER_CACHE_TTL ou 24 horas)
+        """
+        if directory is None:
+            directory = os.environ.get(
+                'PDF_SPLITTER_CACHE_DIR',
+                os.path.join(tempfile.gettempdir(), 'pdf_splitter_cache')
+            )
+        if max_mb is None:
+            max_mb = float(os.environ.get('PDF_SPLITTER_CACHE_MAX_MB', DEFAULT_MAX_MB))
+        if ttl_seconds is None:
+            ttl_seconds = float(os.environ.get('PDF_SPLITTER_CACHE_TTL', DEFAULT_TTL_SECONDS))
+
+        self.directory = directory
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds
+
+    @property
+    def enabled(self) -> bool:
+        """Indica se o cache está ativo (tamanho máximo maior que zero)."""
+        return self.max_bytes > 0
+
+    def entry_path(self, key: str) -> str:
+        """Diretório de um resultado no cache."""
+        return os.path.join(self.directory, key)
+
+    def _load_meta(self, key: str) -> Optional[dict]:
+        """Lê a descrição de um resultado, ou None se não existir ou estiver expirado."""
+        meta_path = os.path.join(self.entry_path(key), META_NAME)
+        try:
+            with open(meta_path) as meta_file:
+                meta = json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - meta['criado'] > self.ttl_seconds:
+            shutil.rmtree(self.entry_path(key), ignore_errors=True)
+            return None
+        return meta
+
+    def get(self, key: str) -> Optional[List[Tuple[int, int, str]]]:
+        """
+        Procura um resultado no cache.
+
+        O resultado é marcado como em uso, e evict não o descarta pelo limite
+        de tamanho por IN_USE_SECONDS; as partes são abertas só ao serem
+        lidas (iter_cached_parts).
+
+        Args:
+            key: Chave do resultado (ver cache_key)
+
+        Returns:
+            Lista de tuplas (página inicial, página final exclusiva, caminho da
+            parte), ou None se não houver resultado válido ou faltar alguma
+            parte
+        """
+        if not self.enabled:
+            return None
+
+        meta = self._load_meta(key)
+        if meta is None:
+            return None
+
+        # Marca o resultado como usado recentemente
+        entry = self.entry_path(key)
+        try:
+            os.utime(os.path.join(entry, META_NAME))
+        except OSError:
+            return None
+
+        parts = [
+            (start_page, end_page, os.path.join(entry, filename))
+            for start_page, end_page, filename in meta['partes']
+        ]
+        # Descartado por outra requisição depois da leitura da descrição
+        if not all(os.path.isfile(path) for _start_page, _end_page, path in parts):
+            return None
+        return parts
+
+    def writer(self, key: str) -> Optional[_CacheWriter]:
+        """
+        Cria um gravador para um novo resultado.
+
+        Args:
+            key: Chave do resultado (ver cache_key)
+
+        Returns:
+            Gravador com add/commit/discard, ou None se o cache estiver desativado
+        """
+        if not self.enabled:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        return _CacheWriter(self, key)
+
+    def put(self, key: str, parts: Iterable[Tuple[int, int, bytes]]) -> None:
+        """
+        Grava um resultado completo no cache.
+
+        Args:
+            key: Chave do resultado (ver cache_key)
+            parts: Tuplas (página inicial, página final exclusiva, conteúdo)
+        """
+        writer = self.writer(key)
+        if writer is None:
+            return
+        try:
+            for start_page, end_page, data in parts:
+                writer.add(start_page, end_page, data)
+            writer.commit()
+        finally:
+            writer.discard()
+
+    def evict(self) -> None:
+        """
+        Remove resultados expirados e, se preciso, os usados há mais tempo.
+
+        Os usados nos últimos IN_USE_SECONDS (ainda em envio) são mantidos,
+        mesmo que o cache fique acima do limite até a próxima chamada.
+        """
+        entries = []
+        now = time.time()
+
+        for key in os.listdir(self.directory):
+            if key.startswith('.'):
+                continue
+            meta_path = os.path.join(self.entry_path(key), META_NAME)
+            try:
+                with open(meta_path) as meta_file:
+                    meta = json.load(meta_file)
+                last_used = os.path.getmtime(meta_path)
+            except (OSError, ValueError):
+                continue
+
+            if now - meta['criado'] > self.ttl_seconds:
+                shutil.rmtree(self.entry_path(key), ignore_errors=True)
+            else:
+                entries.append((last_used, meta['tamanho_bytes'], key))
+
+        total = sum(size for _last_used, size, _key in entries)
+        for last_used, size, key in sorted(entries):
+            if total <= self.max_bytes or now - last_used < IN_USE_SECONDS:
+                break
+            shutil.rmtree(self.entry_path(key), ignore_errors=True)
+            total -= size
+
+
+def iter_cached_parts(parts: List[Tuple[int, int, str]]) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    Lê as partes de um resultado do cache, uma de cada vez.
+
+    Args:
+        parts: Resultado de ResultCache.get
+
+    Yields:
+        Tuplas (página inicial, página final exclusiva, conteúdo)
+    """
+    for start_page, end_page, path in parts:
+        with open(path, 'rb') as part:
+            yield start_page, end_page, part.read()
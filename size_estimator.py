@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Estimativa de tamanho das partes geradas a partir de um PDF.
+
+Usa o custo em bytes de cada objeto alcançável a partir de cada página
+(conteúdo, imagens, fontes e demais recursos), medido uma única vez pelo
+PdfObjectIndex, para planejar as partes sem serializar o PDF a cada página.
+"""
+
+from typing import Dict, List, Optional, Set, Tuple
+from PyPDF2 import PdfWriter
+from pdf_index import PdfObjectIndex
+from pdf_output import write_pdf_writer
+
+
+# Cabeçalho "N 0 obj", rodapé "endobj" e entrada de 20 bytes na tabela xref
+OBJECT_OVERHEAD = 40
+
+# Referência " N 0 R" adicionada em /Kids para cada página
+KID_OVERHEAD = 8
+
+# Com streams de objetos: fração do tamanho que sobra após a compressão dos
+# objetos agrupados (estimativa conservadora; o típico fica abaixo de 0,2)
+PACKED_RATIO = 0.3
+
+# Com streams de objetos: "número posição" no cabeçalho do stream e entrada
+# na tabela de referências cruzadas, já comprimidos
+PACKED_OBJECT_OVERHEAD = 8
+
+# Estratégias de planejamento da divisão por tamanho
+#   greedy: preenche cada parte até o limite
+#   shared: mesmo número mínimo de partes, com cortes onde menos recursos
+#           compartilhados (fontes, perfis ICC) precisam ser repetidos
+#   balanced: mesmo número mínimo de partes, com tamanhos o mais parecidos possível
+SPLIT_STRATEGIES = ('greedy', 'shared', 'balanced')
+
+# Na estratégia balanced, o limite de cada parte é buscado com precisão de 1/N
+BALANCE_PRECISION = 1000
+
+
+def _empty_writer_size(object_streams: bool = False) -> int:
+    """Tamanho de um PDF sem páginas gerado pelo PdfWriter."""
+    return write_pdf_writer(PdfWriter(), object_streams).tell()
+
+
+class PageSizeEstimator:
+    """Estima o tamanho de intervalos de páginas de um PDF."""
+
+    def __init__(self, index: PdfObjectIndex, object_streams: bool = False):
+        """
+        Inicializa o estimador.
+
+        Args:
+            index: Índice do grafo de objetos do PDF de origem
+            object_streams: Estima partes gravadas com streams de objetos
+                (ver pdf_output)
+        """
+        self.index = index
+        self.total_pages = index.total_pages
+        self.base_size = _empty_writer_size(object_streams)
+
+        # Custo de cada objeto em uma parte, com o cabeçalho e a entrada na xref
+        if object_streams:
+            self.object_costs = {
+                idnum: (
+                    size + OBJECT_OVERHEAD if idnum in index.stream_objects
+                    else int(size * PACKED_RATIO) + PACKED_OBJECT_OVERHEAD
+                )
+                for idnum, size in index.object_sizes.items()
+            }
+        else:
+            self.object_costs = {
+                idnum: size + OBJECT_OVERHEAD for idnum, size in index.object_sizes.items()
+            }
+
+    def page_cost(self, page_num: int, included: Set[int]) -> int:
+        """
+        Calcula o custo marginal de acrescentar uma página a uma parte.
+
+        Args:
+            page_num: Índice da página (base zero)
+            included: Objetos já presentes na parte
+
+        Returns:
+            Bytes adicionais estimados
+        """
+        costs = self.object_costs
+        cost = KID_OVERHEAD
+        for idnum in self.index.page_objects[page_num]:
+            if idnum not in included:
+                cost += costs.get(idnum, OBJECT_OVERHEAD)
+        return cost
+
+    def estimate_range(self, start: int, end: int) -> int:
+        """
+        Estima o tamanho de uma parte com as páginas [start, end).
+
+        Args:
+            start: Primeira página (base zero)
+            end: Página final (exclusiva)
+
+        Returns:
+            Tamanho estimado em bytes
+        """
+        included: Set[int] = set()
+        size = self.base_size
+        for page_num in range(start, end):
+            size += self.page_cost(page_num, included)
+            included |= self.index.page_objects[page_num]
+        return size
+
+    def next_chunk(
+        self, start: int, max_bytes: float, max_pages: Optional[int] = None
+    ) -> Tuple[int, int]:
+        """
+        Encontra o maior intervalo a partir de start que cabe no limite.
+
+        Uma parte sempre recebe ao menos uma página, mesmo que ela sozinha
+        ultrapasse o limite.
+
+        Args:
+            start: Primeira página da parte (base zero)
+            max_bytes: Tamanho máximo estimado da parte
+            max_pages: Número máximo de páginas da parte (opcional)
+
+        Returns:
+            Tupla (página final exclusiva, tamanho estimado em bytes)
+        """
+        included: Set[int] = set()
+        size = self.base_size
+        end = start
+
+        while end < self.total_pages:
+            if max_pages and end - start >= max_pages:
+                break
+            cost = self.page_cost(end, included)
+            if end > start and size + cost > max_bytes:
+                break
+            size += cost
+            included |= self.index.page_objects[end]
+            end += 1
+
+        return end, size
+
+    def plan_by_pages(self, pages_per_file: int) -> List[Tuple[int, int, int]]:
+        """
+        Planeja partes com número fixo de páginas.
+
+        Args:
+            pages_per_file: Número de páginas por parte
+
+        Returns:
+            Lista de tuplas (página inicial, página final exclusiva, bytes estimados)
+        """
+        chunks = []
+        for start in range(0, self.total_pages, pages_per_file):
+            end = min(start + pages_per_file, self.total_pages)
+            chunks.append((start, end, self.estimate_range(start, end)))
+        return chunks
+
+    def reach(
+        self, max_bytes: float, max_pages: Optional[int] = None, start: int = 0
+    ) -> List[int]:
+        """
+        Calcula, para cada página inicial, até onde uma parte pode ir.
+
+        Equivale a chamar next_chunk a partir de cada página, mas usa uma
+        janela deslizante com contagem de referências por objeto, de forma
+        que o custo total é linear no número de páginas.
+
+        Args:
+            max_bytes: Tamanho máximo estimado da parte
+            max_pages: Número máximo de páginas da parte (opcional)
+            start: Primeira página considerada (base zero)
+
+        Returns:
+            Lista indexada pela página inicial com a página final exclusiva
+            (posições anteriores a start ficam zeradas)
+        """
+        costs = self.object_costs
+        page_objects = self.index.page_objects
+        counts: Dict[int, int] = {}
+        size = self.base_size
+        end = start
+        far = [0] * (self.total_pages + 1)
+        far[self.total_pages] = self.total_pages
+
+        for page_num in range(start, self.total_pages):
+            while end < self.total_pages:
+                if max_pages and end - page_num >= max_pages:
+                    break
+                cost = KID_OVERHEAD + sum(
+                    costs.get(idnum, OBJECT_OVERHEAD)
+                    for idnum in page_objects[end]
+                    if idnum not in counts
+                )
+                if end > page_num and size + cost > max_bytes:
+                    break
+                size += cost
+                for idnum in page_objects[end]:
+                    counts[idnum] = counts.get(idnum, 0) + 1
+                end += 1
+
+            far[page_num] = end
+
+            # Retira a página inicial da janela
+            size -= KID_OVERHEAD
+            for idnum in page_objects[page_num]:
+                counts[idnum] -= 1
+                if not counts[idnum]:
+                    del counts[idnum]
+                    size -= costs.get(idnum, OBJECT_OVERHEAD)
+
+        return far
+
+    def boundary_cost(self, page_num: int) -> int:
+        """
+        Estima os bytes repetidos ao cortar antes de uma página.
+
+        São os objetos usados tanto pela página anterior quanto por esta,
+        que passam a ser gravados nas duas partes.
+
+        Args:
+            page_num: Primeira página da nova parte (base zero)
+
+        Returns:
+            Bytes estimados dos objetos compartilhados entre as páginas
+        """
+        if page_num <= 0 or page_num >= self.total_pages:
+            return 0
+        costs = self.object_costs
+        shared = self.index.page_objects[page_num - 1] & self.index.page_objects[page_num]
+        return sum(costs.get(idnum, OBJECT_OVERHEAD) for idnum in shared)
+
+    def _plan_shared(self, far: List[int], start: int) -> List[Tuple[int, int]]:
+        """
+        Escolhe os cortes que repetem menos bytes entre as partes.
+
+        Entre todas as divisões com o número mínimo de partes, escolhe por
+        programação dinâmica a que minimiza a soma de boundary_cost.
+
+        Args:
+            far: Resultado de reach
+            start: Primeira página (base zero)
+
+        Returns:
+            Lista de tuplas (página inicial, página final exclusiva)
+        """
+        total = self.total_pages
+        parts = [0] * (total + 1)
+        best = [0] * (total + 1)
+        choice = [total] * (total + 1)
+        # Custo de cortar em cada página mais o melhor custo a partir dela
+        value = [0] * (total + 1)
+        # Primeira página (a partir de start) que precisa de k partes até o fim
+        level_start = {0: total}
+
+        for page_num in range(total - 1, start - 1, -1):
+            parts[page_num] = 1 + parts[far[page_num]]
+            # Cortes possíveis: páginas que ainda permitem o número mínimo de partes
+            low = max(page_num + 1, level_start[parts[page_num] - 1])
+            high = far[page_num]
+            candidates = value[low:high + 1]
+            cheapest = min(candidates)
+            # Em caso de empate, o corte mais distante (como no greedy)
+            choice[page_num] = high - candidates[::-1].index(cheapest)
+            best[page_num] = cheapest
+            value[page_num] = self.boundary_cost(page_num) + best[page_num]
+            level_start[parts[page_num]] = page_num
+
+        ranges = []
+        page_num = start
+        while page_num < total:
+            ranges.append((page_num, choice[page_num]))
+            page_num = choice[page_num]
+        return ranges
+
+    def count_parts(
+        self, max_bytes: float, max_pages: Optional[int] = None, start: int = 0
+    ) -> int:
+        """
+        Conta as partes que o preenchimento guloso gera a partir de start.
+
+        Como o custo de um intervalo só cresce ao incluir páginas, o
+        preenchimento guloso gera o menor número possível de partes.
+
+        Args:
+            max_bytes: Tamanho máximo estimado de cada parte
+            max_pages: Número máximo de páginas por parte (opcional)
+            start: Primeira página (base zero)
+
+        Returns:
+            Número de partes
+        """
+        parts = 0
+        while start < self.total_pages:
+            start, _size = self.next_chunk(start, max_bytes, max_pages)
+            parts += 1
+        return parts
+
+    def _balanced_limit(
+        self, parts: int, high: int, max_pages: Optional[int], start: int
+    ) -> int:
+        """
+        Busca binária do menor limite que ainda divide o restante em `parts` partes.
+
+        Args:
+            parts: Número de partes disponível para as páginas restantes
+            high: Limite que sabidamente cabe em `parts` partes
+            max_pages: Número máximo de páginas por parte (opcional)
+            start: Primeira página restante (base zero)
+
+        Returns:
+            Menor limite em bytes
+        """
+        # A soma das partes é pelo menos o tamanho do restante inteiro
+        low = min(self.estimate_range(start, self.total_pages) // parts, high)
+        while high - low > max(1, high // BALANCE_PRECISION):
+            middle = (low + high) // 2
+            if self.count_parts(middle, max_pages, start) <= parts:
+                high = middle
+            else:
+                low = middle + 1
+        return high
+
+    def _plan_balanced(
+        self, max_bytes: float, max_pages: Optional[int], start: int
+    ) -> List[Tuple[int, int]]:
+        """
+        Divide com o número mínimo de partes e tamanhos equilibrados.
+
+        A cada parte, o limite é reduzido ao menor valor que ainda permite
+        dividir o restante no número de partes que sobra; assim nenhuma
+        parte fica maior que o necessário e a última não sobra pequena.
+
+        Args:
+            max_bytes: Tamanho máximo de cada parte em bytes
+            max_pages: Número máximo de páginas por parte (opcional)
+            start: Primeira página (base zero)
+
+        Returns:
+            Lista de tuplas (página inicial, página final exclusiva)
+        """
+        remaining = self.count_parts(max_bytes, max_pages, start)
+        limit = int(max_bytes)
+        ranges = []
+
+        while start < self.total_pages:
+            limit = self._balanced_limit(remaining, limit, max_pages, start)
+            end, _size = self.next_chunk(start, limit, max_pages)
+            ranges.append((start, end))
+            start = end
+            remaining -= 1
+
+        return ranges
+
+    def plan_by_size(
+        self,
+        max_bytes: float,
+        max_pages: Optional[int] = None,
+        strategy: str = 'greedy',
+        start: int = 0
+    ) -> List[Tuple[int, int, int]]:
+        """
+        Planeja as partes de um PDF a partir das estimativas de tamanho.
+
+        Args:
+            max_bytes: Tamanho máximo de cada parte em bytes
+            max_pages: Número máximo de páginas por parte (opcional)
+            strategy: Estratégia de planejamento (ver SPLIT_STRATEGIES)
+            start: Primeira página a planejar (base zero)
+
+        Returns:
+            Lista de tuplas (página inicial, página final exclusiva, bytes estimados)
+        """
+        if strategy not in SPLIT_STRATEGIES:
+            raise ValueError(f"Estratégia de divisão inválida: {strategy}")
+
+        if strategy in ('shared', 'balanced'):
+            if strategy == 'shared':
+                ranges = self._plan_shared(self.reach(max_bytes, max_pages, start), start)
+            else:
+                ranges = self._plan_balanced(max_bytes, max_pages, start)
+            return [(first, end, self.estimate_range(first, end)) for first, end in ranges]
+
+        chunks = []
+        while start < self.total_pages:
+            end, size = self.next_chunk(start, max_bytes, max_pages)
+            chunks.append((start, end, size))
+            start = end
+        return chunks
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Limites de envio de cada tribunal.
+
+Usados pela interface web, pela API e pela CLI para dividir um documento
+conforme as regras de um ou mais tribunais.
+"""
+
+from typing import Dict, List
+
+
+# Preferências padrão por tribunal (em MB e páginas), estratégia da divisão por tamanho
+# (greedy, para manter as partes já conhecidas; "balanced" deve ser escolhida explicitamente)
+# e gravação das partes com streams de objetos (PDF 1.5, partes menores). Os streams
+# de objetos ficam desligados: alguns portais e validadores ainda recusam a xref
+# comprimida, então só são ativados por tribunais que comprovadamente a aceitam
+TRIBUNAIS_DEFAULTS = {
+    "tjsp": {"max_size_mb": 5, "max_pages": None, "strategy": "greedy", "object_streams": False, "nome": "TJSP - Tribunal de Justiça de SP"},
+    "tjrj": {"max_size_mb": 10, "max_pages": None, "strategy": "greedy", "object_streams": False, "nome": "TJRJ - Tribunal de Justiça do RJ"},
+    "tjmg": {"max_size_mb": 8, "max_pages": None, "strategy": "greedy", "object_streams": False, "nome": "TJMG - Tribunal de Justiça de MG"},
+    "tjpr": {"max_size_mb": 5, "max_pages": None, "strategy": "greedy", "object_streams": False, "nome": "TJPR - Tribunal de Justiça do PR"},
+    "tjrs": {"max_size_mb": 10, "max_pages": None, "strategy": "greedy", "object_streams": False, "nome": "TJRS - Tribunal de Justiça do RS"},
+    "tjsc": {"max_size_mb": 5, "max_pages": None, "strategy": "greedy", "object_streams": False, "nome": "TJSC - Tribunal de Justiça de SC"},
+    "trf1": {"max_size_mb": 10, "max_pages": None, "strategy": "greedy", "object_streams": False, "nome": "TRF1 - Tribunal Regional Federal 1ª Região"},
+    "trf2": {"max_size_mb": 10, "max_pages": None, "strategy": "greedy", "object_streams": False, "nome": "TRF2 - Tribunal Regional Federal 2ª Região"},
+    "trf3": {"max_size_mb": 10, "max_pages": None, "strategy": "greedy", "object_streams": False, "nome": "TRF3 - Tribunal Regional Federal 3ª Região"},
+    "trf4": {"max_size_mb": 10, "max_pages": None, "strategy": "greedy", "object_streams": False, "nome": "TRF4 - Tribunal Regional Federal 4ª Região"},
+    "trf5": {"max_size_mb": 10, "max_pages": None, "strategy": "greedy", "object_streams": False, "nome": "TRF5 - Tribunal Regional Federal 5ª Região"},
+    "stj": {"max_size_mb": 15, "max_pages": None, "strategy": "greedy", "object_streams": False, "nome": "STJ - Superior Tribunal de Justiça"},
+    "stf": {"max_size_mb": 15, "max_pages": None, "strategy": "greedy", "object_streams": False, "nome": "STF - Supremo Tribunal Federal"},
+    "tst": {"max_size_mb": 10, "max_pages": None, "strategy": "greedy", "object_streams": False, "nome": "TST - Tribunal Superior do Trabalho"},
+    "pje": {"max_size_mb": 10, "max_pages": 200, "strategy": "greedy", "object_streams": False, "nome": "PJe - Processo Judicial Eletrônico"},
+    "projudi": {"max_size_mb": 5, "max_pages": None, "strategy": "greedy", "object_streams": False, "nome": "Projudi"},
+    "esaj": {"max_size_mb": 5, "max_pages": None, "strategy": "greedy", "object_streams": False, "nome": "e-SAJ"},
+    "custom": {"max_size_mb": 5, "max_pages": 50, "strategy": "greedy", "object_streams": False, "nome": "Personalizado"}
+}
+
+
+def parse_tribunals(value: str) -> List[str]:
+    """
+    Lê uma lista de tribunais separados por vírgula (ex.: "tjsp,trf3,pje").
+
+    Args:
+        value: Chaves de TRIBUNAIS_DEFAULTS separadas por vírgula
+
+    Returns:
+        Chaves sem repetição, na ordem informada
+
+    Raises:
+        ValueError: Se a lista estiver vazia ou algum tribunal for desconhecido
+    """
+    keys: List[str] = []
+    for key in value.split(','):
+        key = key.strip().lower()
+        if not key or key in keys:
+            continue
+        if key not in TRIBUNAIS_DEFAULTS:
+            raise ValueError(f"Tribunal desconhecido: {key}")
+        keys.append(key)
+    if not keys:
+        raise ValueError("Informe ao menos um tribunal")
+    return keys
+
+
+def tribunal_targets(keys: List[str]) -> Dict[str, dict]:
+    """
+    Opções de divisão de cada tribunal, no formato de PDFSplitter.iter_targets.
+
+    Args:
+        keys: Chaves de TRIBUNAIS_DEFAULTS
+
+    Returns:
+        Dicionário tribunal -> opções (max_size_mb, max_pages e strategy)
+    """
+    return {
+        key: {
+            'max_size_mb': TRIBUNAIS_DEFAULTS[key]['max_size_mb'],
+            'max_pages': TRIBUNAIS_DEFAULTS[key]['max_pages'],
+            'strategy': TRIBUNAIS_DEFAULTS[key]['strategy']
+        }
+        for key in keys
+    }
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Recebimento de uploads de PDF em disco.
+
+O corpo da requisição é gravado em blocos diretamente em um arquivo
+temporário, sem passar por uma cópia inteira no heap do Python. Enquanto os
+blocos chegam, o SHA-256 é calculado e o cabeçalho "%PDF-" é conferido no
+primeiro kilobyte, de forma que um arquivo que não é PDF é recusado sem
+ler o restante do envio; ao final, o fim do arquivo precisa ter o
+"startxref" e o marcador "%%EOF". O arquivo resultante é entregue ao
+PDFSplitter pelo caminho e mapeado em memória.
+
+Configuração por variáveis de ambiente:
+    PDF_SPLITTER_UPLOAD_DIR: diretório dos arquivos temporários
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, Optional, Tuple
+
+
+# Tamanho dos blocos copiados de um stream para o arquivo temporário
+CHUNK_SIZE = 1024 * 1024
+
+# O cabeçalho e o fim do arquivo são procurados nesta janela, como nos leitores de PDF
+HEADER_WINDOW = 1024
+TRAILER_WINDOW = 1024
+
+PDF_HEADER = b'%PDF-'
+
+
+class InvalidUpload(Exception):
+    """O upload não é um PDF válido (cabeçalho ou fim do arquivo ausente)."""
+
+
+class PdfSpool:
+    """
+    Arquivo temporário que recebe um upload de PDF em blocos.
+
+    Usado como destino do upload pelo parser de formulários do Werkzeug
+    (precisa ser gravável e legível); o arquivo é removido em close(), a
+    menos que tenha sido entregue ao chamador com detach().
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        """
+        Cria o arquivo temporário.
+
+        Args:
+            directory: Diretório do arquivo (padrão: PDF_SPLITTER_UPLOAD_DIR
+                ou o diretório temporário do sistema)
+        """
+        if directory is None:
+            directory = os.environ.get('PDF_SPLITTER_UPLOAD_DIR') or None
+        fd, self.path = tempfile.mkstemp(prefix='pdf_splitter_upload_', suffix='.pdf', dir=directory)
+        self._file = os.fdopen(fd, 'w+b')
+        self._digest = hashlib.sha256()
+        self._head = b''
+        self._tail = b''
+        self._detached = False
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        """Grava um bloco, atualizando o hash e conferindo o cabeçalho."""
+        if len(self._head) < HEADER_WINDOW:
+            self._head += data[:HEADER_WINDOW - len(self._head)]
+            if len(self._head) >= HEADER_WINDOW:
+                self._check_header()
+
+        self._digest.update(data)
+        self._tail = (self._tail + data[-TRAILER_WINDOW:])[-TRAILER_WINDOW:]
+        self.size += len(data)
+        return self._file.write(data)
+
+    def _check_header(self) -> None:
+        if PDF_HEADER not in self._head:
+            self.discard()
+            raise InvalidUpload("Arquivo não é um PDF (cabeçalho %PDF- ausente)")
+
+    def finish(self) -> Tuple[str, str]:
+        """
+        Conclui o recebimento e confere o fim do arquivo.
+
+        Returns:
+            Tupla (caminho do arquivo, SHA-256 do conteúdo)
+
+        Raises:
+            InvalidUpload: Se o arquivo não for um PDF ou estiver truncado
+        """
+        if len(self._head) < HEADER_WINDOW:
+            self._check_header()
+        if b'startxref' not in self._tail or b'%%EOF' not in self._tail:
+            self.discard()
+            raise InvalidUpload("PDF incompleto ou corrompido (fim do arquivo ausente)")
+        self._file.flush()
+        return self.path, self._digest.hexdigest()
+
+    @property
+    def sha256(self) -> str:
+        """SHA-256 do conteúdo recebido até agora."""
+        return self._digest.hexdigest()
+
+    def detach(self) -> str:
+        """Entrega o arquivo ao chamador, que passa a ser responsável por removê-lo."""
+        self._detached = True
+        self._file.close()
+        return self.path
+
+    def discard(self) -> None:
+        """Fecha e remove o arquivo."""
+        self._detached = False
+        self.close()
+
+    def close(self) -> None:
+        """Fecha o arquivo e o remove, se não tiver sido entregue com detach()."""
+        self._file.close()
+        if not self._detached and os.path.exists(self.path):
+            os.unlink(self.path)
+
+    # Leitura e posicionamento, usados pelo Werkzeug após o parsing
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+    def readline(self, size: int = -1) -> bytes:
+        return self._file.readline(size)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+
+def spool_stream(stream: BinaryIO, directory: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Copia um stream em blocos para um arquivo temporário, validando o PDF.
+
+    Args:
+        stream: Stream com o conteúdo do PDF
+        directory: Diretório do arquivo temporário (ver PdfSpool)
+
+    Returns:
+        Tupla (caminho do arquivo, a ser removido pelo chamador, SHA-256 do
+        conteúdo)
+
+    Raises:
+        InvalidUpload: Se o conteúdo não for um PDF ou estiver truncado
+    """
+    spool = PdfSpool(directory)
+    try:
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+            spool.write(chunk)
+        spool.finish()
+    except BaseException:
+        spool.discard()
+        raise
+    return spool.detach(), spool.sha256